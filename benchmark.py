@@ -0,0 +1,562 @@
+"""
+Замеры производительности библиотеки.
+Результаты выводятся в формате JSON, чтобы их можно было сравнивать между запусками.
+
+Пример запуска:
+    python benchmark.py memory --size 100000
+    python benchmark.py startup --size 1000000
+    python benchmark.py operations --size 1000 100000 1000000 --operations 20 --output results.json
+    python benchmark.py server --size 100000 --operations 200 --clients 32
+    python benchmark.py compression --size 100000 1000000
+    python benchmark.py parallel --size 1000000 --operations 20 --workers 4
+    python benchmark.py sharded --size 1000000 --operations 20
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import patch
+
+from data_manager import DataManager
+from library import Book, Library
+from main import create_data_manager
+from metrics import METRICS
+from server import run_load
+
+PROJECT_DIR = Path(__file__).resolve().parent
+
+
+@dataclass
+class LegacyBook:
+    """Представление книги до оптимизации: обычный dataclass с __dict__ и собственными строками."""
+    id: str
+    title: str
+    author: str
+    year: int
+    status: str
+
+
+FIRST_NAMES = [
+    "Александр", "Алексей", "Анна", "Борис", "Валентин", "Вера", "Владимир", "Галина", "Дмитрий", "Евгений",
+    "Екатерина", "Иван", "Ирина", "Константин", "Лев", "Людмила", "Марина", "Михаил", "Николай", "Ольга",
+    "Павел", "Сергей", "Татьяна", "Фёдор", "Юрий",
+]
+SURNAMES = [
+    "Толстой", "Достоевский", "Чехов", "Булгаков", "Пастернак", "Ахматова", "Цветаева", "Шолохов", "Гоголь",
+    "Тургенев", "Бунин", "Набоков", "Платонов", "Стругацкий", "Ефремов", "Пелевин", "Улицкая", "Быков",
+    "Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков",
+    "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров", "Павлов", "Козлов",
+]
+# Прилагательные в формах мужского, женского, среднего рода и множественного числа.
+TITLE_ADJECTIVES = [
+    ("Белый", "Белая", "Белое", "Белые"), ("Тихий", "Тихая", "Тихое", "Тихие"),
+    ("Последний", "Последняя", "Последнее", "Последние"), ("Вечный", "Вечная", "Вечное", "Вечные"),
+    ("Далёкий", "Далёкая", "Далёкое", "Далёкие"), ("Тёмный", "Тёмная", "Тёмное", "Тёмные"),
+    ("Золотой", "Золотая", "Золотое", "Золотые"), ("Красный", "Красная", "Красное", "Красные"),
+    ("Забытый", "Забытая", "Забытое", "Забытые"), ("Северный", "Северная", "Северное", "Северные"),
+    ("Новый", "Новая", "Новое", "Новые"), ("Старый", "Старая", "Старое", "Старые"),
+    ("Живой", "Живая", "Живое", "Живые"), ("Синий", "Синяя", "Синее", "Синие"),
+]
+# Существительные с индексом формы прилагательного: 0 - м.р., 1 - ж.р., 2 - ср.р., 3 - мн.ч.
+TITLE_NOUNS = [
+    ("Дон", 0), ("путь", 0), ("город", 0), ("сад", 0), ("ветер", 0), ("берег", 0), ("остров", 0), ("мастер", 0),
+    ("гвардия", 1), ("душа", 1), ("звезда", 1), ("дорога", 1), ("история", 1), ("война", 1), ("степь", 1),
+    ("лето", 2), ("море", 2), ("поле", 2), ("утро", 2), ("небо", 2),
+    ("аллеи", 3), ("души", 3), ("сумерки", 3), ("горы", 3), ("паруса", 3),
+]
+TITLE_TAILS = ["", "", "", " и мир", " и наказание", ". Часть вторая", " над пропастью", " в 1941 году"]
+STATUS_WEIGHTS = {"в наличии": 0.8, "выдана": 0.2}
+BENCHMARK_SIZES = (1_000, 100_000, 1_000_000)
+
+
+def generate_books(size: int, seed: int = 0) -> list[dict[str, Any]]:
+    """
+    Генерирует каталог книг для замеров. При одинаковом seed каталог всегда один и тот же.
+    Названия и авторы - на русском языке, популярность авторов неравномерна (несколько авторов
+    написали много книг, большинство - одну-две), годы издания сосредоточены во второй половине XX века,
+    около пятой части книг выдана.
+    """
+    rng = random.Random(seed)
+    current_year = datetime.today().year
+    authors = [
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)[0]}. {rng.choice(SURNAMES)}"
+        for _ in range(max(size // 5, 1))
+    ]
+    author_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(authors))))
+    statuses, status_weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+
+    books = []
+    for book_id in range(1, size + 1):
+        noun, form = rng.choice(TITLE_NOUNS)
+        title = f"{rng.choice(TITLE_ADJECTIVES)[form]} {noun}{rng.choice(TITLE_TAILS)}"
+        books.append({
+            "id": str(book_id),
+            "title": title,
+            "author": rng.choices(authors, cum_weights=author_weights)[0],
+            "year": min(current_year, max(1700, round(rng.gauss(1975, 35)))),
+            "status": rng.choices(statuses, status_weights)[0],
+        })
+    return books
+
+
+def measure_memory(factory: Callable[[dict[str, Any]], Any], books: list[dict[str, Any]]) -> float:
+    """
+    Возвращает средний объем памяти (в байтах) на одну книгу.
+    Данные предварительно проходят через JSON, чтобы, как при загрузке из файла,
+    каждая строка была отдельным объектом.
+    """
+    serialized = json.dumps(books, ensure_ascii=False)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [factory(book) for book in json.loads(serialized)]
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del objects
+    return allocated / len(books)
+
+
+def benchmark_memory(size: int, seed: int = 0) -> dict[str, Any]:
+    """Сравнивает расход памяти на книгу до и после перехода на компактное представление Book."""
+    books = generate_books(size, seed)
+    legacy = measure_memory(lambda data: LegacyBook(**data), books)
+    compact = measure_memory(Book.from_dict, books)
+    return {
+        "benchmark": "memory",
+        "size": size,
+        "legacy_bytes_per_book": round(legacy, 1),
+        "compact_bytes_per_book": round(compact, 1),
+        "saved_percent": round((1 - compact / legacy) * 100, 1),
+    }
+
+
+def _python_env() -> dict[str, str]:
+    return {**os.environ, "PYTHONPATH": str(PROJECT_DIR), "PYTHONIOENCODING": "utf-8"}
+
+
+def run_python(code: str, cwd: Path) -> float:
+    """Запускает код в отдельном интерпретаторе и возвращает время выполнения в секундах."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=cwd, env=_python_env(), check=True)
+    return time.perf_counter() - start
+
+
+def time_to_first_menu(cwd: Path) -> float:
+    """Запускает main.py и возвращает время (в секундах) до вывода меню действий."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", str(PROJECT_DIR / "main.py")],
+        cwd=cwd,
+        env=_python_env(),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+    )
+    elapsed = None
+    for line in process.stdout:
+        if elapsed is None and "Выберите действие" in line:
+            elapsed = time.perf_counter() - start
+        elif elapsed is not None and line.rstrip().endswith(". Выйти"):
+            # Номер пункта выхода зависит от набора пунктов меню и берется из выведенного меню.
+            exit_command = line.split(".", 1)[0]
+            break
+    else:
+        raise RuntimeError("main.py завершился, не выведя меню")
+    process.communicate(f"{exit_command}\n")
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+    return elapsed
+
+
+def benchmark_startup(size: int, seed: int = 0) -> dict[str, Any]:
+    """
+    Замеряет время запуска с каталогом books.json в текущем каталоге:
+    импорт librarian, появление меню main.py и первое обращение к списку книг.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cwd = Path(temp_dir)
+        DataManager(cwd / "books.json").save_books(generate_books(size, seed))
+        interpreter = run_python("pass", cwd)
+        return {
+            "benchmark": "startup",
+            "size": size,
+            "interpreter_seconds": round(interpreter, 4),
+            "import_librarian_seconds": round(run_python("import librarian", cwd), 4),
+            "first_menu_seconds": round(time_to_first_menu(cwd), 4),
+            "first_catalog_access_seconds": round(
+                run_python("import librarian; librarian.Librarian().library.books", cwd), 4
+            ),
+        }
+
+
+def summarize(latencies: list[float]) -> dict[str, Any]:
+    """Сводка по замерам одной операции: количество, операций в секунду и перцентили задержки (мс)."""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def percentile(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "ops_per_sec": round(len(ordered) / total, 1) if total else None,
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(action: Callable[[], Any], repeat: int) -> list[float]:
+    """Выполняет действие repeat раз и возвращает время каждого выполнения в секундах."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def peak_memory(action: Callable[[], Any]) -> float:
+    """Возвращает пиковый объем памяти (в МБ), выделенной во время выполнения действия."""
+    tracemalloc.start()
+    try:
+        action()
+        return round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_operations(
+        size: int,
+        seed: int = 0,
+        operations: int = 100,
+        storage: str = "json",
+        search_index: bool = False,
+) -> dict[str, Any]:
+    """
+    Замеряет все операции библиотеки на сгенерированном каталоге заданного размера:
+    загрузку и сохранение в DataManager, создание Library с загрузкой каталога, добавление, удаление,
+    поиск по каждому параметру и изменение статуса.
+    :param operations: Количество выполнений каждой операции над каталогом.
+    :param storage: Способ хранения ('json', 'journal', 'sqlite', 'binary' или 'sharded').
+    :param search_index: Строить ли триграммный индекс для поиска.
+    """
+    rng = random.Random(seed)
+    books = generate_books(size, seed)
+    results: dict[str, Any] = {
+        "benchmark": "operations",
+        "size": size,
+        "storage": storage,
+        "search_index": search_index,
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir, open(os.devnull, "w") as devnull:
+        json_manager = DataManager(Path(temp_dir) / "books.json")
+        results["save_books"] = summarize(timed(lambda: json_manager.save_books(books), 3))
+        results["load_books"] = summarize(timed(json_manager.load_books, 3))
+        results["load_books_peak_mb"] = peak_memory(json_manager.load_books)
+
+        data_manager = create_data_manager(
+            argparse.Namespace(storage=storage, file=Path(temp_dir) / "catalog", compression=None, shard_size=None)
+        )
+        data_manager.save_books(books)
+        del books
+
+        def load_library() -> Library:
+            library = Library(data_manager, search_index=search_index)
+            len(library.books)
+            return library
+
+        results["library_init"] = summarize(timed(load_library, 3))
+        results["library_init_peak_mb"] = peak_memory(load_library)
+        library = load_library()
+        catalog = library.books
+        sample = [catalog[rng.randrange(size)] for _ in range(operations)] if size else []
+        search_terms = {
+            "title": [book.title.split()[-1] for book in sample],
+            "author": [book.author.split()[-1] for book in sample],
+            "year": [str(book.year) for book in sample],
+        }
+
+        with redirect_stdout(devnull), patch("builtins.input", return_value="да"):
+            results["add_book"] = summarize(
+                timed(lambda: library.add_book("Новая книга", "Новый автор", "2000"), operations)
+            )
+            for field, terms in search_terms.items():
+                term_iter = iter(terms)
+                results[f"search_book_{field}"] = summarize(
+                    timed(lambda: library.search_book(field, next(term_iter)), len(terms))
+                )
+            status_iter = iter(sample)
+            results["change_status"] = summarize(
+                timed(lambda: library.change_status((book := next(status_iter)).id, _other_status(book)), len(sample))
+            )
+            delete_iter = iter({book.id for book in sample})
+            results["delete_book"] = summarize(
+                timed(lambda: library.delete_book(next(delete_iter)), len({book.id for book in sample}))
+            )
+
+        close = getattr(data_manager, "close", None)
+        if close:
+            close()
+
+    results["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return results
+
+
+def _other_status(book: Book) -> str:
+    return "выдана" if book.status == "в наличии" else "в наличии"
+
+
+def server_workloads(books: list[dict[str, Any]], clients: int, operations: int, seed: int = 0) -> list[list[tuple[str, dict[str, Any]]]]:
+    """
+    Формирует запросы для генератора нагрузки: у каждого клиента operations запросов,
+    из них 70% - поиск по названию, автору или году, 10% - список книг, 15% - изменение статуса, 5% - добавление.
+    """
+    rng = random.Random(seed)
+    workloads = []
+    for _ in range(clients):
+        workload = []
+        for _ in range(operations):
+            book = rng.choice(books)
+            kind = rng.random()
+            if kind < 0.7:
+                field = rng.choice(("title", "author", "year"))
+                term = str(book[field]) if field == "year" else book[field].split()[-1]
+                workload.append(("search", {"type": field, "term": term}))
+            elif kind < 0.8:
+                workload.append(("list", {"offset": rng.randrange(len(books)), "limit": 20}))
+            elif kind < 0.95:
+                workload.append(("change_status", {"id": book["id"], "status": rng.choice(("выдана", "в наличии"))}))
+            else:
+                workload.append(("add", {"title": "Новая книга", "author": "Новый автор", "year": 2000}))
+        workloads.append(workload)
+    return workloads
+
+
+def benchmark_server(
+        size: int,
+        seed: int = 0,
+        operations: int = 100,
+        storage: str = "json",
+        search_index: bool = False,
+        clients: int = 16,
+) -> dict[str, Any]:
+    """
+    Запускает main.py --serve в отдельном процессе на сгенерированном каталоге и нагружает его
+    одновременными клиентами: общее количество запросов в секунду и перцентили задержки по методам.
+    :param operations: Количество запросов каждого клиента.
+    :param storage: Способ хранения ('json', 'journal', 'sqlite', 'binary' или 'sharded').
+    :param search_index: Строить ли триграммный индекс для поиска.
+    :param clients: Количество одновременных подключений.
+    """
+    books = generate_books(size, seed)
+    results: dict[str, Any] = {
+        "benchmark": "server",
+        "size": size,
+        "storage": storage,
+        "search_index": search_index,
+        "clients": clients,
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = Path(temp_dir) / "catalog"
+        create_data_manager(
+            argparse.Namespace(storage=storage, file=file_path, compression=None, shard_size=None)
+        ).save_books(books)
+        process = subprocess.Popen(
+            [sys.executable, str(PROJECT_DIR / "main.py"), "--serve", "--port", "0",
+             "--storage", storage, "--file", str(file_path), *(["--search-index"] if search_index else [])],
+            stdout=subprocess.PIPE, text=True, encoding="utf-8", env=_python_env(),
+        )
+        try:
+            host, port = process.stdout.readline().split()[-1].rsplit(":", 1)
+            latencies, elapsed = asyncio.run(
+                run_load(host, int(port), server_workloads(books, clients, operations, seed))
+            )
+        finally:
+            process.terminate()
+            process.wait()
+
+    results["requests_per_sec"] = round(sum(map(len, latencies.values())) / elapsed, 1)
+    for method, method_latencies in sorted(latencies.items()):
+        results[method] = summarize(method_latencies)
+    return results
+
+
+def benchmark_compression(size: int, seed: int = 0) -> dict[str, Any]:
+    """
+    Сравнивает хранение каталога в обычном файле JSON и в сжатых файлах (gzip, lzma):
+    размер файла, время сохранения и загрузки, пиковый расход памяти при загрузке.
+    """
+    books = generate_books(size, seed)
+    results: dict[str, Any] = {"benchmark": "compression", "size": size}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for compression, suffix in ((None, ".json"), ("gzip", ".json.gz"), ("lzma", ".json.xz")):
+            data_manager = DataManager(Path(temp_dir) / f"books{suffix}")
+            save = summarize(timed(lambda: data_manager.save_books(books), 3))
+            results[compression or "json"] = {
+                "file_mb": round(data_manager.file_path.stat().st_size / 1024 / 1024, 3),
+                "save_books": save,
+                "load_books": summarize(timed(lambda: sum(1 for _ in data_manager.iter_books()), 3)),
+                "load_books_peak_mb": peak_memory(lambda: sum(1 for _ in data_manager.iter_books())),
+            }
+    for compression in ("gzip", "lzma"):
+        results[compression]["size_ratio"] = round(results[compression]["file_mb"] / results["json"]["file_mb"], 3)
+    return results
+
+
+def benchmark_parallel(size: int, seed: int = 0, operations: int = 100, workers: int = 0) -> dict[str, Any]:
+    """
+    Сравнивает поиск по подстроке без индекса в одном процессе и параллельный просмотр каталога
+    в пуле процессов: время снятия снимка, задержки поиска по названию и автору и ускорение по медиане.
+    :param operations: Количество поисков по каждому параметру.
+    :param workers: Количество процессов (0 - по количеству ядер).
+    """
+    rng = random.Random(seed)
+    books = generate_books(size, seed)
+    sample = [books[rng.randrange(size)] for _ in range(operations)] if size else []
+    search_terms = {
+        "title": [book["title"].split()[-1] for book in sample],
+        "author": [book["author"].split()[-1] for book in sample],
+    }
+    results: dict[str, Any] = {"benchmark": "parallel", "size": size, "cpu_count": os.cpu_count()}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(Path(temp_dir) / "books.json")
+        data_manager.save_books(books)
+        del books
+
+        serial = Library(data_manager, search_cache_size=0)
+        parallel = Library(data_manager, search_cache_size=0, parallel_workers=workers)
+        parallel.parallel_scanner.threshold = 0
+        len(serial.books)
+        len(parallel.books)
+        results["workers"] = parallel.parallel_scanner.workers
+        try:
+            start = time.perf_counter()
+            parallel.find_books("title", "снимок")
+            results["snapshot_s"] = round(time.perf_counter() - start, 3)
+
+            for field, terms in search_terms.items():
+                for mode, library in (("serial", serial), ("parallel", parallel)):
+                    term_iter = iter(terms)
+                    results[f"search_{field}_{mode}"] = summarize(
+                        timed(lambda: library.find_books(field, next(term_iter)), len(terms))
+                    )
+                if terms:
+                    results[f"search_{field}_speedup"] = round(
+                        results[f"search_{field}_serial"]["p50_ms"] / results[f"search_{field}_parallel"]["p50_ms"], 2
+                    )
+        finally:
+            parallel.close()
+    return results
+
+
+def benchmark_sharded(size: int, seed: int = 0, operations: int = 100) -> dict[str, Any]:
+    """
+    Сравнивает один файл books.json и сегментированное хранилище: время запуска (создание Library и вывод
+    первой страницы), время изменения статуса и удаления книги в только что созданной библиотеке
+    и объем данных, записываемых при одном изменении.
+    :param operations: Количество изменений статуса и удалений.
+    """
+    rng = random.Random(seed)
+    books = generate_books(size, seed)
+    sample = rng.sample(books, min(operations, size))
+    book_ids = [book["id"] for book in sample]
+    other_statuses = {book["id"]: _other_status(Book.from_dict(book)) for book in sample}
+    results: dict[str, Any] = {"benchmark": "sharded", "size": size}
+    with tempfile.TemporaryDirectory() as temp_dir, open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for storage in ("json", "sharded"):
+            data_manager = create_data_manager(
+                argparse.Namespace(storage=storage, file=Path(temp_dir) / storage, compression=None, shard_size=None)
+            )
+            data_manager.save_books(books)
+            results[storage] = {
+                "startup": summarize(timed(lambda: Library(data_manager).display_books(), 3)),
+            }
+
+            def mutate(action: Callable[[Library, str], Any]) -> dict[str, Any]:
+                """Выполняет изменение в новой библиотеке (каталог не загружен) для каждой выбранной книги."""
+                id_iter = iter(book_ids)
+                METRICS.reset()
+                METRICS.enable()
+                try:
+                    latencies = timed(lambda: action(Library(data_manager), next(id_iter)), len(book_ids))
+                    written = METRICS.counters.get("data_manager.bytes_written", 0)
+                finally:
+                    METRICS.disable()
+                return {**summarize(latencies), "kb_written_per_change": round(written / len(book_ids) / 1024, 1)}
+
+            results[storage]["change_status"] = mutate(
+                lambda library, book_id: library.set_status(book_id, other_statuses[book_id])
+            )
+            results[storage]["delete_book"] = mutate(lambda library, book_id: library.remove_book(book_id))
+    return results
+
+
+BENCHMARKS = {
+    "memory": benchmark_memory,
+    "startup": benchmark_startup,
+    "operations": benchmark_operations,
+    "server": benchmark_server,
+    "compression": benchmark_compression,
+    "parallel": benchmark_parallel,
+    "sharded": benchmark_sharded,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замеры производительности библиотеки")
+    parser.add_argument("benchmark", choices=BENCHMARKS, help="Название замера")
+    parser.add_argument(
+        "--size", type=int, nargs="+", default=list(BENCHMARK_SIZES),
+        help="Количество книг в каталоге (можно указать несколько размеров)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора случайных чисел")
+    parser.add_argument("--operations", type=int, default=100, help="Количество выполнений каждой операции")
+    parser.add_argument("--storage", choices=("json", "journal", "sqlite", "binary", "sharded"), default="json", help="Способ хранения")
+    parser.add_argument("--search-index", action="store_true", help="Строить триграммный индекс для поиска")
+    parser.add_argument("--clients", type=int, default=16, help="Количество одновременных клиентов сервера")
+    parser.add_argument("--workers", type=int, default=0, help="Количество процессов для параллельного поиска")
+    parser.add_argument("--output", type=Path, help="Файл для сохранения результатов в формате JSON")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.size:
+        if args.benchmark == "operations":
+            result = benchmark_operations(size, args.seed, args.operations, args.storage, args.search_index)
+        elif args.benchmark == "server":
+            result = benchmark_server(
+                size, args.seed, args.operations, args.storage, args.search_index, args.clients
+            )
+        elif args.benchmark == "sharded":
+            result = benchmark_sharded(size, args.seed, args.operations)
+        elif args.benchmark == "parallel":
+            result = benchmark_parallel(size, args.seed, args.operations, args.workers)
+        else:
+            result = BENCHMARKS[args.benchmark](size, args.seed)
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False, indent=4))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=4), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
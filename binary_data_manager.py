@@ -0,0 +1,210 @@
+import argparse
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from data_manager import DataManager, write_atomic
+from indexes import normalize_text
+from metrics import instrumented
+from validators import VALID_STATUSES
+
+# Формат файла (все числа - little-endian):
+#   заголовок: сигнатура, версия, количество книг, количество строк, смещение таблицы строк;
+#   записи книг фиксированной длины, отсортированные по ID: ID, индекс названия и индекс автора
+#   в таблице строк, год издания, код статуса;
+#   таблица строк: смещения (количество строк + 1) и строки в UTF-8 подряд.
+MAGIC = b"LIBB"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxIIQ")
+RECORD = struct.Struct("<IIIHBx")
+OFFSET = struct.Struct("<Q")
+SEARCH_FIELDS = ("title", "author", "year")
+
+
+class BinaryDataManager(DataManager):
+    """
+    Менеджер данных, хранящий снимок каталога в компактном бинарном формате.
+    Файл читается через mmap: отдельные книги и результаты поиска декодируются по требованию,
+    поэтому библиотеке не нужно разбирать весь каталог при запуске.
+    Изменения сохраняются перезаписью всего снимка (через временный файл с fsync и атомарную замену, см. write_atomic).
+    """
+    def __init__(self, file_path: Path = Path("books.bin")):
+        super().__init__(file_path)
+        # Отображение файла в память, его заголовок и (st_ino, st_mtime_ns, st_size) отображенного файла.
+        self._map: Optional[mmap.mmap] = None
+        self._header: Optional[tuple] = None
+        self._map_key: Optional[tuple] = None
+
+    def _mapping(self) -> Optional[tuple[mmap.mmap, tuple]]:
+        """
+        Возвращает отображение файла в память и его заголовок (количество книг, количество строк, смещение
+        таблицы строк) или None, если файла нет или он пуст. Если другой процесс заменил файл,
+        файл отображается заново. Отображение и заголовок возвращаются вместе, поэтому вызывающий код
+        работает с одной версией файла, даже если файл заменяют во время чтения.
+        """
+        try:
+            with self.file_path.open("rb") as file:
+                info = os.fstat(file.fileno())
+                key = (info.st_ino, info.st_mtime_ns, info.st_size)
+                if key != self._map_key:
+                    self._map = self._header = self._map_key = None
+                    if info.st_size < HEADER.size:
+                        return None
+                    mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                    magic, version, book_count, string_count, strings_offset = HEADER.unpack_from(mapping, 0)
+                    if magic != MAGIC or version != VERSION:
+                        raise ValueError(f"Файл {self.file_path} не является бинарным снимком библиотеки")
+                    self._map, self._header = mapping, (book_count, string_count, strings_offset)
+                    self._map_key = key
+        except FileNotFoundError:
+            self._map = self._header = self._map_key = None
+        if self._map is None:
+            return None
+        return self._map, self._header
+
+    @staticmethod
+    def _string(mapping: mmap.mmap, header: tuple, index: int) -> str:
+        """Декодирует строку с номером index из таблицы строк."""
+        _, string_count, strings_offset = header
+        start, end = struct.unpack_from("<QQ", mapping, strings_offset + OFFSET.size * index)
+        data_offset = strings_offset + OFFSET.size * (string_count + 1)
+        return mapping[data_offset + start:data_offset + end].decode("utf-8")
+
+    def _to_dict(self, mapping: mmap.mmap, header: tuple, record: tuple) -> dict[str, Any]:
+        book_id, title, author, year, status = record
+        return {
+            "id": str(book_id),
+            "title": self._string(mapping, header, title),
+            "author": self._string(mapping, header, author),
+            "year": year,
+            "status": VALID_STATUSES[status],
+        }
+
+    @staticmethod
+    def _records(mapping: mmap.mmap, header: tuple) -> Iterator[tuple]:
+        book_count = header[0]
+        return RECORD.iter_unpack(mapping[HEADER.size:HEADER.size + RECORD.size * book_count])
+
+    def iter_books(self) -> Iterator[dict[str, Any]]:
+        """Последовательно выгружает книги из снимка в порядке ID."""
+        # Версия читается до данных: если файл успеют заменить, версия окажется устаревшей, а не наоборот.
+        self.version = self._read_version()
+        snapshot = self._mapping()
+        if snapshot is None:
+            return
+        mapping, header = snapshot
+        for record in self._records(mapping, header):
+            yield self._to_dict(mapping, header, record)
+
+    @instrumented("binary.save_books")
+    def save_books(self, books: list[dict[str, Any]]) -> None:
+        """Записывает снимок каталога атомарно (write_atomic) под блокировкой."""
+        strings: dict[str, int] = {}
+        records = []
+        for book in sorted(books, key=lambda book: int(book["id"])):
+            title = strings.setdefault(book["title"], len(strings))
+            author = strings.setdefault(book["author"], len(strings))
+            records.append(RECORD.pack(
+                int(book["id"]), title, author, int(book["year"]), VALID_STATUSES.index(book["status"])
+            ))
+
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        strings_offset = HEADER.size + RECORD.size * len(records)
+
+        chunks = (
+            HEADER.pack(MAGIC, VERSION, len(records), len(encoded), strings_offset),
+            b"".join(records),
+            b"".join(OFFSET.pack(offset) for offset in offsets),
+            b"".join(encoded),
+        )
+        with self.lock():
+            write_atomic(self.file_path, chunks, binary=True)
+            self._bump_version()
+
+    def load_next_id(self) -> int:
+        """Возвращает следующий свободный ID с учетом ID уже удаленных книг."""
+        snapshot = self._mapping()
+        max_id = 0
+        if snapshot is not None and snapshot[1][0]:
+            mapping, header = snapshot
+            max_id = RECORD.unpack_from(mapping, HEADER.size + RECORD.size * (header[0] - 1))[0]
+        return max(super().load_next_id(), max_id + 1)
+
+    @instrumented("binary.get_book")
+    def get_book(self, book_id: str) -> Optional[dict[str, Any]]:
+        """Находит книгу двоичным поиском по отсортированным записям, не декодируя остальные."""
+        snapshot = self._mapping() if book_id.isdigit() else None
+        if snapshot is None:
+            return None
+
+        mapping, header = snapshot
+        target = int(book_id)
+        low, high = 0, header[0]
+        while low < high:
+            middle = (low + high) // 2
+            record = RECORD.unpack_from(mapping, HEADER.size + RECORD.size * middle)
+            if record[0] == target:
+                return self._to_dict(mapping, header, record)
+            if record[0] < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    @instrumented("binary.search_books")
+    def search_books(self, search_type: str, search_term: str) -> list[dict[str, Any]]:
+        """
+        Возвращает книги, у которых нормализованное значение выбранного параметра содержит значение для поиска.
+        Каждая строка таблицы строк и каждый год проверяются один раз, полностью декодируются только найденные книги.
+        :param search_type: Параметр поиска ('title', 'author' или 'year').
+        :param search_term: Значение для поиска в выбранном параметре.
+        """
+        if search_type not in SEARCH_FIELDS:
+            raise ValueError(f"Неизвестный параметр поиска: {search_type}")
+        snapshot = self._mapping()
+        if snapshot is None:
+            return []
+
+        mapping, header = snapshot
+        search_term = normalize_text(search_term)
+        field = {"title": 1, "author": 2, "year": 3}[search_type]
+        matches: dict[int, bool] = {}
+        result = []
+        for record in self._records(mapping, header):
+            value = record[field]
+            matched = matches.get(value)
+            if matched is None:
+                text = str(value) if search_type == "year" else self._string(mapping, header, value)
+                matched = matches[value] = search_term in normalize_text(text)
+            if matched:
+                result.append(self._to_dict(mapping, header, record))
+        return result
+
+
+def convert(source: Path, target: Path) -> int:
+    """
+    Переносит каталог между форматами books.json и бинарным снимком.
+    Формат определяется по расширению: .bin - бинарный снимок, иначе - JSON.
+    :return: Количество перенесенных книг.
+    """
+    def manager(path: Path) -> DataManager:
+        return BinaryDataManager(path) if path.suffix == ".bin" else DataManager(path)
+
+    source_manager, target_manager = manager(source), manager(target)
+    books = source_manager.load_books()
+    target_manager.save_books(books)
+    target_manager.save_next_id(source_manager.load_next_id())
+    return len(books)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Преобразование каталога между books.json и бинарным снимком (.bin)")
+    parser.add_argument("source", type=Path, help="Исходный файл (.json или .bin)")
+    parser.add_argument("target", type=Path, help="Файл результата (.json или .bin)")
+    args = parser.parse_args()
+    print(f"Перенесено книг: {convert(args.source, args.target)}")
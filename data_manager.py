@@ -1,24 +1,423 @@
+import gzip
 import json
-from typing import Any
+import lzma
+import os
+import re
+import stat
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional, Union
 from pathlib import Path
 
+from metrics import METRICS, instrumented
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка файла между процессами недоступна
+    fcntl = None
+
+READ_CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Способы сжатия файла базы данных и расширения файлов, по которым способ сжатия выбирается автоматически.
+COMPRESSION_CODECS = {"gzip": gzip.open, "lzma": lzma.open}
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".xz": "lzma", ".lzma": "lzma"}
+# Уровни сжатия по умолчанию (gzip 9 и lzma 6) в несколько раз медленнее при выигрыше в размере на 10-20%.
+COMPRESSION_OPTIONS = {"gzip": {"compresslevel": 6}, "lzma": {"preset": 3}}
+# Ошибки, которые выбрасывают gzip и lzma при чтении поврежденного или недописанного файла.
+COMPRESSION_ERRORS = (OSError, EOFError, lzma.LZMAError)
+# Права нового файла, как у open(): 0o666 с учетом umask (mkstemp создает файл с правами 0o600).
+# Umask читается один раз при импорте: os.umask меняет его сразу для всех потоков процесса.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+def write_atomic(
+        path: Path,
+        content: Union[str, bytes, Iterable[str], Iterable[bytes]],
+        compression: Optional[str] = None,
+        binary: bool = False,
+) -> None:
+    """
+    Записывает файл атомарно: данные пишутся во временный файл в том же каталоге, который затем заменяет исходный.
+    Читатели, открывшие файл в любой момент, видят либо старую, либо новую версию целиком.
+    :param content: Строка или последовательность частей текста, которые записываются по мере получения.
+    :param compression: Способ сжатия ('gzip', 'lzma') или None - без сжатия.
+    :param binary: Содержимое - байты (bytes или последовательность частей bytes), а не текст.
+    """
+    chunks = [content] if isinstance(content, (str, bytes)) else content
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb" if compression or binary else "w") as file:
+            if compression:
+                codec = COMPRESSION_CODECS[compression]
+                with codec(file, "wt", encoding="utf-8", **COMPRESSION_OPTIONS[compression]) as stream:
+                    stream.writelines(chunks)
+            else:
+                file.writelines(chunks)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_name, stat.S_IMODE(path.stat().st_mode) if path.exists() else NEW_FILE_MODE)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
 
 class DataManager:
-    def __init__(self, file_path: Path = Path("books.json") ):
+    """
+    Менеджер данных для хранения книг в файле JSON.
+    Файл может храниться сжатым (gzip или lzma): способ сжатия задается параметром compression или выбирается
+    по расширению файла (.gz, .xz, .lzma). Сжатый файл читается и записывается потоково, без создания
+    полного несжатого текста в памяти.
+    Запись выполняется под блокировкой файла <имя>.lock и атомарной заменой файла, а каждая запись увеличивает
+    номер версии в файле <имя>.meta. Чтение не блокируется: по номеру версии можно узнать,
+    изменил ли данные другой процесс после загрузки (is_stale).
+    """
+    def __init__(self, file_path: Path = Path("books.json"), compression: Optional[str] = None):
         self.file_path = file_path
+        self.compression = compression or COMPRESSION_SUFFIXES.get(file_path.suffix)
+        if self.compression is not None and self.compression not in COMPRESSION_CODECS:
+            raise ValueError(f"Неизвестный способ сжатия: {self.compression}")
+        self.meta_path = file_path.with_name(f"{file_path.name}.meta")
+        self.lock_path = file_path.with_name(f"{file_path.name}.lock")
+        self.version: Optional[int] = None
+        self._lock_depth = 0
+        self._lock_file = None
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """
+        Монопольная блокировка хранилища для записи между процессами.
+        Повторный вход в блокировку этого же менеджера не ожидает ее освобождения.
+        """
+        if self._lock_depth == 0 and fcntl is not None:
+            self._lock_file = self.lock_path.open("a")
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0 and self._lock_file is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _read_meta(self) -> dict[str, Any]:
+        """Выгружает служебные данные хранилища (счетчик ID, номер версии)."""
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return meta if isinstance(meta, dict) else {}
+
+    def _write_meta(self, **fields: Any) -> None:
+        """Обновляет переданные поля служебных данных, сохраняя остальные."""
+        with self.lock():
+            meta = self._read_meta()
+            meta.update(fields)
+            write_atomic(self.meta_path, json.dumps(meta))
+
+    def _read_version(self) -> int:
+        """Выгружает номер версии данных (0, если данные еще не записывались)."""
+        try:
+            return int(self._read_meta().get("version", 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def _bump_version(self) -> None:
+        """Увеличивает номер версии после записи данных. Вызывается под блокировкой."""
+        self.version = self._read_version() + 1
+        self._write_meta(version=self.version)
 
+    def is_stale(self) -> bool:
+        """Проверяет, изменил ли данные другой процесс после их загрузки или записи этим менеджером."""
+        return self.version is not None and self._read_version() != self.version
+
+    @instrumented("data_manager.load_books")
     def load_books(self) -> list[dict[str, Any]]:
         """Выгружает все данные из файла базы данных."""
         try:
-            content = self.file_path.read_text()
-            if not content.strip():
-                return []
-            return json.loads(content)
-        except FileNotFoundError:
-            return []
+            return list(self.iter_books())
         except json.JSONDecodeError:
             return []
 
+    def iter_books(self, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict[str, Any]]:
+        """
+        Последовательно выгружает книги из файла базы данных, читая его блоками по chunk_size символов.
+        В памяти одновременно находятся только текущий блок и текущая книга.
+        При ошибке в данных выбрасывает json.JSONDecodeError (книги до ошибки уже будут выданы).
+        """
+        # Версия читается до данных: если данные успеют измениться, версия окажется устаревшей, а не наоборот.
+        self.version = self._read_version()
+        yield from self._iter_file(chunk_size)
+
+    def _iter_file(self, chunk_size: int) -> Iterator[dict[str, Any]]:
+        """Последовательно выгружает книги из файла базы данных (см. iter_books)."""
+        try:
+            if self.compression:
+                file = COMPRESSION_CODECS[self.compression](self.file_path, "rt", encoding="utf-8")
+            else:
+                file = self.file_path.open()
+        except FileNotFoundError:
+            return
+
+        def read(size: int) -> str:
+            """Читает следующий блок; ошибка распаковки считается ошибкой в данных."""
+            try:
+                return file.read(size)
+            except COMPRESSION_ERRORS as error:
+                raise json.JSONDecodeError(f"Поврежденный сжатый файл: {error}", "", 0) from error
+
+        decoder = json.JSONDecoder()
+        with file:
+            buffer = ""
+            position = 0
+            eof = False
+
+            def skip_whitespace() -> bool:
+                """Пропускает пробельные символы, при необходимости дочитывая файл. Возвращает False в конце файла."""
+                nonlocal buffer, position, eof
+                while True:
+                    position = WHITESPACE.match(buffer, position).end()
+                    if position < len(buffer):
+                        return True
+                    if eof:
+                        return False
+                    buffer = read(chunk_size)
+                    position = 0
+                    eof = not buffer
+
+            if not skip_whitespace():
+                return
+            if buffer[position] != "[":
+                raise json.JSONDecodeError("Ожидается список книг", buffer, position)
+            position += 1
+
+            if skip_whitespace() and buffer[position] == "]":
+                return
+
+            while True:
+                if not skip_whitespace():
+                    raise json.JSONDecodeError("Неожиданный конец файла", buffer, position)
+                while True:
+                    try:
+                        book, end = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                        end = None
+                    # Значение, закончившееся ровно на границе блока, может быть неполным (например, число).
+                    if end is not None and (end < len(buffer) or eof):
+                        break
+                    chunk = read(chunk_size)
+                    eof = not chunk
+                    buffer = buffer[position:] + chunk
+                    position = 0
+                position = end
+                yield book
+
+                if not skip_whitespace():
+                    raise json.JSONDecodeError("Неожиданный конец файла", buffer, position)
+                if buffer[position] == "]":
+                    return
+                if buffer[position] != ",":
+                    raise json.JSONDecodeError("Ожидается ',' или ']'", buffer, position)
+                position += 1
+
+    @instrumented("data_manager.save_books")
+    def save_books(self, books: list[dict[str, Any]]) -> None:
+        """
+        Сохраняет полученные данные в файл базы данных (атомарно, под блокировкой) и увеличивает номер версии.
+        Сжатый файл записывается потоково, по одной книге в строке; сериализация при этом входит во время записи.
+        """
+        if self.compression:
+            content = self._iter_compact_json(books)
+        else:
+            with METRICS.timer("data_manager.save_books.serialize"):
+                content = json.dumps(books, indent=4, ensure_ascii=False)
+        with self.lock():
+            with METRICS.timer("data_manager.save_books.write"):
+                write_atomic(self.file_path, content, self.compression)
+            self._bump_version()
+        if METRICS.enabled:
+            METRICS.increment("data_manager.bytes_written", self.file_path.stat().st_size)
+
+    @staticmethod
+    def _iter_compact_json(books: list[dict[str, Any]]) -> Iterator[str]:
+        """Последовательно сериализует список книг в JSON по одной книге в строке."""
+        yield "["
+        for number, book in enumerate(books):
+            yield ("\n" if number == 0 else ",\n") + json.dumps(book, ensure_ascii=False)
+        yield "\n]\n"
+
+    def load_next_id(self) -> int:
+        """Выгружает сохраненное значение счетчика ID (0, если счетчик еще не сохранялся)."""
+        try:
+            return int(self._read_meta()["next_id"])
+        except (KeyError, TypeError, ValueError):
+            return 0
+
+    def save_next_id(self, next_id: int) -> None:
+        """Сохраняет значение счетчика ID, чтобы ID удаленных книг не использовались повторно."""
+        self._write_meta(next_id=next_id)
+
+
+class JournalDataManager(DataManager):
+    """
+    Менеджер данных с журналом изменений.
+    Каждое изменение (добавление, удаление, смена статуса) дописывается в конец журнала
+    отдельной короткой записью, а основной файл базы данных служит снимком.
+    При накоплении compact_threshold записей журнал сворачивается в новый снимок.
+    """
+    def __init__(
+            self,
+            file_path: Path = Path("books.json"),
+            journal_path: Optional[Path] = None,
+            compact_threshold: int = 1000,
+            compression: Optional[str] = None,
+    ):
+        super().__init__(file_path, compression)
+        self.journal_path = journal_path or file_path.with_name(f"{file_path.name}.journal")
+        self.compact_threshold = compact_threshold
+        self._journal_size: Optional[int] = None
+
+    def _read_journal(self) -> list[dict[str, Any]]:
+        """Читает записи журнала. Поврежденные строки (например, недописанная последняя) пропускаются."""
+        try:
+            lines = self.journal_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return []
+
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records
+
+    @staticmethod
+    def _journal_changes(records: list[dict[str, Any]]) -> tuple[dict[str, Optional[dict[str, Any]]], dict[str, str]]:
+        """
+        Сворачивает записи журнала в итоговые изменения.
+        :return: Словарь {id: книга или None для удаленных} для добавленных и удаленных книг
+        и словарь {id: статус} для изменения статуса книг из снимка.
+        """
+        replaced: dict[str, Optional[dict[str, Any]]] = {}
+        statuses: dict[str, str] = {}
+        for record in records:
+            action = record.get("action")
+            if action == "add":
+                replaced[record["book"]["id"]] = record["book"]
+                statuses.pop(record["book"]["id"], None)
+            elif action == "delete":
+                replaced[record["id"]] = None
+                statuses.pop(record["id"], None)
+            elif action == "status":
+                if record["id"] not in replaced:
+                    statuses[record["id"]] = record["status"]
+                elif replaced[record["id"]] is not None:
+                    replaced[record["id"]]["status"] = record["status"]
+        return replaced, statuses
+
+    def iter_books(self, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict[str, Any]]:
+        """Последовательно выгружает книги из снимка, применяя к ним записи журнала."""
+        self.version = self._read_version()
+        records = self._read_journal()
+        self._journal_size = len(records)
+        replaced, statuses = self._journal_changes(records)
+
+        emitted = set()
+        for book in self._iter_file(chunk_size):
+            book_id = book["id"]
+            if book_id in replaced:
+                book = replaced[book_id]
+                emitted.add(book_id)
+                if book is None:
+                    continue
+            elif book_id in statuses:
+                book["status"] = statuses[book_id]
+            yield book
+
+        for book_id, book in replaced.items():
+            if book is not None and book_id not in emitted:
+                yield book
+
     def save_books(self, books: list[dict[str, Any]]) -> None:
-        """Сохраняет полученные данные в файл базы данных."""
-        self.file_path.write_text(json.dumps(books, indent=4, ensure_ascii=False))
\ No newline at end of file
+        """Сохраняет полный снимок данных и очищает журнал."""
+        with self.lock():
+            super().save_books(books)
+            self.journal_path.write_text("", encoding="utf-8")
+            self._journal_size = 0
+
+    @staticmethod
+    def _journal_record(action: str, book: dict[str, Any]) -> dict[str, Any]:
+        """Формирует запись журнала для одного изменения."""
+        if action == "add":
+            return {"action": action, "book": book}
+        if action == "delete":
+            return {"action": action, "id": book["id"]}
+        if action == "status":
+            return {"action": action, "id": book["id"], "status": book["status"]}
+        raise ValueError(f"Неизвестный тип изменения: {action}")
+
+    @instrumented("journal.save_changes")
+    def save_changes(self, changes: list[tuple[str, dict[str, Any]]]) -> None:
+        """
+        Дописывает в журнал изменения одной операцией записи (под блокировкой, с fsync) и увеличивает номер версии.
+        :param changes: Список пар (тип изменения - 'add', 'delete' или 'status', данные измененной книги).
+        """
+        records = "".join(
+            json.dumps(self._journal_record(action, book), ensure_ascii=False) + "\n" for action, book in changes
+        )
+        data = records.encode("utf-8")
+        with self.lock():
+            with self.journal_path.open("a+b") as journal:
+                # Недописанная последняя строка (сбой во время записи) отделяется переводом строки,
+                # иначе новая запись склеится с ней и будет пропущена при чтении журнала вместе с ней.
+                if journal.seek(0, os.SEEK_END):
+                    journal.seek(-1, os.SEEK_END)
+                    if journal.read(1) != b"\n":
+                        data = b"\n" + data
+                journal.write(data)
+                journal.flush()
+                os.fsync(journal.fileno())
+            self._bump_version()
+            if METRICS.enabled:
+                METRICS.increment("data_manager.bytes_written", len(data))
+
+            if self._journal_size is None:
+                self._journal_size = len(self._read_journal())
+            else:
+                self._journal_size += len(changes)
+
+            if self._journal_size >= self.compact_threshold:
+                try:
+                    self.compact()
+                except ValueError:
+                    # Изменения уже записаны в журнал, а поврежденный снимок остается как есть.
+                    METRICS.increment("journal.compact_errors")
+
+    def save_change(self, action: str, book: dict[str, Any]) -> None:
+        """
+        Дописывает в журнал одно изменение.
+        :param action: Тип изменения - 'add', 'delete' или 'status'.
+        :param book: Данные измененной книги.
+        """
+        self.save_changes([(action, book)])
+
+    @instrumented("journal.compact")
+    def compact(self) -> None:
+        """
+        Сворачивает журнал: записывает актуальное состояние в снимок и очищает журнал.
+        Если снимок не удается разобрать, сворачивание не выполняется (ValueError): иначе поврежденный снимок
+        был бы заменен пустым каталогом.
+        """
+        with self.lock():
+            try:
+                books = list(self.iter_books())
+            except json.JSONDecodeError as error:
+                raise ValueError(f"Снимок {self.file_path} поврежден, журнал не свернут") from error
+            self.save_books(books)
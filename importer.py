@@ -0,0 +1,121 @@
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from library import Library
+from validators import is_not_empty, is_valid_year
+
+IMPORT_FIELDS = ("title", "author", "year")
+IMPORT_SUFFIXES = (".csv", ".jsonl", ".ndjson")
+
+# Заголовки колонок можно указывать как на английском, так и на русском языке.
+FIELD_ALIASES = {
+    "title": "title",
+    "author": "author",
+    "year": "year",
+    "название": "title",
+    "автор": "author",
+    "год": "year",
+}
+
+
+@dataclass
+class ImportReport:
+    """Итоги импорта книг из файла."""
+    total: int = 0
+    imported: int = 0
+    rejected: list[tuple[int, str]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        """Возвращает текстовый отчет об импорте."""
+        lines = [
+            f"Обработано строк: {self.total}, импортировано книг: {self.imported}, "
+            f"отклонено строк: {len(self.rejected)}.",
+            f"Время импорта: {self.elapsed:.2f} с ({self.rows_per_second:.0f} строк/с).",
+        ]
+        lines.extend(f"Строка {line_number}: {reason}" for line_number, reason in self.rejected)
+        return "\n".join(lines)
+
+
+def is_supported_file(value: str) -> bool:
+    """Проверяет, что файл существует и имеет поддерживаемый формат (CSV или JSONL)"""
+    file_path = Path(value)
+    return file_path.suffix.lower() in IMPORT_SUFFIXES and file_path.is_file()
+
+
+def read_rows(file_path: Path) -> Iterator[tuple[int, Optional[dict[str, Any]]]]:
+    """
+    Последовательно читает строки каталога из файла CSV (с заголовком) или JSONL.
+    :return: Пары (номер строки в файле, данные строки); для строк JSONL, которые не удалось разобрать, - None.
+    """
+    suffix = file_path.suffix.lower()
+    with file_path.open(encoding="utf-8-sig", newline="") as file:
+        if suffix == ".csv":
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+        elif suffix in IMPORT_SUFFIXES:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    row = None
+                yield line_number, row if isinstance(row, dict) else None
+        else:
+            raise ValueError(f"Неподдерживаемый формат файла: {file_path.suffix}")
+
+
+def validate_row(row: Optional[dict[str, Any]]) -> tuple[Optional[tuple[str, str, str]], Optional[str]]:
+    """
+    Проверяет строку каталога по тем же правилам, что и ввод пользователя.
+    :return: Пара (название, автор, год) и None или None и причина отклонения строки.
+    """
+    if row is None:
+        return None, "строка не является объектом JSON"
+
+    values = {FIELD_ALIASES[key.strip().lower()]: value for key, value in row.items()
+              if isinstance(key, str) and key.strip().lower() in FIELD_ALIASES}
+    title, author, year = (str(values.get(name) or "").strip() for name in IMPORT_FIELDS)
+
+    if not is_not_empty(title):
+        return None, "не указано название книги"
+    if not is_not_empty(author):
+        return None, "не указан автор книги"
+    if not is_valid_year(year):
+        return None, f"некорректный год издания '{year}'"
+    return (title, author, year), None
+
+
+def import_books(library: Library, file_path: Path, chunk_size: Optional[int] = None) -> ImportReport:
+    """
+    Импортирует книги из файла CSV или JSONL в библиотеку, читая файл построчно.
+    Корректные строки добавляются пакетно через Library.add_books, отклоненные попадают в отчет.
+    :param library: Библиотека, в которую добавляются книги.
+    :param file_path: Путь к файлу каталога.
+    :param chunk_size: Количество книг, после добавления которых изменения сохраняются (по умолчанию - один раз в конце).
+    """
+    report = ImportReport()
+
+    def valid_books() -> Iterator[tuple[str, str, str]]:
+        for line_number, row in read_rows(file_path):
+            report.total += 1
+            book, error = validate_row(row)
+            if error:
+                report.rejected.append((line_number, error))
+                continue
+            yield book
+
+    start = time.perf_counter()
+    report.imported = library.add_books(valid_books(), chunk_size)
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,454 @@
+import heapq
+import re
+import string
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Iterable, Optional
+
+from metrics import METRICS
+
+SEARCH_FIELDS = ("title", "author", "year")
+# Поля, по словам которых выполняется поиск с опечатками.
+FUZZY_FIELDS = ("title", "author")
+# Знаки препинания (включая типографские кавычки и тире) при нормализации заменяются пробелами:
+# последовательности знаков препинания и пробелов заменяются одним пробелом. Остальные символы
+# (буквы, цифры, диакритические знаки, символы вроде © и эмодзи) сохраняются.
+_SEPARATORS = re.compile("[" + re.escape(string.punctuation + "«»„“”‘’—–…№") + r"\s]+")
+
+
+def normalize_text(value: Any) -> str:
+    """
+    Приводит значение к ключу поиска: без учета регистра (casefold), 'ё' заменяется на 'е',
+    знаки препинания - на пробелы, последовательности пробелов сокращаются до одного.
+    """
+    return _SEPARATORS.sub(" ", str(value).casefold().replace("ё", "е")).strip()
+
+
+def edit_distance(first: str, second: str, limit: int) -> int:
+    """
+    Вычисляет расстояние Левенштейна между строками, прекращая вычисление, как только оно превышает limit.
+    :return: Расстояние или limit + 1, если расстояние больше limit.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, start=1):
+        current = [i]
+        for j, second_char in enumerate(second, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (first_char != second_char),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class TrigramIndex:
+    """
+    Инвертированный индекс по n-граммам (по умолчанию - триграммам) для поиска подстроки в полях книг.
+    Для каждого поля хранит соответствие n-грамма -> множество ID книг, в нормализованном значении поля которых
+    (см. normalize_text) встречается эта n-грамма.
+    """
+    def __init__(self, fields: Iterable[str] = SEARCH_FIELDS, n: int = 3):
+        self.n = n
+        self._postings: dict[str, defaultdict[str, set[str]]] = {field: defaultdict(set) for field in fields}
+
+    def _ngrams(self, value: str) -> set[str]:
+        """Возвращает множество n-грамм строки."""
+        return {value[i:i + self.n] for i in range(len(value) - self.n + 1)}
+
+    def _field_ngrams(self, book: Any, field: str) -> set[str]:
+        return self._ngrams(normalize_text(getattr(book, field)))
+
+    def add(self, book: Any) -> None:
+        """Добавляет книгу в индекс."""
+        for field, postings in self._postings.items():
+            for ngram in self._field_ngrams(book, field):
+                postings[ngram].add(book.id)
+
+    def remove(self, book: Any) -> None:
+        """Удаляет книгу из индекса."""
+        for field, postings in self._postings.items():
+            for ngram in self._field_ngrams(book, field):
+                ids = postings.get(ngram)
+                if ids is None:
+                    continue
+                ids.discard(book.id)
+                if not ids:
+                    del postings[ngram]
+
+    def update_status(self, book: Any, old_status: str) -> None:
+        """Статус не участвует в поиске по подстроке, индекс не меняется."""
+
+    def candidates(self, field: str, term: str) -> Optional[set[str]]:
+        """
+        Возвращает ID книг, которые могут содержать подстроку term (нормализованную) в поле field.
+        Результат требует проверки: совпадение всех n-грамм не гарантирует вхождение подстроки.
+        :return: Множество ID или None, если индекс не может ответить на запрос
+        (поле не индексируется или подстрока короче n символов).
+        """
+        postings = self._postings.get(field)
+        if postings is None or len(term) < self.n:
+            return None
+
+        posting_lists = []
+        for ngram in self._ngrams(term):
+            ids = postings.get(ngram)
+            if not ids:
+                return set()
+            posting_lists.append(ids)
+
+        posting_lists.sort(key=len)
+        result = set(posting_lists[0])
+        for ids in posting_lists[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+
+class SortedIndex:
+    """
+    Упорядоченный индекс по значению поля книги: отсортированный список пар (ключ, ID).
+    Позволяет за O(log n + k) выбирать книги с ключом в заданном диапазоне или с заданным началом строки.
+    """
+    def __init__(self, field: str, key: Callable[[Any], Any] = lambda value: value):
+        self.field = field
+        self._key = key
+        self._entries: list[tuple[Any, int]] = []
+
+    def _entry(self, book: Any) -> tuple[Any, int]:
+        return self._key(getattr(book, self.field)), int(book.id)
+
+    def build(self, books: Iterable[Any]) -> None:
+        """Строит индекс по всем книгам каталога."""
+        self._entries = sorted(self._entry(book) for book in books)
+
+    def add(self, book: Any) -> None:
+        insort(self._entries, self._entry(book))
+
+    def remove(self, book: Any) -> None:
+        entry = self._entry(book)
+        position = bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def update_status(self, book: Any, old_status: str) -> None:
+        """Статус не входит в ключ индекса, индекс не меняется."""
+
+    def _bounds(self, low: Any, high: Any, prefix: Optional[str]) -> tuple[int, int]:
+        if prefix is not None:
+            start = bisect_left(self._entries, (prefix,))
+            end = bisect_left(self._entries, (prefix + "\U0010ffff",))
+            return start, end
+        start = 0 if low is None else bisect_left(self._entries, (low,))
+        end = len(self._entries) if high is None else bisect_right(self._entries, (high, float("inf")))
+        return start, end
+
+    def count(self, low: Any = None, high: Any = None, prefix: Optional[str] = None) -> int:
+        """Возвращает количество книг в диапазоне [low, high] (или с ключом, начинающимся с prefix) за O(log n)."""
+        start, end = self._bounds(low, high, prefix)
+        return max(end - start, 0)
+
+    def ids(self, low: Any = None, high: Any = None, prefix: Optional[str] = None) -> Iterable[int]:
+        """Возвращает ID книг в диапазоне [low, high] (или с ключом, начинающимся с prefix) в порядке ключа."""
+        start, end = self._bounds(low, high, prefix)
+        return (book_id for _, book_id in self._entries[start:end])
+
+
+class SearchCache:
+    """
+    Ограниченный LRU-кэш результатов поиска по подстроке с ключом (параметр поиска, нормализованное значение).
+    При изменении книги удаляются только те записи, результат которых может измениться:
+    записи, значение поиска которых встречается в соответствующем поле этой книги.
+    """
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[str, str], list[Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, search_type: str, search_term: str) -> Optional[list[Any]]:
+        """Возвращает копию сохраненного результата или None, если результата нет в кэше."""
+        key = (search_type, search_term)
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            METRICS.increment("search_cache.misses")
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        METRICS.increment("search_cache.hits")
+        return list(result)
+
+    def put(self, search_type: str, search_term: str, result: list[Any]) -> None:
+        """
+        Сохраняет результат поиска, вытесняя самую давно использованную запись при переполнении.
+        :param search_term: Нормализованное значение поиска (см. normalize_text).
+        """
+        if self.max_size <= 0:
+            return
+        self._entries[(search_type, search_term)] = list(result)
+        self._entries.move_to_end((search_type, search_term))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            METRICS.increment("search_cache.evictions")
+
+    def invalidate(self, book: Any) -> None:
+        """
+        Удаляет записи, в результат которых входит (или должна входить) переданная книга.
+        Ключи записей хранят уже нормализованное значение поиска, а поля книги нормализуются
+        по одному разу на вызов, а не для каждой записи кэша.
+        """
+        values = {field: normalize_text(getattr(book, field)) for field in {key[0] for key in self._entries}}
+        stale = [key for key in self._entries if key[1] in values[key[0]]]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Возвращает счетчики попаданий, промахов, вытеснений и инвалидаций кэша."""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class StatusIndex:
+    """
+    Индекс по статусу: множество ID книг для каждого статуса.
+    Количество книг с заданным статусом возвращается за O(1), список их ID - за O(k).
+    """
+    def __init__(self):
+        self._ids: defaultdict[str, set[str]] = defaultdict(set)
+
+    def add(self, book: Any) -> None:
+        self._ids[book.status].add(book.id)
+
+    def remove(self, book: Any) -> None:
+        self._ids[book.status].discard(book.id)
+
+    def update_status(self, book: Any, old_status: str) -> None:
+        self._ids[old_status].discard(book.id)
+        self._ids[book.status].add(book.id)
+
+    def count(self, status: str) -> int:
+        """Возвращает количество книг с переданным статусом."""
+        return len(self._ids.get(status, ()))
+
+    def ids(self, status: str) -> list[str]:
+        """Возвращает ID книг с переданным статусом в порядке возрастания."""
+        return sorted(self._ids.get(status, ()), key=int)
+
+
+class SearchKeys:
+    """
+    Нормализованные значения полей поиска (см. normalize_text) для каждой книги каталога.
+    Вычисляются один раз при добавлении книги, поэтому поиск по подстроке не приводит значения
+    к нижнему регистру при каждом запросе.
+    """
+    def __init__(self, fields: Iterable[str] = SEARCH_FIELDS):
+        self._keys: dict[str, dict[str, str]] = {field: {} for field in fields}
+        # Авторы и годы повторяются у многих книг: их ключи вычисляются один раз и хранятся в одном экземпляре.
+        # Для каждого значения учитывается количество книг с ним, чтобы удалить ключ вместе с последней книгой.
+        self._shared: dict[str, dict[Any, str]] = {field: {} for field in fields if field != "title"}
+        self._references: dict[str, dict[Any, int]] = {field: {} for field in self._shared}
+
+    def add(self, book: Any) -> None:
+        for field, keys in self._keys.items():
+            value = getattr(book, field)
+            shared = self._shared.get(field)
+            if shared is None:
+                keys[book.id] = normalize_text(value)
+                continue
+            key = shared.get(value)
+            if key is None:
+                key = shared[value] = normalize_text(value)
+            keys[book.id] = key
+            references = self._references[field]
+            references[value] = references.get(value, 0) + 1
+
+    def remove(self, book: Any) -> None:
+        for field, keys in self._keys.items():
+            if keys.pop(book.id, None) is None or field not in self._shared:
+                continue
+            value = getattr(book, field)
+            references = self._references[field]
+            if references[value] > 1:
+                references[value] -= 1
+            else:
+                del references[value], self._shared[field][value]
+
+    def update_status(self, book: Any, old_status: str) -> None:
+        """Статус не участвует в поиске, ключи не меняются."""
+
+    def keys(self, field: str) -> dict[str, str]:
+        """Возвращает соответствие ID книги -> нормализованное значение поля."""
+        return self._keys[field]
+
+
+class FuzzyIndex:
+    """
+    Индекс для поиска с опечатками по словам полей книг (deletion-neighborhood).
+    Для каждого слова хранятся варианты, получаемые удалением не более max_distance символов: у слов
+    на расстоянии Левенштейна не больше max_distance есть общий вариант. Поэтому слова-кандидаты для запроса
+    находятся по вариантам слов запроса, а расстояние вычисляется только для них, а не для всего каталога.
+    Слова короче min_length ищутся только точно.
+    """
+    def __init__(self, fields: Iterable[str] = FUZZY_FIELDS, max_distance: int = 1, min_length: int = 4):
+        self.max_distance = max_distance
+        self.min_length = min_length
+        # Для каждого поля: слово -> ID книг и вариант с удаленными символами -> слова.
+        self._words: dict[str, defaultdict[str, set[str]]] = {field: defaultdict(set) for field in fields}
+        self._variants: dict[str, defaultdict[str, set[str]]] = {field: defaultdict(set) for field in fields}
+
+    def _distance(self, word: str) -> int:
+        """Допустимое количество опечаток в слове."""
+        return self.max_distance if len(word) >= self.min_length else 0
+
+    def _deletions(self, word: str) -> set[str]:
+        """Возвращает слово и все варианты, получаемые удалением из него не более _distance(word) символов."""
+        variants = frontier = {word}
+        for _ in range(self._distance(word)):
+            frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+            variants = variants | frontier
+        return variants
+
+    @staticmethod
+    def _book_words(book: Any, field: str) -> set[str]:
+        return set(normalize_text(getattr(book, field)).split())
+
+    def add(self, book: Any) -> None:
+        for field, words in self._words.items():
+            for word in self._book_words(book, field):
+                if word not in words:
+                    for variant in self._deletions(word):
+                        self._variants[field][variant].add(word)
+                words[word].add(book.id)
+
+    def remove(self, book: Any) -> None:
+        for field, words in self._words.items():
+            for word in self._book_words(book, field):
+                ids = words.get(word)
+                if ids is None:
+                    continue
+                ids.discard(book.id)
+                if ids:
+                    continue
+                del words[word]
+                variants = self._variants[field]
+                for variant in self._deletions(word):
+                    variants[variant].discard(word)
+                    if not variants[variant]:
+                        del variants[variant]
+
+    def update_status(self, book: Any, old_status: str) -> None:
+        """Статус не участвует в поиске, индекс не меняется."""
+
+    def similar_words(self, field: str, word: str) -> set[str]:
+        """Возвращает слова поля field, отличающиеся от нормализованного слова word не более чем на _distance(word)."""
+        limit = self._distance(word)
+        variants = self._variants[field]
+        candidates = {candidate for variant in self._deletions(word) for candidate in variants.get(variant, ())}
+        return {candidate for candidate in candidates if edit_distance(word, candidate, limit) <= limit}
+
+    def search(self, field: str, term: str) -> Optional[set[str]]:
+        """
+        Возвращает ID книг, в поле field которых для каждого слова запроса есть похожее слово.
+        :return: Множество ID или None, если поле не индексируется.
+        """
+        words = self._words.get(field)
+        if words is None:
+            return None
+        result: Optional[set[str]] = None
+        for query_word in set(normalize_text(term).split()):
+            ids = set()
+            for word in self.similar_words(field, query_word):
+                ids |= words[word]
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result or set()
+
+
+class CatalogStatistics:
+    """
+    Счетчики книг по авторам и десятилетиям, обновляемые при каждом изменении каталога.
+    Авторы дополнительно сгруппированы по количеству книг (упорядоченный список различных количеств
+    и множество авторов для каждого из них), поэтому первые N авторов выбираются без сортировки всех авторов.
+    """
+    def __init__(self):
+        self.authors: dict[str, int] = {}
+        self.decades: defaultdict[int, int] = defaultdict(int)
+        self._authors_by_count: dict[int, set[str]] = {}
+        self._counts: list[int] = []
+
+    @staticmethod
+    def decade(year: int) -> int:
+        """Возвращает первый год десятилетия, к которому относится год издания."""
+        return year // 10 * 10
+
+    def _move_author(self, author: str, old_count: int, new_count: int) -> None:
+        """Переносит автора из группы с old_count книгами в группу с new_count книгами (0 - нет группы)."""
+        if old_count:
+            group = self._authors_by_count[old_count]
+            group.discard(author)
+            if not group:
+                del self._authors_by_count[old_count]
+                del self._counts[bisect_left(self._counts, old_count)]
+        if new_count:
+            if new_count not in self._authors_by_count:
+                self._authors_by_count[new_count] = set()
+                insort(self._counts, new_count)
+            self._authors_by_count[new_count].add(author)
+            self.authors[author] = new_count
+        else:
+            del self.authors[author]
+
+    def add(self, book: Any) -> None:
+        count = self.authors.get(book.author, 0)
+        self._move_author(book.author, count, count + 1)
+        self.decades[self.decade(book.year)] += 1
+
+    def remove(self, book: Any) -> None:
+        count = self.authors.get(book.author, 0)
+        if count:
+            self._move_author(book.author, count, count - 1)
+        decade = self.decade(book.year)
+        self.decades[decade] -= 1
+        if self.decades[decade] <= 0:
+            del self.decades[decade]
+
+    def update_status(self, book: Any, old_status: str) -> None:
+        """Статус не влияет на счетчики по авторам и десятилетиям (количество по статусам ведет StatusIndex)."""
+
+    def top_authors(self, limit: int) -> list[tuple[str, int]]:
+        """Возвращает не более limit авторов с наибольшим количеством книг (при равенстве - по алфавиту)."""
+        result: list[tuple[str, int]] = []
+        for count in reversed(self._counts):
+            if len(result) >= limit:
+                break
+            group = self._authors_by_count[count]
+            # Из группы выбираются только недостающие авторы: O(размер группы * log limit), без сортировки группы.
+            result.extend((author, count) for author in heapq.nsmallest(limit - len(result), group))
+        return result
+
+    def decade_histogram(self) -> dict[int, int]:
+        """Возвращает количество книг по десятилетиям в порядке возрастания десятилетия."""
+        return dict(sorted(self.decades.items()))
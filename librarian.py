@@ -1,17 +1,38 @@
 from typing import Callable, Optional
+from pathlib import Path
 
-from library import Library
+from importer import import_books, is_supported_file
+from library import PAGE_SIZE, TOP_AUTHORS, Library
+from metrics import METRICS
+from query import BookQuery, parse_sort, parse_text_filter, parse_year_range
 from datetime import datetime
+from validators import (
+    VALID_SEARCH_TYPES,
+    VALID_STATUSES,
+    is_not_empty,
+    is_optional_positive_integer,
+    is_positive_integer,
+    is_valid_optional_status,
+    is_valid_search_type,
+    is_valid_sort,
+    is_valid_status,
+    is_valid_year,
+    is_valid_year_range,
+    is_valid_id_list,
+    parse_id_list,
+)
 
 CANCEL_WORD = "stop"
-VALID_SEARCH_TYPES = ["название", "автор", "год"]
-VALID_STATUSES = ["выдана", "в наличии"]
+NEXT_PAGE_WORDS = ("с", "n")
+PREVIOUS_PAGE_WORDS = ("п", "p")
 
 SEARCH_TYPES_MAPPING = {
     "название": "title",
     "автор": "author",
     "год": "year"
 }
+# Параметры поиска для команд сервера и сценариев: по-русски, как в меню, или названием поля книги.
+SEARCH_TYPES = {**SEARCH_TYPES_MAPPING, **{field: field for field in SEARCH_TYPES_MAPPING.values()}}
 
 def validate_input(
         prompt: str,
@@ -37,27 +58,6 @@ def validate_input(
 
         print(error_message)
 
-def is_not_empty(value: str) -> bool:
-    """Проверяет, что передана не пустая строка"""
-    return bool(value and value.strip())
-
-def is_valid_year(value: str) -> bool:
-    """Проверяет введенный год (не должен превышать текущий год)"""
-    current_year = datetime.today().year
-    return value.isdigit() and int(value) <= current_year
-
-def is_positive_integer(value: str) -> bool:
-    """Проверяет, что введенное значение - целое положительное число"""
-    return value.isdigit() and int(value) >= 0
-
-def is_valid_status(value: str) -> bool:
-    """Проверяет что введенный статус соответствует одному из доступных статусов"""
-    return value in VALID_STATUSES
-
-def is_valid_search_type(value: str) -> bool:
-    """Проверяет что введенный тип поиска соответствует одному из доступных типов поиска"""
-    return value in VALID_SEARCH_TYPES
-
 
 class Librarian:
     """
@@ -65,9 +65,36 @@ class Librarian:
     Выполняет запрос данных от пользователя, проводит валидацию полученных значений и в случае
     успеха - передает полученные данные объекту Library для дальнейшей обработки.
     """
-    def __init__(self, library: Library = Library()):
-        self.library = library
+    def __init__(self, library: Optional[Library] = None, page_size: int = PAGE_SIZE):
+        self.library = library if library is not None else Library()
         self.current_year = datetime.now().year
+        self.page_size = page_size
+
+    def paginate(self, show_page: Callable[[int, int], bool]) -> None:
+        """
+        Выводит результаты по страницам: после каждой страницы предлагает перейти к следующей ('с')
+        или предыдущей ('п'), любой другой ввод возвращает в меню.
+        :param show_page: Функция, выводящая страницу (номер страницы, размер страницы)
+        и возвращающая признак наличия следующей страницы.
+        """
+        page = 0
+        while True:
+            has_next = show_page(page, self.page_size)
+            options = []
+            if has_next:
+                options.append("'с' - следующая страница")
+            if page > 0:
+                options.append("'п' - предыдущая страница")
+            if not options:
+                return
+
+            choice = input(f"\n{', '.join(options)}, Enter - вернуться в меню: ").strip().lower()
+            if has_next and choice in NEXT_PAGE_WORDS:
+                page += 1
+            elif page > 0 and choice in PREVIOUS_PAGE_WORDS:
+                page -= 1
+            else:
+                return
 
     def add_book(self) ->  None:
         """
@@ -126,12 +153,13 @@ class Librarian:
     def search_book(self) -> None:
         """
         Запрашивает параметр для поиска книги.
-        Если введен корректный параметр поиска - запрашивает данные для поиска по этому параметру.
+        Если введен корректный параметр поиска - запрашивает данные для поиска по этому параметру
+        (для параметра 'расширенный' - условия расширенного поиска).
         В случае если введены корректные данные - передает их в Library для дальнейшей обработки.
         """
         search_type = validate_input(
-            "Введите параметр поиска (название, автор, год)",
-            "Введите корректный параметр поиска - 'название', 'автор' или 'год'.",
+            "Введите параметр поиска (название, автор, год, расширенный)",
+            "Введите корректный параметр поиска - 'название', 'автор', 'год' или 'расширенный'.",
             is_valid_search_type,
         )
 
@@ -139,17 +167,65 @@ class Librarian:
             print("Поиск книги отменен.")
             return
 
+        if search_type == "расширенный":
+            self.advanced_search()
+            return
+
         search_term = validate_input(
             "Введите значение для поиска",
             "Значение для поиска не может быть пустым",
             is_not_empty,
         )
         search_type = SEARCH_TYPES_MAPPING[search_type]
-        self.library.search_book(search_type, search_term)
+        self.paginate(lambda page, page_size: self.library.search_book(search_type, search_term, page, page_size))
+
+    def advanced_search(self) -> None:
+        """
+        Запрашивает условия расширенного поиска: диапазон годов издания, автора и название
+        (точно или по началу), статус, сортировку и количество результатов. Пустое значение - условие не задано.
+        В случае если введены корректные данные - передает запрос в Library для дальнейшей обработки.
+        """
+        answers = []
+        for prompt, error_message, validator in (
+                ("Введите годы издания (например, 1900-1950, 1900- или -1950)",
+                 "Годы издания должны быть числом или диапазоном 'начало-конец'", is_valid_year_range),
+                ("Введите автора ('Толст*' - поиск по началу)", "", lambda value: True),
+                ("Введите название ('Война*' - поиск по началу)", "", lambda value: True),
+                ("Введите статус ('выдана', 'в наличии')",
+                 "Статус книги может быть только 'выдана' или 'в наличии'", is_valid_optional_status),
+                ("Введите поле сортировки (id, название, автор, год; '-год' - по убыванию)",
+                 "Поле сортировки может быть только 'id', 'название', 'автор' или 'год'", is_valid_sort),
+                ("Введите максимальное количество результатов",
+                 "Количество результатов должно быть целым положительным числом", is_optional_positive_integer),
+        ):
+            answer = validate_input(f"{prompt}, пустое значение - без условия", error_message, validator)
+            if answer is None:
+                print("Поиск книги отменен.")
+                return
+            answers.append(answer)
+
+        years, author, title, status, sort, limit = answers
+        year_from, year_to = parse_year_range(years)
+        author, author_prefix = parse_text_filter(author)
+        title, title_prefix = parse_text_filter(title)
+        sort_by, descending = parse_sort(sort)
+        query = BookQuery(
+            year_from=year_from,
+            year_to=year_to,
+            author=author,
+            author_prefix=author_prefix,
+            title=title,
+            title_prefix=title_prefix,
+            status=status.strip() or None,
+            sort_by=sort_by,
+            descending=descending,
+            limit=int(limit) if limit.strip() else None,
+        )
+        self.paginate(lambda page, page_size: self.library.search_by_query(query, page, page_size))
 
     def display_books(self) -> None:
-        """Вызывает метод Library для отображения всех имеющихся книг."""
-        self.library.display_books()
+        """Вызывает метод Library для отображения всех имеющихся книг по страницам."""
+        self.paginate(self.library.display_books)
 
     def change_status(self) -> None:
         """
@@ -177,4 +253,87 @@ class Librarian:
             print("Изменение статуса отменено.")
             return
 
-        self.library.change_status(book_id, new_status)
\ No newline at end of file
+        self.library.change_status(book_id, new_status)
+
+    def bulk_change_status(self) -> None:
+        """
+        Запрашивает список ID книг и новый статус для всех этих книг.
+        В случае если введены корректные данные - передает их в Library для изменения статуса одной операцией.
+        """
+        book_ids = validate_input(
+            "Введите ID книг через пробел или запятую",
+            "ID книг должны быть целыми числами, разделенными пробелами или запятыми",
+            is_valid_id_list,
+        )
+
+        if book_ids is None:
+            print("Изменение статуса отменено.")
+            return
+
+        new_status = validate_input(
+            "Введите новый статус ('выдана', 'в наличии')",
+            "Статус книги может быть только 'выдана' или 'в наличии'",
+            is_valid_status,
+        )
+
+        if new_status is None:
+            print("Изменение статуса отменено.")
+            return
+
+        self.library.bulk_change_status(parse_id_list(book_ids), new_status)
+
+    def display_books_by_status(self) -> None:
+        """
+        Запрашивает статус книг.
+        В случае если введен корректный статус - выводит количество книг по статусам и книги с этим статусом.
+        """
+        status = validate_input(
+            "Введите статус ('выдана', 'в наличии')",
+            "Статус книги может быть только 'выдана' или 'в наличии'",
+            is_valid_status,
+        )
+
+        if status is None:
+            print("Просмотр книг отменен.")
+            return
+
+        self.library.display_books_by_status(status)
+
+    def display_statistics(self) -> None:
+        """
+        Запрашивает количество авторов в статистике (Enter - по умолчанию).
+        Выводит количество книг по статусам, авторов с наибольшим количеством книг и количество книг по десятилетиям.
+        """
+        top_authors = validate_input(
+            f"Введите количество авторов в статистике (Enter - {TOP_AUTHORS})",
+            "Количество авторов должно быть целым положительным числом",
+            is_optional_positive_integer,
+        )
+
+        if top_authors is None:
+            print("Просмотр статистики отменен.")
+            return
+
+        self.library.display_statistics(int(top_authors) if top_authors.strip() else TOP_AUTHORS)
+
+    def import_books(self) -> None:
+        """
+        Запрашивает путь к файлу CSV или JSONL с каталогом книг.
+        В случае если указан существующий файл - импортирует из него книги и выводит отчет об импорте.
+        """
+        file_path = validate_input(
+            "Введите путь к файлу CSV или JSONL",
+            "Файл не найден или имеет неподдерживаемый формат (поддерживаются .csv, .jsonl)",
+            is_supported_file,
+        )
+
+        if file_path is None:
+            print("Импорт книг отменен.")
+            return
+
+        report = import_books(self.library, Path(file_path))
+        print(report.summary())
+
+    def show_metrics(self) -> None:
+        """Выводит отчет о производительности операций библиотеки и хранилища."""
+        print(METRICS.report())
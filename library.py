@@ -1,8 +1,19 @@
+import sys
+import threading
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any
+from itertools import islice
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterable, Iterator, Optional
 
 from data_manager import DataManager
+from indexes import (
+    FUZZY_FIELDS, CatalogStatistics, FuzzyIndex, SearchCache, SearchKeys, StatusIndex, TrigramIndex, normalize_text,
+)
+from metrics import METRICS, instrumented
+from parallel import ParallelScanner
+from query import BookQuery, QueryEngine
+from write_behind import WriteBehind
 
 
 class BookStatus(Enum):
@@ -10,10 +21,23 @@ class BookStatus(Enum):
     AVAILABLE = "в наличии"
 
 
-@dataclass
+# Канонические объекты строк статусов: все книги с одинаковым статусом ссылаются на одну строку.
+STATUS_VALUES = {status.value: status.value for status in BookStatus}
+# Количество книг на одной странице при выводе каталога и результатов поиска.
+PAGE_SIZE = 20
+# Количество авторов в статистике каталога по умолчанию.
+TOP_AUTHORS = 10
+BOOKS_HEADER = f"{'ID':<5}{'Название':<25}{'Автор':<25}{'Год':<10}{'Статус':<10}\n" + "-" * 75 + "\n"
+# Общие объекты для значений года: число лет в каталоге невелико, а каждый int больше 256 - отдельный объект.
+_SHARED_YEARS: dict[int, int] = {}
+
+
+@dataclass(slots=True)
 class Book:
     """
     Класс Книга для упрощения получения (from_dict) и передачи (to_dict) данных о книгах.
+    Экземпляры не имеют __dict__, а строки автора и статуса разделяются между книгами,
+    что заметно уменьшает расход памяти на больших каталогах.
     """
     id: str
     title: str
@@ -21,6 +45,11 @@ class Book:
     year: int
     status: str
 
+    def __post_init__(self) -> None:
+        self.author = sys.intern(self.author)
+        self.year = _SHARED_YEARS.setdefault(self.year, self.year)
+        self.status = STATUS_VALUES.get(self.status, self.status)
+
     def to_dict(self) -> dict[str, Any]:
         return {
             "id": self.id,
@@ -35,30 +64,560 @@ class Book:
         return cls(**data)
 
 
+class PendingChanges:
+    """Изменения, накопленные в блоке Library.collect_changes() и еще не сохраненные."""
+    def __init__(self, library: 'Library', next_id: Optional[int]):
+        """
+        :param library: Библиотека, в которой сделаны изменения.
+        :param next_id: Счетчик ID на момент входа в блок.
+        """
+        self.library = library
+        self.next_id = next_id
+        self.changes: list[tuple[str, Book]] = []
+        self.undo: list[Callable[[], None]] = []
+
+    def save(self) -> None:
+        """Сохраняет изменения одной операцией записи."""
+        with self.library._changing():
+            self.library._release(self)
+            if self.changes:
+                self.library._save_changes(self.changes)
+
+    def rollback(self) -> None:
+        """Возвращает каталог в памяти и счетчик ID к состоянию на момент входа в блок."""
+        self.library._release(self)
+        for action in reversed(self.undo):
+            action()
+        if self.next_id is not None:
+            self.library._next_id = self.next_id
+
+
 class Library:
     """
     Класс Библиотека для обработки данных о книгах и взаимодействия с менеджером данных
     """
-    def __init__(self, datamanager: DataManager = DataManager()):
-        self.data_manager = datamanager
-        self.books: list[Book] = [Book.from_dict(book) for book in self.data_manager.load_books()]
+    def __init__(
+            self,
+            datamanager: Optional[DataManager] = None,
+            search_index: bool = False,
+            search_cache_size: int = 128,
+            write_behind: Optional[float] = None,
+            parallel_workers: Optional[int] = None,
+    ):
+        """
+        Книги не загружаются при создании библиотеки: каталог загружается при первом обращении к нему.
+        Если менеджер данных поддерживает запросы (get_book, search_books), поиск, удаление и изменение статуса
+        выполняются запросами к хранилищу, а весь каталог загружается только при обращении к списку книг.
+        :param datamanager: Менеджер данных для загрузки и сохранения книг (по умолчанию - DataManager для books.json).
+        :param search_index: Построить триграммный индекс для поиска по названию, автору и году.
+        :param search_cache_size: Количество результатов поиска, хранящихся в кэше (0 - кэш отключен).
+        :param write_behind: Сохранять изменения в фоновом потоке не позднее чем через write_behind секунд
+        (None - сохранять сразу). В этом режиме каталог всегда работает в памяти, а гарантировать сохранение
+        всех изменений можно вызовом flush() или close().
+        :param parallel_workers: Просматривать большой каталог при поиске без индекса в parallel_workers процессах
+        (0 - по количеству ядер, None - в одном процессе). Пул процессов останавливается вызовом close().
+        """
+        self.data_manager = datamanager if datamanager is not None else DataManager()
+        self._books: dict[str, Book] = {}
+        self._loaded = False
+        self._next_id: Optional[int] = None
+        self._batch_changes: Optional[list[tuple[str, Book]]] = None
+        self._batch_undo: Optional[list[Callable[[], None]]] = None
+        # Книги, измененные в блоке batch() без загруженного каталога: хранилище увидит их только после сохранения.
+        self._batch_books: Optional[dict[str, Optional[Book]]] = None
+        # Изменения, собранные в collect_changes(), но еще не переданные на сохранение.
+        self._collected: list[PendingChanges] = []
+        # Пока изменения ожидают отложенной записи, хранилище отстает от памяти и не может отвечать на запросы.
+        self._queryable = write_behind is None and callable(getattr(self.data_manager, "search_books", None))
+        self._saves_changes = callable(getattr(self.data_manager, "save_changes", None))
+        # Защищает каталог от изменения, пока фоновый поток записи снимает с него копию или объединяет его
+        # с изменениями другого процесса. Чтение, использующее каталог вместе с индексами, тоже выполняется
+        # под блокировкой, чтобы не увидеть каталог и индексы из разных версий.
+        self._lock = threading.RLock()
+        self._write_behind = WriteBehind(self._write_changes, write_behind) if write_behind is not None else None
+
+        self.search_index: Optional[TrigramIndex] = None
+        self.status_index = StatusIndex()
+        self.search_keys = SearchKeys()
+        self.statistics = CatalogStatistics()
+        self.parallel_scanner = ParallelScanner(parallel_workers) if parallel_workers is not None else None
+        self._indexes: list[Any] = []
+        self._create_indexes(search_index)
+        self._query_engine: Optional[QueryEngine] = None
+        self.fuzzy_index: Optional[FuzzyIndex] = None
+        self.search_cache = SearchCache(search_cache_size)
+
+    @instrumented("library.load_catalog")
+    def _load_books(self) -> None:
+        """Загружает все книги из менеджера данных и строит индексы."""
+        self._books = self._read_catalog()
+        self._build_indexes()
+        self._loaded = True
+        self._next_id = self._storage_next_id(self._books)
+
+    def _read_catalog(self) -> dict[str, Book]:
+        """
+        Выгружает все книги из менеджера данных в новый словарь {ID: книга}.
+        Если менеджер данных умеет выдавать книги по одной (iter_books), промежуточный список не создается.
+        """
+        books = {}
+        iter_books = getattr(self.data_manager, "iter_books", None)
+        try:
+            for book_data in (iter_books() if iter_books else self.data_manager.load_books()):
+                book = Book.from_dict(book_data)
+                books[book.id] = book
+        except ValueError:
+            # Поврежденный файл, как и в DataManager.load_books, дает пустую библиотеку.
+            return {}
+        return books
+
+    def _storage_next_id(self, books: dict[str, Book]) -> int:
+        """Возвращает следующий свободный ID с учетом счетчика хранилища и ID загруженных книг."""
+        return max(
+            self._next_id or 0,
+            self.data_manager.load_next_id(),
+            max((int(book_id) for book_id in books), default=0) + 1,
+        )
+
+    def _new_indexes(self, search_index: bool) -> dict[str, Any]:
+        """
+        Создает пустые индексы: по статусу, нормализованные ключи поиска, статистику каталога
+        и, если передан search_index, триграммный индекс для поиска.
+        :return: Индексы по именам атрибутов библиотеки.
+        """
+        return {
+            "search_index": TrigramIndex() if search_index else None,
+            "status_index": StatusIndex(),
+            "search_keys": SearchKeys(),
+            "statistics": CatalogStatistics(),
+        }
+
+    def _install_indexes(self, indexes: dict[str, Any]) -> None:
+        """
+        Заменяет индексы библиотеки переданными (см. _new_indexes).
+        Снимок каталога для параллельного просмотра сбрасывается и будет снят заново при следующем поиске.
+        """
+        for name, index in indexes.items():
+            setattr(self, name, index)
+        if self.parallel_scanner is not None:
+            self.parallel_scanner.reset()
+        self._indexes = [
+            index for index in (
+                self.search_index, self.status_index, self.search_keys, self.statistics, self.parallel_scanner,
+            )
+            if index is not None
+        ]
+
+    def _create_indexes(self, search_index: bool) -> None:
+        """Создает пустые индексы (см. _new_indexes)."""
+        self._install_indexes(self._new_indexes(search_index))
+
+    def _build_indexes(self) -> None:
+        """Добавляет в индексы все книги каталога."""
+        for index in self._indexes:
+            for book in self._books.values():
+                index.add(book)
+
+    def _storage_lock(self):
+        """Блокировка хранилища для записи, если менеджер данных ее поддерживает."""
+        lock = getattr(self.data_manager, "lock", None)
+        return lock() if lock is not None else nullcontext()
+
+    def _storage_is_stale(self) -> bool:
+        """Проверяет, изменил ли хранилище другой процесс после загрузки каталога."""
+        is_stale = getattr(self.data_manager, "is_stale", None)
+        return self._loaded and is_stale is not None and is_stale()
+
+    def _unsaved_changes(self) -> list[tuple[str, Book]]:
+        """
+        Возвращает изменения каталога в памяти, еще не переданные на запись: ожидающие отложенной записи,
+        собранные в collect_changes() и накопленные в открытом блоке batch().
+        """
+        unsaved = self._write_behind.queued() if self._write_behind is not None else []
+        for pending in self._collected:
+            unsaved.extend(pending.changes)
+        if self._batch_changes is not None:
+            unsaved.extend(self._batch_changes)
+        return unsaved
+
+    def _merge_storage(self, changes: list[tuple[str, Book]]) -> list[tuple[str, Book]]:
+        """
+        Перезагружает каталог, измененный другим процессом, и повторно применяет к нему изменения этой библиотеки:
+        сохраняемые и все остальные несохраненные (см. _unsaved_changes), чтобы каталог в памяти не потерял
+        изменения, которые будут сохранены позже.
+        Добавленная книга, ID которой уже занят книгой другого процесса, получает новый ID.
+        Удаление и изменение статуса книги, удаленной другим процессом, пропускаются.
+        Вызывается под блокировкой каталога.
+        :param changes: Сохраняемые изменения вида (тип изменения, книга).
+        :return: Изменения, которые нужно сохранить после объединения.
+        """
+        METRICS.increment("library.storage_merges")
+        # Каталог и индексы собираются в локальных переменных и подменяются целиком: читатель, не взявший
+        # блокировку каталога, видит либо прежний, либо новый каталог, но не частично загруженный.
+        books = self._read_catalog()
+        next_id = self._storage_next_id(books)
+        merged = []
+        for position, (action, book) in enumerate(changes + self._unsaved_changes()):
+            current = books.get(book.id)
+            if action == "add":
+                if current is not None:
+                    book.id = str(next_id)
+                    next_id += 1
+                books[book.id] = book
+            elif current is None:
+                continue
+            elif action == "delete":
+                del books[book.id]
+            else:
+                # В каталог попадает книга этой библиотеки: на нее ссылаются ожидающие записи изменения.
+                books[book.id] = book
+            if position < len(changes):
+                merged.append((action, book))
+
+        indexes = self._new_indexes(self.search_index is not None)
+        for index in indexes.values():
+            if index is not None:
+                for book in books.values():
+                    index.add(book)
+
+        with self._lock:
+            self._books = books
+            self._install_indexes(indexes)
+            self._next_id = next_id
+            self._query_engine = None
+            self.fuzzy_index = None
+            self.search_cache.clear()
+        return merged
+
+    def _allocate_ids(self, changes: list[tuple[str, Book]]) -> None:
+        """
+        Сверяет ID добавленных книг со счетчиком хранилища, если каталог не загружен или менеджер данных
+        не умеет определять изменения хранилища другим процессом (is_stale). Вызывается под блокировкой хранилища:
+        книга, ID которой другой процесс уже выдал после того, как эта библиотека прочитала счетчик,
+        получает следующий свободный ID.
+        """
+        next_id = self.data_manager.load_next_id()
+        for action, book in changes:
+            if action != "add":
+                continue
+            if int(book.id) < next_id:
+                self._renumber(book, str(next_id))
+            next_id = int(book.id) + 1
+        self._next_id = max(self._next_id or 0, next_id)
+
+    def _renumber(self, book: Book, book_id: str) -> None:
+        """Присваивает книге новый ID и, если книга есть в загруженном каталоге, переносит ее в каталоге и индексах."""
+        if not self._loaded or self._books.get(book.id) is not book:
+            book.id = book_id
+            return
+        del self._books[book.id]
+        for index in self._indexes:
+            index.remove(book)
+        book.id = book_id
+        self._books[book_id] = book
+        for index in self._indexes:
+            index.add(book)
+
+    def _changing(self):
+        """
+        Блокировка каталога на время изменения и передачи его на запись при отложенной записи: фоновое
+        объединение с хранилищем (см. _merge_storage) не должно застать изменение в памяти, которого еще нет
+        в очереди записи. Без отложенной записи изменение сохраняется сразу и каталог на время записи не блокируется.
+        """
+        return self._lock if self._write_behind is not None else nullcontext()
+
+    def _release(self, pending: PendingChanges) -> None:
+        """Убирает изменения, собранные в collect_changes(), из ожидающих передачи на сохранение."""
+        with self._lock:
+            if pending in self._collected:
+                self._collected.remove(pending)
+
+    def _catalog(self) -> dict[str, Book]:
+        """Возвращает словарь {ID: книга}, при необходимости загружая каталог."""
+        if not self._loaded:
+            self._load_books()
+        return self._books
+
+    def _in_memory(self, writing: bool = False) -> bool:
+        """
+        Проверяет, работает ли библиотека с каталогом в памяти.
+        Каталог при необходимости загружается, если хранилище не поддерживает запросы
+        или, для изменений (writing), не умеет сохранять изменения по отдельности.
+        """
+        if not self._loaded and (not self._queryable or writing and not self._saves_changes):
+            self._load_books()
+        return self._loaded
+
+    @property
+    def next_id(self) -> int:
+        """ID, который будет присвоен следующей добавленной книге."""
+        if self._next_id is None and not self._in_memory():
+            self._next_id = max(self.data_manager.load_next_id(), 1)
+        return self._next_id
+
+    @property
+    def books(self) -> list[Book]:
+        """Список всех книг библиотеки в порядке добавления."""
+        return list(self.iter_books())
+
+    def iter_books(self) -> Iterator[Book]:
+        """Перебирает книги библиотеки в порядке добавления без создания списка."""
+        return iter(self._catalog().values())
+
+    def _iter_books_lazily(self) -> Iterator[Book]:
+        """
+        Перебирает книги в порядке каталога. Если каталог еще не загружен, книги читаются из хранилища
+        по мере перебора, поэтому получение первых книг не зависит от размера каталога.
+        """
+        iter_books = getattr(self.data_manager, "iter_books", None)
+        if self._loaded or iter_books is None:
+            yield from self._catalog().values()
+            return
+        try:
+            for book_data in iter_books():
+                yield Book.from_dict(book_data)
+        except ValueError:
+            # Поврежденный файл, как и при загрузке каталога, считается пустым.
+            return
+
+    @staticmethod
+    def format_books(books: Iterable[Book]) -> str:
+        """Формирует таблицу с информацией о книгах: заголовок и по строке на каждую книгу."""
+        return BOOKS_HEADER + "".join(
+            f"{book.id:<5}{book.title:<25}{book.author:<25}{book.year:<10}{book.status:<10}\n" for book in books
+        )
 
     @staticmethod
     def print_books(books: list[Book]) -> None:
-        """Выводит на экран информацию о каждой книге из полученного списка"""
+        """Выводит на экран информацию о каждой книге из полученного списка одной операцией записи"""
         if not books:
             print("Книги не найдены.")
             return
 
-        print(f"{'ID':<5}{'Название':<25}{'Автор':<25}{'Год':<10}{'Статус':<10}")
-        print("-" * 75)
-        for book in books:
-            print(f"{book.id:<5}{book.title:<25}{book.author:<25}{book.year:<10}{book.status:<10}")
+        sys.stdout.write(Library.format_books(books))
+
+    @staticmethod
+    def print_page(books: Iterable[Book], page: int, page_size: int = PAGE_SIZE, title: str = "") -> Optional[bool]:
+        """
+        Выводит одну страницу книг одной операцией записи. Книги за пределами страницы не перебираются.
+        :param books: Книги в порядке вывода (список или генератор).
+        :param page: Номер страницы, начиная с 0.
+        :param page_size: Количество книг на странице.
+        :param title: Текст, выводимый перед таблицей.
+        :return: Есть ли следующая страница или None, если на странице нет ни одной книги.
+        """
+        rows = list(islice(books, page * page_size, (page + 1) * page_size + 1))
+        if not rows:
+            return None
+        has_next = len(rows) > page_size
+        first = page * page_size + 1
+        sys.stdout.write(
+            f"{title}Страница {page + 1} (книги {first}-{first + min(len(rows), page_size) - 1})\n"
+            + Library.format_books(rows[:page_size])
+        )
+        return has_next
 
     def _save_books(self) -> None:
         """Передает список всех хранящихся в библиотеке книг для дальнейшей обработки. """
-        self.data_manager.save_books([book.to_dict() for book in self.books])
+        self.data_manager.save_books([book.to_dict() for book in self._catalog().values()])
+
+    def _save_changes(self, changes: list[tuple[str, Book]]) -> None:
+        """
+        Передает менеджеру данных список изменений вида (тип изменения, книга),
+        где тип изменения - 'add', 'delete' или 'status'.
+        Если менеджер данных не умеет сохранять изменения по отдельности - сохраняет весь список книг.
+        Сохранение выполняется под блокировкой хранилища; если другой процесс успел изменить хранилище,
+        изменения сначала объединяются с его изменениями (см. _merge_storage).
+        Внутри batch() изменения не сохраняются, а накапливаются до выхода из блока.
+        """
+        if self._batch_changes is not None:
+            self._batch_changes.extend(changes)
+            return
+        if self._write_behind is not None:
+            self._write_behind.submit(changes)
+            return
+        self._write_changes(changes)
+
+    def _write_changes(self, changes: list[tuple[str, Book]]) -> None:
+        """
+        Сохраняет изменения в хранилище (см. _save_changes).
+        Каталог блокируется только на время снятия копии данных, сама запись выполняется без блокировки каталога.
+        """
+        save_changes = getattr(self.data_manager, "save_changes", None)
+        with self._storage_lock():
+            with self._lock:
+                if self._storage_is_stale():
+                    changes = self._merge_storage(changes)
+                elif not self._loaded or getattr(self.data_manager, "is_stale", None) is None:
+                    self._allocate_ids(changes)
+
+                has_deletions = any(action == "delete" for action, _ in changes)
+                # Счетчик вычисляется до сохранения, пока удаленные книги еще учитываются хранилищем.
+                next_id = self.next_id if has_deletions else None
+                # Под блокировкой копируется только список книг, данные книг выгружаются уже без нее.
+                books = list(self._catalog().values()) if save_changes is None else None
+
+            if save_changes is None:
+                self.data_manager.save_books([book.to_dict() for book in books])
+            else:
+                save_changes([(action, book.to_dict()) for action, book in changes])
+            if has_deletions:
+                self.data_manager.save_next_id(next_id)
+
+    def _save_change(self, action: str, book: Book) -> None:
+        """Передает менеджеру данных одно изменение ('add', 'delete' или 'status')."""
+        self._save_changes([(action, book)])
+
+    @instrumented("library.get_book")
+    def _get_book(self, book_id: str) -> Optional[Book]:
+        """Возвращает книгу с переданным ID из памяти или, если каталог не загружен, из хранилища."""
+        if self._in_memory(writing=True):
+            return self._books.get(book_id)
+        if self._batch_books and book_id in self._batch_books:
+            return self._batch_books[book_id]
+        book_data = self.data_manager.get_book(book_id)
+        return Book.from_dict(book_data) if book_data else None
+
+    def _new_book(self, title: str, author: str, year: str) -> Book:
+        """Создает книгу со следующим свободным ID и статусом 'в наличии'."""
+        with self._lock:
+            book = Book(
+                id=str(self.next_id),
+                title=title,
+                author=author,
+                year=int(year),
+                status=BookStatus.AVAILABLE.value
+            )
+            self._next_id += 1
+            return book
 
+    def _add_to_catalog(self, book: Book) -> None:
+        """Добавляет книгу в загруженный каталог и индексы."""
+        with self._lock:
+            self.search_cache.invalidate(book)
+            if self._in_memory(writing=True):
+                self._books[book.id] = book
+                for index in self._indexes:
+                    index.add(book)
+                if self._batch_undo is not None:
+                    self._batch_undo.append(lambda: self._discard_from_catalog(book))
+            elif self._batch_books is not None:
+                self._batch_books[book.id] = book
+
+    def _discard_from_catalog(self, book: Book) -> None:
+        """Удаляет книгу из загруженного каталога и индексов."""
+        with self._lock:
+            self.search_cache.invalidate(book)
+            if self._in_memory(writing=True):
+                del self._books[book.id]
+                for index in self._indexes:
+                    index.remove(book)
+                if self._batch_undo is not None:
+                    self._batch_undo.append(lambda: self._add_to_catalog(book))
+            elif self._batch_books is not None:
+                self._batch_books[book.id] = None
+
+    def _insert_book(self, book: Book) -> None:
+        """Добавляет книгу в каталог и индексы и сохраняет изменение."""
+        with self._changing():
+            self._add_to_catalog(book)
+            self._save_change("add", book)
+
+    # Замеряется удаление без ожидания подтверждения пользователя в delete_book.
+    @instrumented("library.delete_book")
+    def _remove_book(self, book: Book) -> None:
+        """Удаляет книгу из каталога и индексов и сохраняет изменение."""
+        with self._changing():
+            self._discard_from_catalog(book)
+            self._save_change("delete", book)
+
+    def _update_status(self, book: Book, new_status: str) -> None:
+        """Изменяет статус книги и обновляет индексы."""
+        with self._lock:
+            self.search_cache.invalidate(book)
+            old_status = book.status
+            book.status = STATUS_VALUES.get(new_status, new_status)
+            if self._loaded:
+                for index in self._indexes:
+                    index.update_status(book, old_status)
+                if self._batch_undo is not None:
+                    self._batch_undo.append(lambda: self._update_status(book, old_status))
+            elif self._batch_books is not None:
+                self._batch_books[book.id] = book
+
+    def _set_status(self, book: Book, new_status: str) -> None:
+        """Изменяет статус книги, обновляет индексы и сохраняет изменение."""
+        with self._changing():
+            self._update_status(book, new_status)
+            self._save_change("status", book)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Контекстный менеджер для группировки изменений: внутри блока изменения не сохраняются,
+        а при выходе из блока сохраняются одной операцией записи.
+        Если в блоке возникло исключение или изменения не удалось сохранить, каталог в памяти
+        и счетчик ID возвращаются к состоянию на момент входа в блок.
+        Вложенный блок batch() присоединяется к внешнему: его изменения сохраняются вместе с внешним блоком,
+        а исключение во вложенном блоке отменяет только изменения вложенного блока.
+        Если каталог не загружен, а запросы выполняются к хранилищу, книги, измененные внутри блока,
+        учитываются при выборке по ID и поиске до сохранения блока.
+        """
+        if self._batch_changes is not None:
+            with self._savepoint():
+                yield
+            return
+
+        with self.collect_changes() as pending:
+            yield
+        try:
+            pending.save()
+        except BaseException:
+            pending.rollback()
+            raise
+
+    @contextmanager
+    def _savepoint(self) -> Iterator[None]:
+        """Отменяет изменения, сделанные в блоке внутри batch(), если в блоке возникло исключение."""
+        changes_count, undo_count = len(self._batch_changes), len(self._batch_undo)
+        batch_books = dict(self._batch_books)
+        next_id = self._next_id
+        try:
+            yield
+        except BaseException:
+            for action in reversed(self._batch_undo[undo_count:]):
+                action()
+            del self._batch_changes[changes_count:], self._batch_undo[undo_count:]
+            self._batch_books = batch_books
+            if next_id is not None:
+                self._next_id = next_id
+            raise
+
+    @contextmanager
+    def collect_changes(self) -> Iterator['PendingChanges']:
+        """
+        Контекстный менеджер, группирующий изменения как batch(), но не сохраняющий их при выходе из блока:
+        изменения сохраняет (PendingChanges.save) или отменяет (PendingChanges.rollback) вызывающий код,
+        например в другом потоке, чтобы не блокировать чтение каталога на время записи.
+        Если в блоке возникло исключение, изменения отменяются сразу.
+        """
+        self._batch_changes = []
+        self._batch_undo = []
+        self._batch_books = {}
+        pending = PendingChanges(self, self._next_id)
+        try:
+            try:
+                yield pending
+            finally:
+                with self._lock:
+                    pending.changes, pending.undo = self._batch_changes, self._batch_undo
+                    self._collected.append(pending)
+                    self._batch_changes = self._batch_undo = self._batch_books = None
+        except BaseException:
+            pending.rollback()
+            raise
+
+    @instrumented("library.add_book")
     def add_book(self, title: str, author: str, year: str) -> None:
         """
         Сохраняет данные о новой книге, присваивает новый уникальный ID и устанавливает статус 'в наличии'.
@@ -66,27 +625,53 @@ class Library:
         :param author: Автор книги
         :param year: Год издания
         """
-        book_id = "1" if not self.books else str(max(int(book.id) for book in self.books) + 1)
-
-        new_book = Book(
-            id=book_id,
-            title=title,
-            author=author,
-            year=int(year),
-            status=BookStatus.AVAILABLE.value
-        )
-        self.books.append(new_book)
-        self._save_books()
+        new_book = self.create_book(title, author, year)
 
         print(f"\nКнига '{new_book.title}' добавлена в библиотеку.")
 
+    def create_book(self, title: str, author: str, year: str) -> Book:
+        """
+        Добавляет новую книгу (как add_book) без вывода сообщений.
+        :return: Добавленная книга.
+        """
+        new_book = self._new_book(title, author, year)
+        self._insert_book(new_book)
+        return new_book
+
+    @instrumented("library.add_books")
+    def add_books(self, books: Iterable[tuple[str, str, str]], chunk_size: Optional[int] = None) -> int:
+        """
+        Добавляет книги пакетом: присваивает им ID подряд и сохраняет изменения один раз в конце
+        или, если передан chunk_size, после каждых chunk_size книг.
+        Данные книг должны быть проверены заранее.
+        :param books: Итерируемый объект с кортежами (название, автор, год издания).
+        :param chunk_size: Количество книг, после добавления которых изменения сохраняются.
+        :return: Количество добавленных книг.
+        """
+        added = 0
+        pending: list[Book] = []
+        with self._changing():
+            for title, author, year in books:
+                book = self._new_book(title, author, year)
+                self._add_to_catalog(book)
+                pending.append(book)
+                if chunk_size and len(pending) >= chunk_size:
+                    self._save_changes([("add", book) for book in pending])
+                    added += len(pending)
+                    pending = []
+
+            if pending:
+                self._save_changes([("add", book) for book in pending])
+                added += len(pending)
+        return added
+
     def delete_book(self, book_id: str) -> None:
         """
         Удаляет книгу с переданным параметром ID.
         В случае, если книга есть в библиотеке - просит подтверждения на удаление и удаляет её.
         :param book_id: ID книги, которую надо удалить.
         """
-        book = next((book for book in self.books if book.id == book_id), None)
+        book = self._get_book(book_id)
 
         if not book:
             print(f"Книга с id {book_id} не найдена.")
@@ -94,35 +679,173 @@ class Library:
 
         confirm = input(f"Вы уверены, что хотите удалить книгу {book.title} с ID {book_id} (да/нет): ")
         if confirm.lower() in ('да', 'yes', 'д', 'y'):
-            self.books.remove(book)
-            self._save_books()
+            self._remove_book(book)
             print(f"\nКнига с id {book_id} удалена из библиотеки.")
             return
         else:
             print(f"Удаление книги {book.title} отменено.")
 
-    def search_book(self, search_type: str, search_term: str) -> None:
+    def remove_book(self, book_id: str) -> Optional[Book]:
+        """
+        Удаляет книгу с переданным ID без подтверждения и вывода сообщений.
+        :return: Удаленная книга или None, если книги с таким ID нет.
+        """
+        book = self._get_book(book_id)
+        if book:
+            self._remove_book(book)
+        return book
+
+    @instrumented("library.find_books")
+    def find_books(self, search_type: str, search_term: str) -> list[Book]:
+        """
+        Возвращает книги, у которых значение выбранного параметра содержит значение для поиска.
+        Значения сравниваются нормализованными (см. normalize_text): без учета регистра, различия 'ё' и 'е',
+        знаков препинания и лишних пробелов; ключи книг вычисляются один раз при добавлении в каталог.
+        При наличии индекса проверяются только книги-кандидаты из индекса, иначе - все книги библиотеки.
+        Если индекса нет, а каталог больше порога, каталог просматривается параллельно в нескольких процессах
+        (параметр parallel_workers), найденные книги возвращаются в порядке ID.
+        Если каталог не загружен в память, поиск выполняется запросом к хранилищу.
+        Результаты сохраняются в LRU-кэше и удаляются из него при изменении подходящих под запрос книг.
+        :param search_type: Параметр поиска ('title', 'author' или 'year').
+        :param search_term: Значение для поиска в выбранном параметре.
+        """
+        search_term = normalize_text(search_term)
+        if not search_term:
+            return []
+        with self._lock:
+            cached = self.search_cache.get(search_type, search_term)
+        if cached is not None:
+            return cached
+
+        if not self._in_memory():
+            result = [Book.from_dict(book) for book in self.data_manager.search_books(search_type, search_term)]
+            if self._batch_books:
+                # Результат еще не сохраненного блока batch() не кэшируется: блок может быть отменен.
+                return self._with_batch_books(result, search_type, search_term)
+            with self._lock:
+                self.search_cache.put(search_type, search_term, result)
+            return result
+
+        with self._lock:
+            candidates = self.search_index.candidates(search_type, search_term) if self.search_index else None
+            scanner = self.parallel_scanner
+            if candidates is None and scanner is not None and scanner.accepts(len(self._books)):
+                book_ids = scanner.search(self._books, self.search_keys, search_type, search_term)
+                result = [self._books[book_id] for book_id in book_ids]
+            else:
+                if candidates is None:
+                    books = self._books.values()
+                else:
+                    books = sorted((self._books[book_id] for book_id in candidates), key=lambda book: int(book.id))
+                keys = self.search_keys.keys(search_type)
+                result = [book for book in books if search_term in keys[book.id]]
+            self.search_cache.put(search_type, search_term, result)
+        return result
+
+    def _with_batch_books(self, books: list[Book], search_type: str, search_term: str) -> list[Book]:
+        """Дополняет результат поиска в хранилище книгами, измененными в текущем блоке batch(), в порядке ID."""
+        pending = self._batch_books
+        result = [book for book in books if book.id not in pending]
+        result.extend(
+            book for book in pending.values()
+            if book is not None and search_term in normalize_text(getattr(book, search_type))
+        )
+        return sorted(result, key=lambda book: int(book.id))
+
+    @instrumented("library.fuzzy_find_books")
+    def fuzzy_find_books(self, search_type: str, search_term: str) -> list[Book]:
+        """
+        Возвращает книги, в названии или авторе которых для каждого слова запроса есть слово,
+        отличающееся от него не более чем на одну опечатку (вставку, удаление или замену символа).
+        Индекс для поиска с опечатками строится при первом вызове и далее обновляется при изменениях.
+        :param search_type: Параметр поиска ('title' или 'author').
+        :param search_term: Значение для поиска в выбранном параметре.
+        """
+        if search_type not in FUZZY_FIELDS:
+            return []
+        self._catalog()
+        with self._lock:
+            if self.fuzzy_index is None:
+                self.fuzzy_index = FuzzyIndex()
+                for book in self._books.values():
+                    self.fuzzy_index.add(book)
+                self._indexes.append(self.fuzzy_index)
+            ids = self.fuzzy_index.search(search_type, search_term)
+            return sorted((self._books[book_id] for book_id in ids), key=lambda book: int(book.id))
+
+    @instrumented("library.search_book")
+    def search_book(self, search_type: str, search_term: str, page: int = 0, page_size: int = PAGE_SIZE) -> bool:
         """
         Производит поиск книг по выбранному параметру поиска и значениям для поиска.
-        В случае, если несколько книг соответствуют значениям для поиска - выводит все эти книги.
+        В случае, если несколько книг соответствуют значениям для поиска - выводит страницу с этими книгами
+        (повторные запросы других страниц берут результаты из кэша поиска).
+        Если по названию или автору ничего не найдено, выводятся книги, найденные с учетом опечаток
+        (только для каталога в памяти).
         :param search_type: Параметры поиска (по умолчанию: 'название', 'автор' и 'год').
         :param search_term: Значение для поиска в выбранном параметре.
+        :param page: Номер страницы результатов, начиная с 0.
+        :param page_size: Количество книг на странице.
+        :return: Есть ли следующая страница результатов.
         """
-        search_book_result = [
-            book for book in self.books
-            if search_term.lower() in str(getattr(book, search_type)).lower()
-        ]
-        if search_book_result:
-            print("\nВот что удалось найти по вашему запросу:\n")
-        self.print_books(search_book_result)
-
-    def display_books(self) -> None:
-        """Выводит на экран все книги, находящиеся в данный момент в библиотеке."""
-        if not self.books:
-            print("В данный момент в библиотеке нет ни одной книги.")
-            return
-        self.print_books(self.books)
+        search_book_result = self.find_books(search_type, search_term)
+        # Поиск с опечатками требует каталога в памяти: если запросы выполняются к хранилищу, он не выполняется,
+        # чтобы неудачный поиск не загружал весь каталог.
+        if not search_book_result and search_type in FUZZY_FIELDS and self._in_memory():
+            similar_books = self.fuzzy_find_books(search_type, search_term)
+            if similar_books:
+                title = f"\nТочных совпадений нет, возможно, вы искали (найдено книг: {len(similar_books)}):\n\n"
+                return self._print_results(similar_books, page, page_size, title)
+        return self._print_results(search_book_result, page, page_size)
 
+    def _print_results(self, books: list[Book], page: int, page_size: int, title: Optional[str] = None) -> bool:
+        """Выводит страницу результатов поиска и возвращает признак наличия следующей страницы."""
+        if title is None:
+            title = f"\nВот что удалось найти по вашему запросу (найдено книг: {len(books)}):\n\n"
+        has_next = self.print_page(books, page, page_size, title)
+        if has_next is None:
+            print("Книги не найдены.")
+        return bool(has_next)
+
+    @instrumented("library.query_books")
+    def query_books(self, query: BookQuery) -> list[Book]:
+        """
+        Возвращает книги, удовлетворяющие запросу: диапазон годов, точное совпадение или начало автора и названия,
+        статус, сортировка и ограничение количества результатов.
+        Упорядоченные индексы для запросов строятся при первом вызове и далее обновляются при изменениях.
+        :param query: Запрос к каталогу.
+        """
+        catalog = self._catalog()
+        with self._lock:
+            if self._query_engine is None:
+                self._query_engine = QueryEngine(catalog)
+                self._indexes.extend(self._query_engine.indexes.values())
+            return self._query_engine.execute(query)
+
+    def search_by_query(self, query: BookQuery, page: int = 0, page_size: int = PAGE_SIZE) -> bool:
+        """
+        Производит поиск книг по запросу и выводит страницу найденных книг.
+        :param query: Запрос к каталогу.
+        :param page: Номер страницы результатов, начиная с 0.
+        :param page_size: Количество книг на странице.
+        :return: Есть ли следующая страница результатов.
+        """
+        return self._print_results(self.query_books(query), page, page_size)
+
+    @instrumented("library.display_books")
+    def display_books(self, page: int = 0, page_size: int = PAGE_SIZE) -> bool:
+        """
+        Выводит на экран одну страницу книг, находящихся в данный момент в библиотеке.
+        Для вывода страницы перебираются только книги до ее конца, весь каталог для этого не загружается.
+        :param page: Номер страницы, начиная с 0.
+        :param page_size: Количество книг на странице.
+        :return: Есть ли следующая страница.
+        """
+        has_next = self.print_page(self._iter_books_lazily(), page, page_size)
+        if has_next is None:
+            print("В данный момент в библиотеке нет ни одной книги." if page == 0 else "Книги не найдены.")
+        return bool(has_next)
+
+    @instrumented("library.change_status")
     def change_status(self, book_id: str, new_status: str) -> None:
         """
         Изменяет статус книги с переданным ID.
@@ -131,7 +854,7 @@ class Library:
         :param book_id: ID книги, у которой надо изменить статус.
         :param new_status: Новый статус книги.
         """
-        book = next((book for book in self.books if book.id == book_id), None)
+        book = self._get_book(book_id)
         if not book:
             print(f"Книга с id {book_id} не найдена.")
             return
@@ -140,6 +863,135 @@ class Library:
             print(f"У книги '{book.title}' уже установлен статус '{book.status}' в настоящий момент.")
             return
 
-        book.status = new_status
-        self._save_books()
-        print(f"Статус книги '{book.title}' изменен на '{new_status}'")
\ No newline at end of file
+        self._set_status(book, new_status)
+        print(f"Статус книги '{book.title}' изменен на '{new_status}'")
+
+    def set_status(self, book_id: str, new_status: str) -> Optional[Book]:
+        """
+        Изменяет статус книги с переданным ID (как change_status) без вывода сообщений.
+        :return: Книга с новым статусом или None, если книги с таким ID нет.
+        """
+        book = self._get_book(book_id)
+        if book and book.status != new_status:
+            self._set_status(book, new_status)
+        return book
+
+    def change_statuses(self, book_ids: Iterable[str], new_status: str) -> tuple[list[Book], list[str]]:
+        """
+        Изменяет статус нескольких книг без вывода сообщений и сохраняет все изменения одной записью.
+        Книги, у которых уже установлен переданный статус, не изменяются.
+        :param book_ids: ID книг, у которых надо изменить статус.
+        :param new_status: Новый статус книг.
+        :return: Список книг с измененным статусом и список ID, книги с которыми не найдены.
+        """
+        changed = []
+        not_found = []
+        with self.batch():
+            for book_id in book_ids:
+                book = self._get_book(book_id)
+                if not book:
+                    not_found.append(book_id)
+                elif book.status != new_status:
+                    self._set_status(book, new_status)
+                    changed.append(book)
+        return changed, not_found
+
+    def bulk_change_status(self, book_ids: Iterable[str], new_status: str) -> None:
+        """
+        Изменяет статус нескольких книг (например, при возврате книг в конце дня) и выводит итог.
+        :param book_ids: ID книг, у которых надо изменить статус.
+        :param new_status: Новый статус книг.
+        """
+        changed, not_found = self.change_statuses(book_ids, new_status)
+        print(f"Статус изменен на '{new_status}' у книг: {len(changed)}.")
+        if not_found:
+            print(f"Книги с id {', '.join(not_found)} не найдены.")
+
+    def count_by_status(self) -> dict[str, int]:
+        """Возвращает количество книг с каждым статусом без перебора каталога."""
+        self._catalog()
+        with self._lock:
+            return {status.value: self.status_index.count(status.value) for status in BookStatus}
+
+    def books_with_status(self, status: str) -> list[Book]:
+        """Возвращает книги с переданным статусом в порядке ID без перебора всего каталога."""
+        self._catalog()
+        with self._lock:
+            return [self._books[book_id] for book_id in self.status_index.ids(status)]
+
+    @instrumented("library.display_books_by_status")
+    def display_books_by_status(self, status: str) -> None:
+        """
+        Выводит количество книг с каждым статусом и список книг с переданным статусом.
+        :param status: Статус книг, которые надо вывести.
+        """
+        for book_status, count in self.count_by_status().items():
+            print(f"{book_status}: {count}")
+        print()
+        self.print_books(self.books_with_status(status))
+
+    def top_authors(self, limit: int = TOP_AUTHORS) -> list[tuple[str, int]]:
+        """Возвращает не более limit авторов с наибольшим количеством книг и количество их книг."""
+        self._catalog()
+        with self._lock:
+            return self.statistics.top_authors(limit)
+
+    def books_by_decade(self) -> dict[int, int]:
+        """Возвращает количество книг по десятилетиям (первый год десятилетия -> количество)."""
+        self._catalog()
+        with self._lock:
+            return self.statistics.decade_histogram()
+
+    def catalog_statistics(self, top_authors: int = TOP_AUTHORS) -> dict[str, Any]:
+        """
+        Возвращает статистику каталога: общее количество книг, количество по статусам,
+        авторов с наибольшим количеством книг и количество книг по десятилетиям.
+        Счетчики обновляются при каждом изменении каталога, поэтому каталог для этого не перебирается.
+        :param top_authors: Количество авторов в статистике.
+        """
+        self._catalog()
+        with self._lock:
+            return {
+                "total": len(self._books),
+                "statuses": self.count_by_status(),
+                "top_authors": self.top_authors(top_authors),
+                "decades": self.books_by_decade(),
+            }
+
+    @instrumented("library.display_statistics")
+    def display_statistics(self, top_authors: int = TOP_AUTHORS) -> None:
+        """
+        Выводит статистику каталога одной операцией записи.
+        :param top_authors: Количество авторов с наибольшим количеством книг.
+        """
+        statistics = self.catalog_statistics(top_authors)
+        lines = [f"Всего книг: {statistics['total']}"]
+        lines.extend(f"{status}: {count}" for status, count in statistics["statuses"].items())
+        lines.append("\nАвторы с наибольшим количеством книг:")
+        lines.extend(f"{author:<40}{count}" for author, count in statistics["top_authors"])
+        lines.append("\nКоличество книг по десятилетиям:")
+        lines.extend(f"{decade}-е{'':<5}{count}" for decade, count in statistics["decades"].items())
+        sys.stdout.write("\n".join(lines) + "\n")
+
+    def flush(self) -> None:
+        """Дожидается сохранения всех изменений, ожидающих отложенной записи."""
+        if self._write_behind is not None:
+            self._write_behind.flush()
+
+    def take_write_error(self) -> Optional[BaseException]:
+        """
+        Возвращает ошибку фоновой записи, произошедшую после предыдущего вызова (None, если ошибок не было
+        или отложенная запись не используется). Несохраненные изменения записываются повторно автоматически.
+        """
+        return self._write_behind.take_error() if self._write_behind is not None else None
+
+    def close(self) -> None:
+        """
+        Сохраняет все изменения, ожидающие отложенной записи, и останавливает фоновый поток записи
+        и пул процессов параллельного просмотра.
+        """
+        if self.parallel_scanner is not None:
+            self.parallel_scanner.close()
+        if self._write_behind is not None:
+            self._write_behind.close()
+            self._write_behind = None
@@ -1,5 +1,29 @@
-from librarian import Librarian
+import argparse
+import asyncio
 import sys
+from typing import Callable, Optional
+from pathlib import Path
+
+from binary_data_manager import BinaryDataManager
+from data_manager import COMPRESSION_CODECS, DataManager, JournalDataManager
+from importer import import_books
+from script import ScriptReport, run_script, write_results
+from server import serve
+from sharded_data_manager import ShardedDataManager
+from sqlite_data_manager import SQLiteDataManager
+from librarian import Librarian
+from library import PAGE_SIZE, Library
+from metrics import METRICS
+
+STORAGE_TYPES = ("json", "journal", "sqlite", "binary", "sharded")
+DEFAULT_FILES = {
+    "json": Path("books.json"),
+    "journal": Path("books.json"),
+    "sqlite": Path("books.db"),
+    "binary": Path("books.bin"),
+    "sharded": Path("books.shards"),
+}
+
 
 def configure_io() -> None:
     """Настройка ввода-вывода для поддержки UTF-8"""
@@ -7,45 +31,205 @@ def configure_io() -> None:
     sys.stdout.reconfigure(encoding='utf-8')
 
 
-def display_menu() -> None:
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Разбор параметров командной строки"""
+    parser = argparse.ArgumentParser(description="Система управления библиотекой")
+    parser.add_argument("--file", type=Path, help="Файл базы данных (по умолчанию зависит от способа хранения)")
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE_TYPES,
+        default="json",
+        help="Способ хранения: json - перезапись файла целиком, journal - журнал изменений, sqlite - база SQLite, "
+             "binary - бинарный снимок с чтением через mmap, sharded - каталог сегментов по диапазонам ID",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        help="Количество книг в сегменте нового хранилища sharded (по умолчанию 10000)",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSION_CODECS,
+        help="Сжатие файла базы данных для json и journal (по умолчанию выбирается по расширению файла: "
+             ".gz - gzip, .xz - lzma)",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="Построить триграммный индекс для ускорения поиска книг",
+    )
+    parser.add_argument(
+        "--search-cache-size",
+        type=int,
+        default=128,
+        help="Количество результатов поиска, хранящихся в кэше (0 - не кэшировать, по умолчанию 128)",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=PAGE_SIZE,
+        help=f"Количество книг на одной странице при выводе каталога и результатов поиска (по умолчанию {PAGE_SIZE})",
+    )
+    parser.add_argument(
+        "--write-behind",
+        type=float,
+        metavar="SECONDS",
+        help="Сохранять изменения в фоновом потоке не позднее чем через SECONDS секунд после изменения "
+             "(по умолчанию изменения сохраняются сразу); несохраненные изменения записываются при выходе",
+    )
+    parser.add_argument(
+        "--parallel-workers",
+        type=int,
+        metavar="N",
+        help="Просматривать большой каталог при поиске без индекса в N процессах (0 - по количеству ядер)",
+    )
+    parser.add_argument(
+        "--import",
+        dest="import_file",
+        type=Path,
+        help="Импортировать книги из файла CSV или JSONL и завершить работу",
+    )
+    parser.add_argument(
+        "--script",
+        help="Выполнить команды из файла ('-' - из стандартного ввода) без диалога и вывести результаты "
+             "в формате JSONL",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="При импорте и выполнении сценария сохранять изменения после каждых N книг или команд "
+             "(по умолчанию - один раз в конце)",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Запустить сервер JSON-RPC для одновременной работы многих клиентов вместо меню",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Адрес сервера (по умолчанию 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Порт сервера (по умолчанию 8765, 0 - любой свободный)")
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Собирать статистику производительности операций и вывести отчет при выходе",
+    )
+    return parser.parse_args(argv)
+
+
+def create_data_manager(args: argparse.Namespace) -> DataManager | SQLiteDataManager:
+    """Создает менеджер данных по параметрам командной строки"""
+    file_path = args.file or DEFAULT_FILES[args.storage]
+    if args.storage == "journal":
+        return JournalDataManager(file_path, compression=args.compression)
+    if args.storage == "sqlite":
+        return SQLiteDataManager(file_path)
+    if args.storage == "binary":
+        return BinaryDataManager(file_path)
+    if args.storage == "sharded":
+        return ShardedDataManager(file_path, shard_size=args.shard_size)
+    return DataManager(file_path, compression=args.compression)
+
+
+def create_library(args: argparse.Namespace) -> Library:
+    """
+    Создает библиотеку по параметрам командной строки.
+    Каталог при этом не загружается - он будет загружен при первом обращении к нему.
+    """
+    return Library(
+        create_data_manager(args),
+        search_index=args.search_index,
+        search_cache_size=args.search_cache_size,
+        write_behind=args.write_behind,
+        parallel_workers=args.parallel_workers,
+    )
+
+
+def build_menu(librarian: Librarian, args: argparse.Namespace) -> list[tuple[str, Callable[[], None]]]:
+    """Формирует список пунктов меню (название, действие) с учетом параметров командной строки"""
+    menu = [
+        ("Добавить книгу", librarian.add_book),
+        ("Удалить книгу", librarian.delete_book),
+        ("Найти книгу", librarian.search_book),
+        ("Отобразить все книги", librarian.display_books),
+        ("Изменить статус книги", librarian.change_status),
+        ("Изменить статус нескольких книг", librarian.bulk_change_status),
+        ("Отобразить книги по статусу", librarian.display_books_by_status),
+        ("Показать статистику каталога", librarian.display_statistics),
+        ("Импортировать книги из файла", librarian.import_books),
+    ]
+    if args.metrics:
+        menu.append(("Показать статистику производительности", librarian.show_metrics))
+    return menu
+
+
+def display_menu(menu: list[tuple[str, Callable[[], None]]]) -> None:
     """Отображение меню действий"""
     print("\nВыберите действие")
-    menu_items = {
-        1: "Добавить книгу",
-        2: "Удалить книгу",
-        3: "Найти книгу",
-        4: "Отобразить все книги",
-        5: "Изменить статус книги",
-        6: "Выйти"
-    }
-    for key, value in menu_items.items():
-        print(f"{key}. {value}")
+    for number, (title, _) in enumerate(menu, start=1):
+        print(f"{number}. {title}")
+    print(f"{len(menu) + 1}. Выйти")
 
 def main():
+    args = parse_args()
     configure_io()
-    librarian = Librarian()
+    if args.metrics:
+        METRICS.enable()
+
+    library = create_library(args)
+    try:
+        run(library, args)
+    finally:
+        library.close()
+    if args.metrics:
+        print(METRICS.report())
+
+
+def run_script_file(library: Library, script: str, chunk_size: Optional[int] = None) -> ScriptReport:
+    """Выполняет сценарий из файла или стандартного ввода ('-'): результаты - в stdout, итоги - в stderr."""
+    report = ScriptReport()
+    if script == "-":
+        write_results(run_script(library, sys.stdin, chunk_size, report), sys.stdout)
+    else:
+        with open(script, encoding="utf-8") as file:
+            write_results(run_script(library, file, chunk_size, report), sys.stdout)
+    print(report.summary(), file=sys.stderr)
+    return report
+
+
+def run(library: Library, args: argparse.Namespace) -> None:
+    """Выполняет выбранный режим работы: импорт файла, сценарий, сервер или меню действий."""
+    if args.import_file:
+        print(import_books(library, args.import_file, args.chunk_size).summary())
+        return
+
+    if args.script:
+        run_script_file(library, args.script, args.chunk_size)
+        return
+
+    if args.serve:
+        try:
+            asyncio.run(serve(library, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    librarian = Librarian(library, page_size=args.page_size)
+    menu = build_menu(librarian, args)
     while True:
-        display_menu()
+        write_error = library.take_write_error()
+        if write_error is not None:
+            print(f"\nНе удалось сохранить изменения: {write_error}. Сохранение будет повторено автоматически.")
+        display_menu(menu)
         choice = input("\nВведите номер действия: ")
 
-        actions = {
-            "1": librarian.add_book,
-            "2": librarian.delete_book,
-            "3": librarian.search_book,
-            "4": librarian.display_books,
-            "5": librarian.change_status,
-        }
-
-        if choice == "6":
+        if choice == str(len(menu) + 1):
             print("Всего доброго! Ждем вас снова в нашей библиотеке!")
             break
 
-        action = actions.get(choice)
-        if action:
-            action()
+        if choice.isdigit() and 1 <= int(choice) <= len(menu):
+            menu[int(choice) - 1][1]()
         else:
             print("Неверный выбор. Попробуйте снова.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
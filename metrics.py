@@ -0,0 +1,148 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Верхние границы корзин гистограммы в секундах: 1 мкс, 2 мкс, 4 мкс ... ~34 с.
+BUCKET_BOUNDS = tuple(2 ** power / 1_000_000 for power in range(26))
+
+
+class Histogram:
+    """Гистограмма задержек с логарифмическими корзинами (границы - степени двойки микросекунд)."""
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        bucket = 0
+        while bucket < len(BUCKET_BOUNDS) and seconds > BUCKET_BOUNDS[bucket]:
+            bucket += 1
+        self.buckets[bucket] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Возвращает оценку перцентиля сверху - границу корзины, в которую он попадает."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min(BUCKET_BOUNDS[bucket] if bucket < len(BUCKET_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "min_ms": round(self.min * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    """
+    Счетчики и гистограммы задержек операций библиотеки и менеджеров данных.
+    По умолчанию сбор отключен: инструментированный код проверяет только флаг enabled.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        self.histograms: dict[str, Histogram] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Сбрасывает все собранные значения."""
+        self.counters.clear()
+        self.histograms.clear()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Увеличивает счетчик name на value."""
+        if self.enabled:
+            self.counters[name] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Добавляет значение задержки в гистограмму name."""
+        if self.enabled:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Замеряет время выполнения блока и добавляет его в гистограмму name."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Возвращает собранные значения в виде словаря."""
+        return {
+            "counters": dict(sorted(self.counters.items())),
+            "latency": {name: self.histograms[name].to_dict() for name in sorted(self.histograms)},
+        }
+
+    def report(self) -> str:
+        """Возвращает текстовый отчет по собранным значениям."""
+        if not self.counters and not self.histograms:
+            return "Данные о производительности не собраны."
+
+        lines = [
+            f"{'Операция':<40}{'Вызовов':>10}{'Всего, мс':>12}{'Сред., мс':>12}{'p50, мс':>10}"
+            f"{'p99, мс':>10}{'Макс., мс':>12}",
+            "-" * 106,
+        ]
+        for name, values in self.snapshot()["latency"].items():
+            lines.append(
+                f"{name:<40}{values['count']:>10}{values['total_ms']:>12.3f}{values['avg_ms']:>12.3f}"
+                f"{values['p50_ms']:>10.3f}{values['p99_ms']:>10.3f}{values['max_ms']:>12.3f}"
+            )
+        if self.counters:
+            lines.append("")
+            lines.extend(f"{name:<40}{value:>10}" for name, value in sorted(self.counters.items()))
+        return "\n".join(lines)
+
+
+METRICS = Metrics()
+
+
+def instrumented(name: str) -> Callable[[F], F]:
+    """Декоратор: считает вызовы функции и замеряет их длительность, если сбор метрик включен."""
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                METRICS.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
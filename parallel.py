@@ -0,0 +1,144 @@
+"""
+Параллельный просмотр каталога в нескольких процессах для поиска, который не может использовать индекс.
+Нормализованные ключи книг передаются процессам один раз: снимок сохраняется в памяти родительского процесса
+перед созданием пула, и процессы, запущенные через fork, получают его вместе со всей памятью родителя.
+Запросу передаются только параметры поиска и границы части каталога, а в ответ возвращаются номера найденных книг.
+"""
+import itertools
+import multiprocessing
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from heapq import merge
+from typing import Any, Optional
+
+from indexes import SEARCH_FIELDS, SearchKeys
+from metrics import METRICS
+
+# Каталог меньшего размера просматривается в одном процессе: передача задач процессам дороже самого просмотра.
+PARALLEL_THRESHOLD = 200_000
+# Количество частей каталога на один процесс: части поменьше выравнивают нагрузку между процессами.
+CHUNKS_PER_WORKER = 4
+
+# Снимки ключей по номеру поколения. Процессы пула получают снимок при fork и читают его из своей копии памяти.
+_SNAPSHOTS: dict[int, dict[str, list[str]]] = {}
+_generations = itertools.count(1)
+_snapshot_lock = threading.Lock()
+
+
+def _check_snapshot(generation: int) -> bool:
+    """Проверяет в процессе пула, что он получил снимок нужного поколения."""
+    return generation in _SNAPSHOTS
+
+
+def _scan_chunk(generation: int, field: str, term: str, start: int, end: int) -> bytes:
+    """Возвращает номера книг части каталога [start, end), значение поля которых содержит term."""
+    values = _SNAPSHOTS[generation][field]
+    positions = array("i", [
+        position for position, value in enumerate(itertools.islice(values, start, end), start) if term in value
+    ])
+    return positions.tobytes()
+
+
+def fork_available() -> bool:
+    """Проверяет, поддерживает ли платформа запуск процессов через fork."""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+class ParallelScanner:
+    """
+    Просмотр каталога по частям в пуле процессов (ProcessPoolExecutor).
+    Получает изменения каталога как индекс (add, remove, update_status): книги, добавленные и удаленные после
+    снятия снимка, проверяются в родительском процессе. Когда таких книг становится много, снимок и пул создаются заново.
+    """
+    def __init__(self, workers: Optional[int] = None, threshold: int = PARALLEL_THRESHOLD):
+        """
+        :param workers: Количество процессов (по умолчанию - количество ядер).
+        :param threshold: Минимальный размер каталога, начиная с которого просмотр выполняется параллельно.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._generation: Optional[int] = None
+        self._ids: list[str] = []
+        self._added: set[str] = set()
+        self._removed: set[str] = set()
+
+    def add(self, book: Any) -> None:
+        if self._generation is not None:
+            self._added.add(book.id)
+
+    def remove(self, book: Any) -> None:
+        if self._generation is not None:
+            self._added.discard(book.id)
+            self._removed.add(book.id)
+
+    def update_status(self, book: Any, old_status: str) -> None:
+        """Статус не участвует в поиске по подстроке, снимок остается актуальным."""
+
+    def accepts(self, size: int) -> bool:
+        """Проверяет, выполнять ли просмотр каталога из size книг параллельно."""
+        return size >= self.threshold and fork_available()
+
+    def _is_outdated(self) -> bool:
+        changed = len(self._added) + len(self._removed)
+        return changed > max(1000, len(self._ids) // 20)
+
+    def _take_snapshot(self, catalog: dict[str, Any], search_keys: SearchKeys) -> None:
+        """Сохраняет ключи книг в порядке ID и запускает пул процессов, получающих их копию."""
+        self.reset()
+        self._ids = sorted(catalog, key=int)
+        snapshot = {field: [search_keys.keys(field)[book_id] for book_id in self._ids] for field in SEARCH_FIELDS}
+        with _snapshot_lock:
+            generation = next(_generations)
+            _SNAPSHOTS[generation] = snapshot
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("fork"))
+            # Процессы пула запускаются при первой задаче и копируют память, пока снимок в ней есть.
+            self._pool.submit(_check_snapshot, generation).result()
+        self._generation = generation
+        METRICS.increment("parallel.snapshots")
+
+    def search(self, catalog: dict[str, Any], search_keys: SearchKeys, field: str, term: str) -> list[str]:
+        """
+        Возвращает ID книг каталога в порядке ID, нормализованное значение поля field которых содержит term.
+        :param catalog: Каталог {ID: книга}.
+        :param search_keys: Нормализованные ключи книг каталога.
+        """
+        if self._generation is None or self._is_outdated():
+            self._take_snapshot(catalog, search_keys)
+
+        size = len(self._ids)
+        chunk_size = -(-size // (self.workers * CHUNKS_PER_WORKER)) or 1
+        futures = [
+            self._pool.submit(_scan_chunk, self._generation, field, term, start, min(start + chunk_size, size))
+            for start in range(0, size, chunk_size)
+        ]
+        found = []
+        for future in futures:
+            positions = array("i")
+            positions.frombytes(future.result())
+            found.extend(self._ids[position] for position in positions)
+        METRICS.increment("parallel.scans")
+
+        if self._removed:
+            found = [book_id for book_id in found if book_id not in self._removed]
+        keys = search_keys.keys(field)
+        added = sorted((book_id for book_id in self._added if term in keys[book_id]), key=int)
+        return list(merge(found, added, key=int))
+
+    def reset(self) -> None:
+        """Удаляет снимок и останавливает пул процессов; следующий поиск снимет новый снимок."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._generation is not None:
+            _SNAPSHOTS.pop(self._generation, None)
+            self._generation = None
+        self._ids = []
+        self._added.clear()
+        self._removed.clear()
+
+    def close(self) -> None:
+        """Останавливает пул процессов."""
+        self.reset()
@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Iterable, Optional
+
+from indexes import SortedIndex
+
+SORT_FIELDS = ("id", "title", "author", "year")
+SORT_FIELDS_MAPPING = {
+    "id": "id",
+    "название": "title",
+    "автор": "author",
+    "год": "year",
+}
+
+
+@dataclass
+class BookQuery:
+    """
+    Запрос к каталогу. Все заданные условия объединяются через И.
+    Сравнение названий и авторов выполняется без учета регистра.
+    """
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    author: Optional[str] = None
+    author_prefix: Optional[str] = None
+    title: Optional[str] = None
+    title_prefix: Optional[str] = None
+    status: Optional[str] = None
+    sort_by: str = "id"
+    descending: bool = False
+    limit: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.sort_by not in SORT_FIELDS:
+            raise ValueError(f"Неизвестное поле сортировки: {self.sort_by}")
+
+    def matches(self, book: Any) -> bool:
+        """Проверяет, удовлетворяет ли книга всем условиям запроса."""
+        if self.year_from is not None and book.year < self.year_from:
+            return False
+        if self.year_to is not None and book.year > self.year_to:
+            return False
+        if self.status is not None and book.status != self.status:
+            return False
+        for field, exact, prefix in (
+                ("author", self.author, self.author_prefix),
+                ("title", self.title, self.title_prefix),
+        ):
+            value = getattr(book, field).lower()
+            if exact is not None and value != exact.lower():
+                return False
+            if prefix is not None and not value.startswith(prefix.lower()):
+                return False
+        return True
+
+
+def _sort_key(field: str):
+    if field == "id":
+        return lambda book: int(book.id)
+    if field == "year":
+        return lambda book: (book.year, int(book.id))
+    return lambda book: (getattr(book, field).lower(), int(book.id))
+
+
+class QueryEngine:
+    """
+    Выполняет запросы BookQuery к каталогу с помощью упорядоченных индексов по году, автору и названию.
+    Для запроса выбирается самое избирательное индексированное условие (оценка - за O(log n)),
+    остальные условия проверяются только для найденных по индексу книг.
+    """
+    def __init__(self, catalog: dict[str, Any]):
+        self._catalog = catalog
+        self.indexes = {
+            "year": SortedIndex("year"),
+            "author": SortedIndex("author", str.lower),
+            "title": SortedIndex("title", str.lower),
+        }
+        for index in self.indexes.values():
+            index.build(catalog.values())
+
+    def _index_conditions(self, query: BookQuery) -> list[tuple[str, dict[str, Any]]]:
+        """Возвращает условия запроса, которые можно выполнить по индексу, в виде (поле, параметры диапазона)."""
+        conditions = []
+        if query.year_from is not None or query.year_to is not None:
+            conditions.append(("year", {"low": query.year_from, "high": query.year_to}))
+        for field, exact, prefix in (
+                ("author", query.author, query.author_prefix),
+                ("title", query.title, query.title_prefix),
+        ):
+            if exact is not None:
+                conditions.append((field, {"low": exact.lower(), "high": exact.lower()}))
+            elif prefix is not None:
+                conditions.append((field, {"prefix": prefix.lower()}))
+        return conditions
+
+    def execute(self, query: BookQuery) -> list[Any]:
+        """Возвращает книги, удовлетворяющие запросу, с учетом сортировки и ограничения количества."""
+        conditions = self._index_conditions(query)
+        if conditions:
+            field, bounds = min(conditions, key=lambda condition: self.indexes[condition[0]].count(**condition[1]))
+            candidates: Iterable[Any] = (self._catalog[str(book_id)] for book_id in self.indexes[field].ids(**bounds))
+            ordered_by = field
+        else:
+            candidates = self._catalog.values()
+            ordered_by = None
+
+        books = (book for book in candidates if query.matches(book))
+        # Если книги уже идут в нужном порядке (по ключу индекса), достаточно первых limit совпадений.
+        if query.sort_by == ordered_by and not query.descending:
+            return list(islice(books, query.limit))
+
+        result = sorted(books, key=_sort_key(query.sort_by), reverse=query.descending)
+        return result[:query.limit] if query.limit is not None else result
+
+
+def parse_year_range(value: str) -> tuple[Optional[int], Optional[int]]:
+    """
+    Разбирает диапазон годов вида '1900-1950', '1900-', '-1950' или '1949'. Пустая строка - без ограничений.
+    :raises ValueError: Если строка не является диапазоном годов.
+    """
+    value = value.strip()
+    if not value:
+        return None, None
+    if "-" not in value:
+        year = int(value)
+        return year, year
+    low, high = (part.strip() for part in value.split("-", 1))
+    year_from = int(low) if low else None
+    year_to = int(high) if high else None
+    if year_from is not None and year_to is not None and year_from > year_to:
+        raise ValueError("Начало диапазона больше конца")
+    return year_from, year_to
+
+
+def parse_text_filter(value: str) -> tuple[Optional[str], Optional[str]]:
+    """
+    Разбирает условие на текстовое поле: 'Лев Толстой' - точное совпадение, 'Толст*' - совпадение по началу.
+    :return: Пара (точное значение, начало значения), незаданные элементы - None.
+    """
+    value = value.strip()
+    if not value:
+        return None, None
+    if value.endswith("*"):
+        return None, value[:-1]
+    return value, None
+
+
+def parse_sort(value: str) -> tuple[str, bool]:
+    """
+    Разбирает поле сортировки: 'год' - по возрастанию, '-год' - по убыванию. Пустая строка - по ID.
+    :raises KeyError: Если поле сортировки неизвестно.
+    """
+    value = value.strip().lower()
+    descending = value.startswith("-")
+    field = value.lstrip("-") or "id"
+    return SORT_FIELDS_MAPPING[field], descending
@@ -0,0 +1,210 @@
+"""
+Выполнение сценария - последовательности команд к библиотеке без диалога с пользователем.
+Команды читаются построчно из файла или стандартного ввода в формате JSONL или в виде командной строки:
+
+    add "Война и мир" "Лев Толстой" 1869
+    delete 5
+    search автор Толстой
+    status 5 выдана
+
+    {"command": "add", "title": "Война и мир", "author": "Лев Толстой", "year": 1869}
+    {"command": "delete", "id": 5}
+    {"command": "search", "type": "автор", "term": "Толстой"}
+    {"command": "status", "id": 5, "status": "выдана"}
+
+Пустые строки и строки, начинающиеся с '#', пропускаются.
+Результат каждой команды выводится отдельной строкой JSON:
+
+    {"line": 1, "command": "add", "ok": true, "book": {"id": "1", ...}}
+    {"line": 2, "command": "delete", "ok": false, "error": "Книга с id 5 не найдена."}
+"""
+import json
+import re
+import shlex
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Optional, TextIO
+
+from librarian import SEARCH_TYPES
+from library import Book, Library
+from validators import is_not_empty, is_positive_integer, is_valid_status, is_valid_year
+
+# Параметры каждой команды в том порядке, в котором они указываются в командной строке.
+COMMAND_PARAMS = {
+    "add": ("title", "author", "year"),
+    "delete": ("id",),
+    "search": ("type", "term"),
+    "status": ("id", "status"),
+}
+COMMAND_ALIASES = {"change_status": "status"}
+# Слова и строки в двойных кавычках без экранирования - частый случай, который разбирается без shlex.
+SIMPLE_TOKEN = re.compile(r'"([^"\\]*)"|([^\s"\'\\]+)')
+SIMPLE_LINE = re.compile(r'\s*(?:(?:"[^"\\]*"|[^\s"\'\\]+)(?:\s+|$))*')
+
+
+class CommandError(ValueError):
+    """Ошибка в команде сценария: неизвестная команда или некорректные параметры."""
+
+
+@dataclass
+class ScriptReport:
+    """Итоги выполнения сценария."""
+    total: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def commands_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        """Возвращает текстовый отчет о выполнении сценария."""
+        return (
+            f"Выполнено команд: {self.total}, с ошибкой: {self.failed}. "
+            f"Время выполнения: {self.elapsed:.2f} с ({self.commands_per_second:.0f} команд/с)."
+        )
+
+
+def parse_command(line: str) -> tuple[str, dict[str, Any]]:
+    """
+    Разбирает строку сценария в формате JSON или командной строки.
+    :return: Пара (название команды, параметры).
+    """
+    if line.lstrip().startswith("{"):
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            raise CommandError("строка не является объектом JSON") from None
+        if not isinstance(data, dict):
+            raise CommandError("строка не является объектом JSON")
+        command = str(data.pop("command", ""))
+        command = COMMAND_ALIASES.get(command, command)
+        if command not in COMMAND_PARAMS:
+            raise CommandError(f"неизвестная команда '{command}'")
+        return command, data
+
+    if SIMPLE_LINE.fullmatch(line):
+        words = [quoted or word for quoted, word in SIMPLE_TOKEN.findall(line)]
+    else:
+        try:
+            words = shlex.split(line)
+        except ValueError as error:
+            raise CommandError(f"некорректная строка команды: {error}") from None
+    if not words:
+        raise CommandError("пустая команда")
+    command = COMMAND_ALIASES.get(words[0], words[0])
+    if command not in COMMAND_PARAMS:
+        raise CommandError(f"неизвестная команда '{command}'")
+    if len(words) - 1 != len(COMMAND_PARAMS[command]):
+        raise CommandError(f"команда '{command}' принимает параметры: {', '.join(COMMAND_PARAMS[command])}")
+    return command, dict(zip(COMMAND_PARAMS[command], words[1:]))
+
+
+def _param(params: dict[str, Any], name: str, validator: Any, error_message: str) -> str:
+    """Возвращает параметр команды в виде строки, проверенный тем же валидатором, что и ручной ввод."""
+    value = params.get(name)
+    value = "" if value is None else str(value)
+    if not validator(value):
+        raise CommandError(error_message)
+    return value
+
+
+def execute_command(library: Library, command: str, params: dict[str, Any]) -> dict[str, Any]:
+    """
+    Выполняет одну команду и возвращает ее результат (без номера строки): затронутую книгу ('book')
+    или найденные книги ('books') в виде объектов Book.
+    Некорректные параметры и отсутствующие книги выбрасывают CommandError.
+    """
+    if command == "add":
+        title = _param(params, "title", is_not_empty, "Название книги не может быть пустым.")
+        author = _param(params, "author", is_not_empty, "Автор книги не может быть пустым.")
+        year = _param(params, "year", is_valid_year, "Год издания должен быть числом и быть не больше текущего года.")
+        return {"book": library.create_book(title, author, year)}
+
+    if command == "search":
+        search_type = _param(
+            params, "type", lambda value: value in SEARCH_TYPES,
+            "Параметр поиска может быть только 'название', 'автор' или 'год'.",
+        )
+        search_term = _param(params, "term", is_not_empty, "Значение для поиска не может быть пустым.")
+        return {"books": library.find_books(SEARCH_TYPES[search_type], search_term)}
+
+    book_id = _param(params, "id", is_positive_integer, "ID книги должен быть целым числом.")
+    if command == "delete":
+        book = library.remove_book(book_id)
+    else:
+        status = _param(params, "status", is_valid_status, "Статус книги может быть только 'выдана' или 'в наличии'.")
+        book = library.set_status(book_id, status)
+    if book is None:
+        raise CommandError(f"Книга с id {book_id} не найдена.")
+    return {"book": book}
+
+
+def _snapshot(result: dict[str, Any], books: list[tuple[dict[str, Any], Book]]) -> None:
+    """
+    Заменяет книги в результате команды их данными на момент выполнения команды.
+    Пары (данные, книга) добавляются в books: ID в данных уточняется после сохранения пакета,
+    при котором добавленная книга может получить другой ID (см. Library.batch).
+    """
+    for key, value in result.items():
+        if isinstance(value, Book):
+            result[key] = value.to_dict()
+            books.append((result[key], value))
+        elif key == "books":
+            result[key] = [book.to_dict() for book in value]
+            books.extend(zip(result[key], value))
+
+
+def run_script(
+        library: Library,
+        lines: Iterable[str],
+        batch_size: Optional[int] = None,
+        report: Optional[ScriptReport] = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Последовательно выполняет команды сценария и выдает их результаты.
+    Изменения сохраняются одной записью в конце сценария или, если передан batch_size,
+    после каждых batch_size команд (через Library.batch()); результаты команд выдаются после сохранения.
+    :param library: Библиотека, к которой выполняются команды.
+    :param lines: Строки сценария.
+    :param batch_size: Количество команд, после выполнения которых изменения сохраняются.
+    :param report: Отчет, в который записываются итоги выполнения.
+    """
+    report = report if report is not None else ScriptReport()
+    start = time.perf_counter()
+    numbered = ((number, line) for number, line in enumerate(lines, start=1)
+                if line.strip() and not line.lstrip().startswith("#"))
+    try:
+        while True:
+            results = []
+            books: list[tuple[dict[str, Any], Book]] = []
+            with library.batch():
+                for line_number, line in numbered:
+                    result: dict[str, Any] = {"line": line_number}
+                    try:
+                        command, params = parse_command(line)
+                        result["command"] = command
+                        result.update(ok=True, **execute_command(library, command, params))
+                        _snapshot(result, books)
+                    except CommandError as error:
+                        result.update(ok=False, error=str(error))
+                        report.failed += 1
+                    report.total += 1
+                    results.append(result)
+                    if batch_size and len(results) >= batch_size:
+                        break
+            # Результаты выдаются только после сохранения изменений, которые к ним привели,
+            # с ID, под которыми книги сохранены.
+            for data, book in books:
+                data["id"] = book.id
+            yield from results
+            if not batch_size or len(results) < batch_size:
+                break
+    finally:
+        report.elapsed = time.perf_counter() - start
+
+
+def write_results(results: Iterable[dict[str, Any]], output: TextIO) -> None:
+    """Выводит результаты команд по одному объекту JSON в строке."""
+    for result in results:
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
@@ -0,0 +1,310 @@
+"""
+Сервер библиотеки: доступ к Library по локальному TCP-сокету для многих клиентов одновременно.
+Протокол - JSON-RPC 2.0 построчно: каждый запрос и каждый ответ - один объект JSON в отдельной строке (UTF-8).
+
+Методы:
+    add(title, author, year) -> книга
+    delete(id) -> удаленная книга
+    change_status(id, status) -> книга
+    search(type, term) -> список книг ('type' - title, author, year или название, автор, год)
+    list(offset=0, limit=100) -> список книг
+
+Пример запроса и ответа:
+    {"jsonrpc": "2.0", "id": 1, "method": "search", "params": {"type": "автор", "term": "Толстой"}}
+    {"jsonrpc": "2.0", "id": 1, "result": [{"id": "1", "title": "Война и мир", ...}]}
+
+Запросы на чтение выполняются сразу и не ждут записи. Изменения выполняются по очереди одной задачей записи:
+все изменения, накопившиеся в очереди, применяются к каталогу в памяти и сохраняются одной записью в отдельном
+потоке, а ответы на них отправляются после сохранения. Ошибочное изменение не мешает сохранению остальных.
+"""
+import asyncio
+import itertools
+import json
+import time
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Optional
+
+from librarian import SEARCH_TYPES
+from library import Book, Library
+from validators import is_not_empty, is_positive_integer, is_valid_status, is_valid_year
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+BOOK_NOT_FOUND = 1
+
+DEFAULT_LIST_LIMIT = 100
+# Ответ с результатами поиска по большому каталогу может занимать много мегабайт.
+CLIENT_LINE_LIMIT = 256 * 1024 * 1024
+
+
+class RPCError(Exception):
+    """Ошибка выполнения запроса, передаваемая клиенту в поле 'error' ответа."""
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _param(params: dict[str, Any], name: str, validator: Callable[[str], bool], error_message: str) -> str:
+    """Возвращает параметр запроса в виде строки, проверенный тем же валидатором, что и ручной ввод."""
+    value = params.get(name)
+    value = "" if value is None else str(value)
+    if not validator(value):
+        raise RPCError(INVALID_PARAMS, error_message)
+    return value
+
+
+def _count_param(params: dict[str, Any], name: str, default: int, error_message: str) -> int:
+    """Возвращает целый неотрицательный параметр запроса (default, если параметр не передан)."""
+    value = str(params.get(name, default))
+    if not value.isdigit():
+        raise RPCError(INVALID_PARAMS, error_message)
+    return int(value)
+
+
+class LibraryServer:
+    """
+    Сервер, обслуживающий запросы к библиотеке по протоколу JSON-RPC.
+    Все обращения к Library, кроме сохранения изменений, выполняются в потоке цикла событий.
+    Пока изменения сохраняются в отдельном потоке, каталог не изменяется: следующие изменения ждут в очереди.
+    """
+    def __init__(self, library: Library, max_batch: int = 1000):
+        """
+        :param library: Библиотека, к которой выполняются запросы.
+        :param max_batch: Максимальное количество изменений, сохраняемых одной записью.
+        """
+        self.library = library
+        self.max_batch = max_batch
+        self.server: Optional[asyncio.Server] = None
+        self._mutations: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._methods: dict[str, Callable[[dict[str, Any]], Awaitable[Any]]] = {
+            "add": self.add,
+            "delete": self.delete,
+            "change_status": self.change_status,
+            "search": self.search,
+            "list": self.list,
+        }
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        """Запускает задачу записи и начинает принимать подключения (port=0 - любой свободный порт)."""
+        self._mutations = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    @property
+    def address(self) -> tuple[str, int]:
+        """Адрес и порт, на которых сервер принимает подключения."""
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        """Прекращает прием подключений, дожидается сохранения изменений из очереди и останавливает задачу записи."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._writer_task is not None:
+            await self._mutations.join()
+            self._writer_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._writer_task
+
+    async def _write_loop(self) -> None:
+        """
+        Применяет накопившиеся в очереди изменения к каталогу в памяти, сохраняет их одной записью
+        в отдельном потоке и отвечает на них после сохранения.
+        """
+        while True:
+            pending = [await self._mutations.get()]
+            while len(pending) < self.max_batch and not self._mutations.empty():
+                pending.append(self._mutations.get_nowait())
+
+            applied = []
+            try:
+                with self.library.collect_changes() as changes:
+                    for mutation, future in pending:
+                        # Ошибка одного изменения отменяет только его, остальные изменения очереди сохраняются.
+                        try:
+                            with self.library.batch():
+                                result = mutation()
+                        except Exception as error:
+                            if not future.done():
+                                future.set_exception(error)
+                        else:
+                            applied.append((future, result))
+                try:
+                    # Запись выполняется в отдельном потоке: цикл событий продолжает отвечать на запросы чтения.
+                    await asyncio.to_thread(changes.save)
+                except Exception as error:
+                    # Изменения, которые не удалось сохранить, отменяются в памяти.
+                    changes.rollback()
+                    for future, _ in applied:
+                        if not future.done():
+                            future.set_exception(error)
+                else:
+                    for future, result in applied:
+                        if not future.done():
+                            future.set_result(result)
+            finally:
+                for _ in pending:
+                    self._mutations.task_done()
+
+    async def _mutate(self, mutation: Callable[[], Optional[Book]]) -> Book:
+        """Ставит изменение в очередь задачи записи и ждет его сохранения."""
+        future = asyncio.get_running_loop().create_future()
+        await self._mutations.put((mutation, future))
+        book = await future
+        if book is None:
+            raise RPCError(BOOK_NOT_FOUND, "Книга не найдена")
+        return book
+
+    async def add(self, params: dict[str, Any]) -> dict[str, Any]:
+        title = _param(params, "title", is_not_empty, "Название книги не может быть пустым")
+        author = _param(params, "author", is_not_empty, "Автор книги не может быть пустым")
+        year = _param(params, "year", is_valid_year, "Год издания должен быть числом и быть не больше текущего года")
+        book = await self._mutate(lambda: self.library.create_book(title, author, year))
+        return book.to_dict()
+
+    async def delete(self, params: dict[str, Any]) -> dict[str, Any]:
+        book_id = _param(params, "id", is_positive_integer, "ID книги должен быть целым числом")
+        book = await self._mutate(lambda: self.library.remove_book(book_id))
+        return book.to_dict()
+
+    async def change_status(self, params: dict[str, Any]) -> dict[str, Any]:
+        book_id = _param(params, "id", is_positive_integer, "ID книги должен быть целым числом")
+        status = _param(params, "status", is_valid_status, "Статус книги может быть только 'выдана' или 'в наличии'")
+        book = await self._mutate(lambda: self.library.set_status(book_id, status))
+        return book.to_dict()
+
+    async def search(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        search_type = _param(
+            params, "type", lambda value: value in SEARCH_TYPES,
+            "Параметр поиска может быть только 'название', 'автор' или 'год'",
+        )
+        search_term = _param(params, "term", is_not_empty, "Значение для поиска не может быть пустым")
+        return [book.to_dict() for book in self.library.find_books(SEARCH_TYPES[search_type], search_term)]
+
+    async def list(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        offset = _count_param(params, "offset", 0, "Смещение должно быть целым неотрицательным числом")
+        limit = _count_param(
+            params, "limit", DEFAULT_LIST_LIMIT, "Количество книг должно быть целым неотрицательным числом"
+        )
+        return [book.to_dict() for book in itertools.islice(self.library.iter_books(), offset, offset + limit)]
+
+    async def handle_request(self, request: Any) -> dict[str, Any]:
+        """Выполняет один разобранный запрос и возвращает ответ."""
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                raise RPCError(INVALID_REQUEST, "Запрос должен быть объектом с полем 'method'")
+            params = request.get("params", {})
+            if not isinstance(params, dict):
+                raise RPCError(INVALID_PARAMS, "Параметры запроса должны быть объектом")
+            method = self._methods.get(request["method"])
+            if method is None:
+                raise RPCError(METHOD_NOT_FOUND, f"Неизвестный метод: {request['method']}")
+            result = await method(params)
+        except RPCError as error:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": error.code, "message": error.message}}
+        except Exception as error:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": INTERNAL_ERROR, "message": str(error)}}
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def handle_line(self, line: bytes) -> dict[str, Any]:
+        """Разбирает строку запроса и возвращает ответ."""
+        try:
+            request = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": "Некорректный JSON"}}
+        return await self.handle_request(request)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обслуживает одно подключение: запросы выполняются по порядку, ответ на каждый - отдельной строкой."""
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                response = await self.handle_line(line)
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # Разрыв соединения или слишком длинная строка запроса - подключение закрывается.
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+async def serve(library: Library, host: str = "127.0.0.1", port: int = 0) -> None:
+    """Запускает сервер и обслуживает подключения до остановки (Ctrl+C)."""
+    server = LibraryServer(library)
+    await server.start(host, port)
+    host, port = server.address
+    print(f"Сервер библиотеки запущен на {host}:{port}", flush=True)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+class LibraryClient:
+    """Клиент сервера библиотеки: запросы по одному подключению выполняются по очереди."""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> 'LibraryClient':
+        return cls(*await asyncio.open_connection(host, port, limit=CLIENT_LINE_LIMIT))
+
+    async def call(self, method: str, **params: Any) -> Any:
+        """Выполняет запрос и возвращает результат. Ошибку сервера выбрасывает как RPCError."""
+        request = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+        self._writer.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        await self._writer.drain()
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Сервер закрыл подключение")
+        response = json.loads(line)
+        if "error" in response:
+            raise RPCError(response["error"]["code"], response["error"]["message"])
+        return response["result"]
+
+    async def close(self) -> None:
+        self._writer.close()
+        with suppress(ConnectionError):
+            await self._writer.wait_closed()
+
+
+async def run_load(
+        host: str,
+        port: int,
+        workloads: list[list[tuple[str, dict[str, Any]]]],
+) -> tuple[dict[str, list[float]], float]:
+    """
+    Генератор нагрузки: каждый список запросов выполняется отдельным клиентом по своему подключению,
+    все клиенты работают одновременно.
+    :param workloads: Для каждого клиента - список запросов (метод, параметры).
+    :return: Задержки запросов в секундах по методам и общее время выполнения всех запросов.
+    """
+    latencies: dict[str, list[float]] = {}
+
+    async def run_client(workload: list[tuple[str, dict[str, Any]]]) -> None:
+        client = await LibraryClient.connect(host, port)
+        try:
+            for method, params in workload:
+                start = time.perf_counter()
+                with suppress(RPCError):
+                    await client.call(method, **params)
+                latencies.setdefault(method, []).append(time.perf_counter() - start)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(workload) for workload in workloads))
+    return latencies, time.perf_counter() - start
@@ -0,0 +1,209 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+from data_manager import DataManager, write_atomic
+from indexes import normalize_text
+from metrics import METRICS, instrumented
+
+# Количество книг в одном сегменте по умолчанию: изменение одной книги перезаписывает не больше стольких книг.
+SHARD_SIZE = 10_000
+MANIFEST_NAME = "manifest.json"
+
+
+class ShardedDataManager(DataManager):
+    """
+    Менеджер данных, хранящий каталог в каталоге файлов-сегментов по диапазонам ID:
+    сегмент с номером n содержит книги с ID от n * shard_size + 1 до (n + 1) * shard_size.
+    Файл manifest.json хранит размер сегмента, количество книг в каждом сегменте, счетчик ID и номер версии,
+    поэтому для запуска достаточно прочитать только его. Выборка, удаление и изменение статуса книги читают
+    и перезаписывают только ее сегмент, а поиск и перебор книг читают сегменты по одному.
+    Список сегментов определяется по файлам на диске, а счетчик ID сохраняется до записи сегментов,
+    поэтому сбой между записью сегментов и manifest.json не скрывает новые книги и не приводит к повторной выдаче ID.
+    """
+    def __init__(self, file_path: Path = Path("books.shards"), shard_size: Optional[int] = None):
+        """
+        :param file_path: Каталог с сегментами.
+        :param shard_size: Количество книг в сегменте для нового хранилища. Размер сегмента уже созданного
+        хранилища берется из manifest.json.
+        """
+        super().__init__(file_path)
+        self.meta_path = file_path / MANIFEST_NAME
+        self.lock_path = file_path / ".lock"
+        file_path.mkdir(parents=True, exist_ok=True)
+        self.shard_size = int(self._read_meta().get("shard_size") or shard_size or SHARD_SIZE)
+
+    def _shard_path(self, shard: int) -> Path:
+        return self.file_path / f"shard-{shard:06d}.json"
+
+    def _shard_of(self, book_id: Any) -> int:
+        """Возвращает номер сегмента, в котором хранится книга с переданным ID."""
+        return (int(book_id) - 1) // self.shard_size
+
+    def _shards(self) -> list[int]:
+        """
+        Возвращает номера непустых сегментов по возрастанию по файлам сегментов, а не по manifest.json:
+        сегмент, записанный перед сбоем, не успевшим обновить manifest.json, тоже виден.
+        """
+        return sorted(int(path.stem.split("-")[1]) for path in self.file_path.glob("shard-*.json"))
+
+    def _reserve_ids(self, next_id: int) -> None:
+        """
+        Сохраняет увеличенный счетчик ID в manifest.json до записи сегментов с новыми книгами (под блокировкой),
+        чтобы после сбоя между записью сегментов и manifest.json ID новых книг не были выданы повторно.
+        Номер версии не меняется: он увеличивается только после записи данных.
+        """
+        if next_id > self.load_next_id():
+            self._write_meta(next_id=next_id)
+
+    def _read_shard(self, shard: int) -> dict[str, dict[str, Any]]:
+        """Выгружает книги сегмента в виде {ID: книга} (пустой словарь, если сегмента нет)."""
+        try:
+            books = json.loads(self._shard_path(shard).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        METRICS.increment("sharded.shards_read")
+        return {book["id"]: book for book in books}
+
+    def _write_shard(self, shard: int, books: Iterable[dict[str, Any]]) -> int:
+        """Атомарно записывает сегмент (или удаляет его файл, если книг нет). Возвращает количество книг."""
+        books = list(books)
+        path = self._shard_path(shard)
+        if not books:
+            path.unlink(missing_ok=True)
+            return 0
+        write_atomic(path, self._iter_compact_json(books))
+        METRICS.increment("sharded.shards_written")
+        if METRICS.enabled:
+            METRICS.increment("data_manager.bytes_written", path.stat().st_size)
+        return len(books)
+
+    def _commit(self, counts: dict[int, int], next_id: int) -> None:
+        """
+        Записывает manifest.json с новым количеством книг в переданных сегментах и увеличенным номером версии.
+        Вызывается под блокировкой после записи сегментов: читатель, получивший новую версию, увидит и новые данные.
+        """
+        meta = self._read_meta()
+        shards = {int(shard): count for shard, count in meta.get("shards", {}).items()}
+        shards.update(counts)
+        self.version = self._read_version() + 1
+        self._write_meta(
+            version=self.version,
+            shard_size=self.shard_size,
+            next_id=max(int(meta.get("next_id", 0)), next_id),
+            shards={str(shard): count for shard, count in sorted(shards.items()) if count},
+        )
+
+    def iter_books(self) -> Iterator[dict[str, Any]]:
+        """Последовательно выгружает книги сегментов по возрастанию ID; в памяти находится один сегмент."""
+        # Версия читается до данных: если данные успеют измениться, версия окажется устаревшей, а не наоборот.
+        self.version = self._read_version()
+        for shard in self._shards():
+            yield from self._read_shard(shard).values()
+
+    @instrumented("data_manager.save_books")
+    def save_books(self, books: list[dict[str, Any]]) -> None:
+        """Перезаписывает все сегменты по полученному списку книг и удаляет сегменты, в которых не осталось книг."""
+        partitions: dict[int, list[dict[str, Any]]] = {}
+        for book in books:
+            partitions.setdefault(self._shard_of(book["id"]), []).append(book)
+        next_id = max((int(book["id"]) for book in books), default=0) + 1
+        with self.lock():
+            self._reserve_ids(next_id)
+            # Сегменты, которых нет в новом каталоге, удаляются с диска и из manifest.json.
+            counts = {int(shard): 0 for shard in self._read_meta().get("shards", {})}
+            for shard in self._shards():
+                if shard not in partitions:
+                    self._shard_path(shard).unlink()
+            for shard, shard_books in partitions.items():
+                counts[shard] = self._write_shard(shard, shard_books)
+            self._commit(counts, next_id)
+
+    @instrumented("data_manager.save_changes")
+    def save_changes(self, changes: list[tuple[str, dict[str, Any]]]) -> None:
+        """
+        Применяет изменения вида (тип изменения, книга), где тип - 'add', 'delete' или 'status'.
+        Читается и перезаписывается только сегмент каждой измененной книги, затем один раз - manifest.json.
+        """
+        by_shard: dict[int, list[tuple[str, dict[str, Any]]]] = {}
+        for action, book in changes:
+            by_shard.setdefault(self._shard_of(book["id"]), []).append((action, book))
+
+        next_id = max((int(book["id"]) for action, book in changes if action == "add"), default=0) + 1
+        with self.lock():
+            self._reserve_ids(next_id)
+            counts = {}
+            for shard, shard_changes in by_shard.items():
+                books = self._read_shard(shard)
+                for action, book in shard_changes:
+                    if action == "add":
+                        books[book["id"]] = book
+                    elif action == "delete":
+                        books.pop(book["id"], None)
+                    elif book["id"] in books:
+                        books[book["id"]]["status"] = book["status"]
+                counts[shard] = self._write_shard(shard, sorted(books.values(), key=lambda item: int(item["id"])))
+            self._commit(counts, next_id)
+
+    def save_change(self, action: str, book: dict[str, Any]) -> None:
+        """Применяет одно изменение ('add', 'delete' или 'status')."""
+        self.save_changes([(action, book)])
+
+    def get_book(self, book_id: str) -> Optional[dict[str, Any]]:
+        """Возвращает книгу с переданным ID, читая только ее сегмент, или None, если такой книги нет."""
+        if not str(book_id).isdigit() or int(book_id) < 1:
+            return None
+        return self._read_shard(self._shard_of(book_id)).get(str(book_id))
+
+    def search_books(self, search_type: str, search_term: str) -> list[dict[str, Any]]:
+        """
+        Возвращает книги, у которых нормализованное значение выбранного параметра содержит значение для поиска.
+        Сегменты читаются по одному.
+        :param search_type: Параметр поиска ('title', 'author' или 'year').
+        :param search_term: Значение для поиска в выбранном параметре.
+        """
+        if search_type not in ("title", "author", "year"):
+            raise ValueError(f"Неизвестный параметр поиска: {search_type}")
+        search_term = normalize_text(search_term)
+        return [
+            book
+            for shard in self._shards()
+            for book in self._read_shard(shard).values()
+            if search_term in normalize_text(book[search_type])
+        ]
+
+    def count_books(self) -> int:
+        """
+        Возвращает количество книг по данным manifest.json, не читая сегменты.
+        Читаются только сегменты, которых нет в manifest.json (записанные перед сбоем).
+        """
+        counts = self._read_meta().get("shards", {})
+        return sum(
+            counts[str(shard)] if str(shard) in counts else len(self._read_shard(shard)) for shard in self._shards()
+        )
+
+
+def convert(source: Path, target: Path, shard_size: Optional[int] = None) -> int:
+    """
+    Переносит каталог и счетчик ID из файла books.json в сегментированное хранилище или обратно.
+    Направление определяется по источнику: каталог - сегментированное хранилище, файл - JSON.
+    :return: Количество перенесенных книг.
+    """
+    if source.is_dir():
+        source_manager, target_manager = ShardedDataManager(source), DataManager(target)
+    else:
+        source_manager, target_manager = DataManager(source), ShardedDataManager(target, shard_size)
+    books = source_manager.load_books()
+    target_manager.save_books(books)
+    target_manager.save_next_id(max(source_manager.load_next_id(), target_manager.load_next_id()))
+    return len(books)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Преобразование каталога между books.json и сегментированным хранилищем")
+    parser.add_argument("source", type=Path, help="Исходный файл books.json или каталог сегментов")
+    parser.add_argument("target", type=Path, help="Каталог сегментов или файл books.json результата")
+    parser.add_argument("--shard-size", type=int, help=f"Количество книг в сегменте (по умолчанию {SHARD_SIZE})")
+    args = parser.parse_args()
+    print(f"Перенесено книг: {convert(args.source, args.target, args.shard_size)}")
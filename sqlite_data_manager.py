@@ -0,0 +1,201 @@
+import argparse
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from data_manager import DataManager
+from indexes import normalize_text
+from metrics import instrumented
+
+BOOK_COLUMNS = ("id", "title", "author", "year", "status")
+SEARCH_COLUMNS = ("title", "author", "year")
+# Нормализованные ключи поиска (см. normalize_text) хранятся в отдельных столбцах и вычисляются при сохранении
+# книги, поэтому поиск сравнивает строки средствами SQLite, не вызывая функцию Python для каждой строки.
+# Ключ года совпадает с его текстовым представлением и отдельно не хранится.
+KEY_COLUMNS = {"title": "title_key", "author": "author_key"}
+ROW_COLUMNS = BOOK_COLUMNS + tuple(KEY_COLUMNS.values())
+# Без OR REPLACE: добавление книги с занятым ID завершается ошибкой, а не заменяет чужую книгу.
+INSERT_BOOK = f"INSERT INTO books ({', '.join(ROW_COLUMNS)}) VALUES ({', '.join('?' * len(ROW_COLUMNS))})"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    title_key TEXT NOT NULL DEFAULT '',
+    author_key TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS books_year ON books (year);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class SQLiteDataManager:
+    """
+    Менеджер данных, хранящий книги в базе данных SQLite.
+    Изменения сохраняются построчно, а поиск и выборка отдельных книг выполняются запросами к базе,
+    поэтому библиотеке не нужно держать в памяти весь каталог.
+    """
+    def __init__(self, file_path: Path = Path("books.db")):
+        self.file_path = file_path
+        self.lock_path = file_path.with_name(f"{file_path.name}.lock")
+        self._lock_depth = 0
+        self._lock_file = None
+        # Изменения может сохранять фоновый поток отложенной записи (Library с write_behind).
+        self.connection = sqlite3.connect(file_path, check_same_thread=False)
+        # Встроенная функция LOWER в SQLite работает только с ASCII, поэтому ключи поиска
+        # нормализуются так же, как при поиске в памяти - через normalize_text.
+        self.connection.create_function("normalize_text", 1, normalize_text, deterministic=True)
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """
+        Обновляет базу данных, созданную до появления столбцов с ключами поиска: добавляет столбцы, заполняет их
+        и удаляет индексы по названию и автору, которые поиск по подстроке не использует.
+        """
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(books)")}
+        with self.connection:
+            for field, column in KEY_COLUMNS.items():
+                if column not in columns:
+                    self.connection.execute(f"ALTER TABLE books ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+                    self.connection.execute(f"UPDATE books SET {column} = normalize_text({field})")
+            self.connection.execute("DROP INDEX IF EXISTS books_title")
+            self.connection.execute("DROP INDEX IF EXISTS books_author")
+
+    # Блокировка файла <имя>.lock, как у DataManager: библиотека выделяет ID добавляемых книг под ней,
+    # поэтому несколько процессов, работающих с одной базой, не выдадут один и тот же ID.
+    lock = DataManager.lock
+
+    def close(self) -> None:
+        """Закрывает соединение с базой данных."""
+        self.connection.close()
+
+    @staticmethod
+    def _to_dict(row: tuple) -> dict[str, Any]:
+        book = dict(zip(BOOK_COLUMNS, row))
+        book["id"] = str(book["id"])
+        return book
+
+    @staticmethod
+    def _to_row(book: dict[str, Any]) -> tuple:
+        return (
+            int(book["id"]), book["title"], book["author"], int(book["year"]), book["status"],
+            normalize_text(book["title"]), normalize_text(book["author"]),
+        )
+
+    def load_books(self) -> list[dict[str, Any]]:
+        """Выгружает все книги из базы данных в порядке ID."""
+        return list(self.iter_books())
+
+    def iter_books(self) -> Iterator[dict[str, Any]]:
+        """Последовательно выгружает книги из базы данных в порядке ID, не создавая промежуточный список."""
+        rows = self.connection.execute(f"SELECT {', '.join(BOOK_COLUMNS)} FROM books ORDER BY id")
+        for row in rows:
+            yield self._to_dict(row)
+
+    @instrumented("sqlite.save_books")
+    def save_books(self, books: list[dict[str, Any]]) -> None:
+        """Заменяет содержимое базы данных переданным списком книг."""
+        with self.connection:
+            self.connection.execute("DELETE FROM books")
+            self.connection.executemany(INSERT_BOOK, (self._to_row(book) for book in books))
+
+    @instrumented("sqlite.save_changes")
+    def save_changes(self, changes: list[tuple[str, dict[str, Any]]]) -> None:
+        """
+        Сохраняет изменения в базе данных одной транзакцией.
+        :param changes: Список пар (тип изменения - 'add', 'delete' или 'status', данные измененной книги).
+        """
+        with self.connection:
+            for action, book in changes:
+                if action == "add":
+                    self.connection.execute(INSERT_BOOK, self._to_row(book))
+                elif action == "delete":
+                    self.connection.execute("DELETE FROM books WHERE id = ?", (int(book["id"]),))
+                elif action == "status":
+                    self.connection.execute(
+                        "UPDATE books SET status = ? WHERE id = ?", (book["status"], int(book["id"]))
+                    )
+                else:
+                    raise ValueError(f"Неизвестный тип изменения: {action}")
+
+    def save_change(self, action: str, book: dict[str, Any]) -> None:
+        """
+        Сохраняет одно изменение в базе данных.
+        :param action: Тип изменения - 'add', 'delete' или 'status'.
+        :param book: Данные измененной книги.
+        """
+        self.save_changes([(action, book)])
+
+    def load_next_id(self) -> int:
+        """Возвращает следующий свободный ID с учетом ID уже удаленных книг."""
+        saved = self.connection.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        max_id = self.connection.execute("SELECT MAX(id) FROM books").fetchone()[0]
+        return max(saved[0] if saved else 0, (max_id or 0) + 1)
+
+    def save_next_id(self, next_id: int) -> None:
+        """Сохраняет значение счетчика ID."""
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('next_id', ?)", (next_id,))
+
+    @instrumented("sqlite.get_book")
+    def get_book(self, book_id: str) -> Optional[dict[str, Any]]:
+        """Возвращает книгу с переданным ID или None, если такой книги нет."""
+        if not book_id.isdigit():
+            return None
+        row = self.connection.execute(
+            f"SELECT {', '.join(BOOK_COLUMNS)} FROM books WHERE id = ?", (int(book_id),)
+        ).fetchone()
+        return self._to_dict(row) if row else None
+
+    @instrumented("sqlite.search_books")
+    def search_books(self, search_type: str, search_term: str) -> list[dict[str, Any]]:
+        """
+        Возвращает книги, у которых нормализованное значение выбранного параметра содержит значение для поиска.
+        :param search_type: Параметр поиска ('title', 'author' или 'year').
+        :param search_term: Значение для поиска в выбранном параметре.
+        """
+        if search_type not in SEARCH_COLUMNS:
+            raise ValueError(f"Неизвестный параметр поиска: {search_type}")
+        column = KEY_COLUMNS.get(search_type, "CAST(year AS TEXT)")
+        rows = self.connection.execute(
+            f"SELECT {', '.join(BOOK_COLUMNS)} FROM books WHERE instr({column}, ?) > 0 ORDER BY id",
+            (normalize_text(search_term),),
+        )
+        return [self._to_dict(row) for row in rows]
+
+    def count_books(self) -> int:
+        """Возвращает количество книг в базе данных."""
+        return self.connection.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+
+def migrate_from_json(json_path: Path, db_path: Path) -> int:
+    """
+    Переносит книги и счетчик ID из файла books.json в базу данных SQLite.
+    :return: Количество перенесенных книг.
+    """
+    json_manager = DataManager(json_path)
+    books = json_manager.load_books()
+    next_id = max(json_manager.load_next_id(), max((int(book["id"]) for book in books), default=0) + 1)
+
+    sqlite_manager = SQLiteDataManager(db_path)
+    try:
+        sqlite_manager.save_books(books)
+        sqlite_manager.save_next_id(next_id)
+    finally:
+        sqlite_manager.close()
+    return len(books)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перенос книг из books.json в базу данных SQLite")
+    parser.add_argument("json_path", type=Path, help="Исходный файл books.json")
+    parser.add_argument("db_path", type=Path, help="Файл базы данных SQLite")
+    args = parser.parse_args()
+    print(f"Перенесено книг: {migrate_from_json(args.json_path, args.db_path)}")
@@ -1,11 +1,35 @@
+import asyncio
+import gzip
+import io
+import json
+import lzma
 import unittest
 import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
 from unittest.mock import patch, Mock
 import tempfile
 from pathlib import Path
-from data_manager import DataManager
-from library import Library, BookStatus
+from data_manager import NEW_FILE_MODE, DataManager, JournalDataManager, write_atomic
+from collections import Counter
+from library import PAGE_SIZE, Book, Library, BookStatus
 from librarian import Librarian
+from indexes import FuzzyIndex, SearchCache, SearchKeys, TrigramIndex, edit_distance, normalize_text
+from sqlite_data_manager import SQLiteDataManager, migrate_from_json
+from binary_data_manager import BinaryDataManager, convert
+from sharded_data_manager import ShardedDataManager, convert as convert_shards
+from importer import import_books
+from script import CommandError, ScriptReport, parse_command, run_script, write_results
+from benchmark import generate_books, summarize, time_to_first_menu
+from metrics import METRICS, Histogram
+from parallel import ParallelScanner, fork_available
+from write_behind import WriteBehind
+from server import BOOK_NOT_FOUND, INVALID_PARAMS, METHOD_NOT_FOUND, LibraryClient, LibraryServer, RPCError
+from query import BookQuery, parse_year_range, parse_text_filter, parse_sort
+from validators import VALID_STATUSES, is_not_empty, is_valid_id_list, is_valid_year, is_valid_status, parse_id_list
 
 
 
@@ -19,6 +43,8 @@ class TestDataManager(unittest.TestCase):
 
     def tearDown(self):
         self.temp_file_path.unlink(missing_ok=True)
+        self.data_manager.meta_path.unlink(missing_ok=True)
+        self.data_manager.lock_path.unlink(missing_ok=True)
 
 
     def test_load_file_not_found(self):
@@ -42,6 +68,420 @@ class TestDataManager(unittest.TestCase):
         books = self.data_manager.load_books()
         self.assertEqual(books, [])
 
+    def test_iter_books_in_small_chunks(self):
+        books = [
+            {"id": str(i), "title": f"Книга [{i}], \"часть\" {i}", "author": "Автор, {}", "year": 1900 + i,
+             "status": "в наличии"}
+            for i in range(1, 30)
+        ]
+        self.data_manager.save_books(books)
+        for chunk_size in (1, 7, 64, 100000):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(self.data_manager.iter_books(chunk_size)), books)
+
+    def test_iter_books_empty_list(self):
+        self.temp_file_path.write_text(" [ \n ] ")
+        self.assertEqual(list(self.data_manager.iter_books()), [])
+
+    def test_load_truncated_json(self):
+        self.temp_file_path.write_text('[{"id": "1"}, {"id": "2"')
+        self.assertEqual(self.data_manager.load_books(), [])
+
+    def test_library_with_invalid_json_is_empty(self):
+        self.temp_file_path.write_text('[{"id": "1", "title": "Book1", "author": "Author 1", "year": 1991, '
+                                       '"status": "выдана"}, oops]')
+        self.assertEqual(Library(self.data_manager).books, [])
+
+
+class TestJournalDataManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(self.temp_dir.name) / "books.json"
+        self.data_manager = JournalDataManager(self.file_path, compact_threshold=100)
+        self.book = {"id": "1", "title": "Book1", "author": "Author 1", "year": 1991, "status": "в наличии"}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_changes_are_appended_to_journal(self):
+        self.data_manager.save_change("add", self.book)
+        self.data_manager.save_change("status", {**self.book, "status": "выдана"})
+
+        self.assertFalse(self.file_path.exists())
+        self.assertEqual(len(self.data_manager.journal_path.read_text(encoding="utf-8").splitlines()), 2)
+        self.assertEqual(self.data_manager.load_books(), [{**self.book, "status": "выдана"}])
+
+    def test_replay_snapshot_and_journal(self):
+        self.data_manager.save_books([self.book])
+        self.data_manager.save_change("add", {**self.book, "id": "2", "title": "Book2"})
+        self.data_manager.save_change("delete", self.book)
+
+        loaded_books = JournalDataManager(self.file_path).load_books()
+        self.assertEqual([book["id"] for book in loaded_books], ["2"])
+
+    def test_compaction_by_threshold(self):
+        data_manager = JournalDataManager(self.file_path, compact_threshold=3)
+        data_manager.save_change("add", self.book)
+        data_manager.save_change("status", {**self.book, "status": "выдана"})
+        data_manager.save_change("status", self.book)
+
+        self.assertEqual(data_manager.journal_path.read_text(encoding="utf-8"), "")
+        self.assertEqual(DataManager(self.file_path).load_books(), [self.book])
+
+    def test_compaction_keeps_corrupt_snapshot(self):
+        self.file_path.write_text('[{"id": "1", "title": "Book1"', encoding="utf-8")
+        data_manager = JournalDataManager(self.file_path, compact_threshold=1)
+        data_manager.save_change("add", {**self.book, "id": "2"})
+        with self.assertRaises(ValueError):
+            data_manager.compact()
+        self.assertEqual(self.file_path.read_text(encoding="utf-8"), '[{"id": "1", "title": "Book1"')
+        self.assertEqual(len(data_manager.journal_path.read_text(encoding="utf-8").splitlines()), 1)
+
+    def test_broken_journal_line_is_skipped(self):
+        self.data_manager.save_change("add", self.book)
+        with self.data_manager.journal_path.open("a", encoding="utf-8") as journal:
+            journal.write('{"action": "delete", "i')
+        self.assertEqual(self.data_manager.load_books(), [self.book])
+
+    def test_change_after_broken_line_is_kept(self):
+        self.data_manager.save_change("add", self.book)
+        with self.data_manager.journal_path.open("a", encoding="utf-8") as journal:
+            journal.write('{"action": "delete", "i')
+        self.data_manager.save_change("add", {**self.book, "id": "2"})
+        self.assertEqual([book["id"] for book in JournalDataManager(self.file_path).load_books()], ["1", "2"])
+
+    def test_iter_books_applies_journal(self):
+        second_book = {**self.book, "id": "2", "title": "Book2"}
+        self.data_manager.save_books([self.book, second_book])
+        self.data_manager.save_change("status", {**self.book, "status": "выдана"})
+        self.data_manager.save_change("delete", second_book)
+        self.data_manager.save_change("add", {**self.book, "id": "3"})
+        self.data_manager.save_change("status", {**self.book, "id": "3", "status": "выдана"})
+
+        self.assertEqual(
+            list(self.data_manager.iter_books()),
+            [{**self.book, "status": "выдана"}, {**self.book, "id": "3", "status": "выдана"}],
+        )
+
+    def test_library_uses_journal(self):
+        library = Library(self.data_manager)
+        with patch('builtins.print'):
+            library.add_book("Book1", "Author 1", "1991")
+            library.change_status("1", "выдана")
+
+        self.assertFalse(self.file_path.exists())
+        self.assertEqual(Library(JournalDataManager(self.file_path)).books[0].status, "выдана")
+
+
+class TestCompressedDataManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.books = [
+            {"id": str(number), "title": f"Книга [{number}], \"часть\"", "author": "Автор", "year": 1900 + number,
+             "status": "в наличии"}
+            for number in range(1, 30)
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        cases = (
+            ("books.json.gz", None, gzip), ("books.json.xz", None, lzma), ("books.dat", "gzip", gzip),
+        )
+        for name, compression, module in cases:
+            with self.subTest(name=name):
+                data_manager = DataManager(Path(self.temp_dir.name) / name, compression=compression)
+                self.assertEqual(data_manager.compression, module.__name__)
+                data_manager.save_books(self.books)
+                self.assertEqual(json.loads(module.decompress(data_manager.file_path.read_bytes())), self.books)
+                for chunk_size in (7, 65536):
+                    self.assertEqual(list(data_manager.iter_books(chunk_size)), self.books)
+
+    def test_corrupted_file_is_empty(self):
+        data_manager = DataManager(Path(self.temp_dir.name) / "books.json.gz")
+        data_manager.save_books(self.books)
+        data = data_manager.file_path.read_bytes()
+        for corrupted in (b"not gzip", data[:len(data) // 2]):
+            with self.subTest(size=len(corrupted)):
+                data_manager.file_path.write_bytes(corrupted)
+                self.assertEqual(data_manager.load_books(), [])
+                self.assertEqual(Library(data_manager).books, [])
+
+    def test_journal_with_compressed_snapshot(self):
+        data_manager = JournalDataManager(Path(self.temp_dir.name) / "books.json.xz", compact_threshold=3)
+        library = Library(data_manager)
+        with patch('builtins.print'):
+            for number in range(4):
+                library.add_book(f"Книга {number}", "Автор", "2000")
+        self.assertEqual(len(json.loads(lzma.decompress(data_manager.file_path.read_bytes()))), 3)
+        self.assertEqual(len(Library(JournalDataManager(data_manager.file_path)).books), 4)
+
+
+class TestSQLiteDataManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "books.db"
+        self.data_manager = SQLiteDataManager(self.db_path)
+        self.books = [
+            {"id": "1", "title": "Война и мир", "author": "Лев Толстой", "year": 1869, "status": "в наличии"},
+            {"id": "2", "title": "1984", "author": "George Orwell", "year": 1949, "status": "выдана"},
+        ]
+
+    def tearDown(self):
+        self.data_manager.close()
+        self.temp_dir.cleanup()
+
+    def test_save_and_load_books(self):
+        self.data_manager.save_books(self.books)
+        self.assertEqual(self.data_manager.load_books(), self.books)
+
+    def test_save_changes(self):
+        self.data_manager.save_books(self.books)
+        self.data_manager.save_change("status", {**self.books[0], "status": "выдана"})
+        self.data_manager.save_change("delete", self.books[1])
+        self.data_manager.save_change("add", {**self.books[1], "id": "3"})
+
+        self.assertEqual(self.data_manager.get_book("1")["status"], "выдана")
+        self.assertIsNone(self.data_manager.get_book("2"))
+        self.assertEqual(self.data_manager.count_books(), 2)
+
+    def test_search_books_is_case_insensitive(self):
+        self.data_manager.save_books(self.books)
+        self.assertEqual([book["id"] for book in self.data_manager.search_books("title", "ВОЙНА")], ["1"])
+        self.assertEqual([book["id"] for book in self.data_manager.search_books("year", "9")], ["1", "2"])
+
+    def test_search_uses_stored_keys(self):
+        self.data_manager.save_books(self.books)
+        self.data_manager.save_change("add", {**self.books[0], "id": "3", "title": "«Ёжик» в тумане"})
+        self.assertEqual(self.data_manager.connection.execute("SELECT title_key FROM books WHERE id = 3").fetchone(),
+                         ("ежик в тумане",))
+        with patch("sqlite_data_manager.normalize_text", wraps=normalize_text) as normalize:
+            self.assertEqual([book["id"] for book in self.data_manager.search_books("title", "ЕЖИК В")], ["3"])
+        self.assertEqual(normalize.call_count, 1)
+
+    def test_old_database_is_migrated(self):
+        self.data_manager.close()
+        with sqlite3.connect(self.db_path) as connection:
+            connection.execute("DROP TABLE books")
+            connection.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT NOT NULL, "
+                               "author TEXT NOT NULL, year INTEGER NOT NULL, status TEXT NOT NULL)")
+            connection.execute("INSERT INTO books VALUES (1, 'Война и мир', 'Лев Толстой', 1869, 'в наличии')")
+        connection.close()
+        self.data_manager = SQLiteDataManager(self.db_path)
+        self.assertEqual([book["id"] for book in self.data_manager.search_books("author", "толстой")], ["1"])
+        self.assertEqual(self.data_manager.load_books(), self.books[:1])
+
+    def test_library_pushes_queries_down(self):
+        self.data_manager.save_books(self.books)
+        library = Library(self.data_manager)
+        with patch('builtins.print'):
+            library.change_status("1", "выдана")
+            with patch('builtins.input', return_value='да'):
+                library.delete_book("2")
+            library.add_book("Анна Каренина", "Лев Толстой", "1877")
+
+        self.assertFalse(library._loaded)
+        self.assertEqual([book.id for book in library.find_books("author", "толстой")], ["1", "3"])
+        self.assertEqual(self.data_manager.get_book("1")["status"], "выдана")
+        self.assertEqual(self.data_manager.load_next_id(), 4)
+
+    def test_migrate_from_json(self):
+        json_path = Path(self.temp_dir.name) / "books.json"
+        DataManager(json_path).save_books(self.books)
+        db_path = Path(self.temp_dir.name) / "migrated.db"
+
+        self.assertEqual(migrate_from_json(json_path, db_path), 2)
+        data_manager = SQLiteDataManager(db_path)
+        self.assertEqual(data_manager.load_books(), self.books)
+        data_manager.close()
+
+
+class TestBinaryDataManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.data_manager = BinaryDataManager(self.temp_path / "books.bin")
+        self.books = [
+            {"id": "1", "title": "Война и мир", "author": "Лев Толстой", "year": 1869, "status": "в наличии"},
+            {"id": "3", "title": "Анна Каренина", "author": "Лев Толстой", "year": 1877, "status": "выдана"},
+            {"id": "7", "title": "1984", "author": "George Orwell", "year": 1949, "status": "в наличии"},
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_load_missing_file(self):
+        self.assertEqual(self.data_manager.load_books(), [])
+        self.assertIsNone(self.data_manager.get_book("1"))
+
+    def test_save_and_load_books(self):
+        self.data_manager.save_books(list(reversed(self.books)))
+        self.assertEqual(self.data_manager.load_books(), self.books)
+        self.assertEqual(BinaryDataManager(self.data_manager.file_path).load_next_id(), 8)
+        with patch("binary_data_manager.write_atomic", wraps=write_atomic) as write:
+            self.data_manager.save_books(self.books)
+        write.assert_called_once()
+        self.assertEqual(sorted(path.name for path in self.temp_path.iterdir()),
+                         ["books.bin", "books.bin.lock", "books.bin.meta"])
+
+    def test_get_book(self):
+        self.data_manager.save_books(self.books)
+        self.assertEqual(self.data_manager.get_book("3"), self.books[1])
+        self.assertIsNone(self.data_manager.get_book("2"))
+        self.assertIsNone(self.data_manager.get_book("8"))
+
+    def test_search_books(self):
+        self.data_manager.save_books(self.books)
+        self.assertEqual([book["id"] for book in self.data_manager.search_books("author", "ТОЛСТ")], ["1", "3"])
+        self.assertEqual([book["id"] for book in self.data_manager.search_books("year", "9")], ["1", "7"])
+        self.assertEqual(self.data_manager.search_books("title", "мир"), [self.books[0]])
+
+    def test_invalid_file(self):
+        self.data_manager.file_path.write_bytes(b"[{\"id\": \"1\"}]" * 4)
+        with self.assertRaises(ValueError):
+            self.data_manager.load_books()
+
+    def test_convert_json_to_binary_and_back(self):
+        json_path = self.temp_path / "books.json"
+        DataManager(json_path).save_books(self.books)
+        self.assertEqual(convert(json_path, self.temp_path / "books.bin"), 3)
+        self.assertEqual(convert(self.temp_path / "books.bin", self.temp_path / "copy.json"), 3)
+        self.assertEqual(DataManager(self.temp_path / "copy.json").load_books(), self.books)
+
+    def test_library_reads_without_loading_catalog(self):
+        self.data_manager.save_books(self.books)
+        library = Library(self.data_manager)
+        self.assertEqual([book.id for book in library.find_books("author", "толстой")], ["1", "3"])
+        self.assertFalse(library._loaded)
+        with patch('builtins.print'):
+            library.change_status("7", "выдана")
+            library.add_book("Animal Farm", "George Orwell", "1945")
+        self.assertEqual(
+            [(book["id"], book["status"]) for book in BinaryDataManager(self.data_manager.file_path).load_books()],
+            [("1", "в наличии"), ("3", "выдана"), ("7", "выдана"), ("8", "в наличии")],
+        )
+
+
+    def test_replaced_file_is_remapped(self):
+        self.data_manager.save_books(self.books)
+        first = Library(BinaryDataManager(self.data_manager.file_path))
+        second = Library(BinaryDataManager(self.data_manager.file_path))
+        self.assertEqual(len(first.find_books("author", "толстой")), 2)
+        second.set_status("1", "выдана")
+        self.assertEqual(first.data_manager.get_book("1")["status"], "выдана")
+        first.set_status("3", "в наличии")
+        books = BinaryDataManager(self.data_manager.file_path).load_books()
+        self.assertEqual([(book["id"], book["status"]) for book in books],
+                         [("1", "выдана"), ("3", "в наличии"), ("7", "в наличии")])
+
+
+class TestShardedDataManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.data_manager = ShardedDataManager(self.temp_path / "books.shards", shard_size=2)
+        self.books = [
+            {"id": "1", "title": "Война и мир", "author": "Лев Толстой", "year": 1869, "status": "в наличии"},
+            {"id": "2", "title": "Анна Каренина", "author": "Лев Толстой", "year": 1877, "status": "выдана"},
+            {"id": "3", "title": "1984", "author": "George Orwell", "year": 1949, "status": "в наличии"},
+            {"id": "7", "title": "Ёжик в тумане", "author": "Сергей Козлов", "year": 1969, "status": "в наличии"},
+        ]
+        self.data_manager.save_books(self.books)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def shard_files(self):
+        return sorted(path.name for path in self.data_manager.file_path.glob("shard-*.json"))
+
+    def test_save_and_load_books(self):
+        self.assertEqual(self.data_manager.load_books(), self.books)
+        self.assertEqual(self.shard_files(), ["shard-000000.json", "shard-000001.json", "shard-000003.json"])
+        reopened = ShardedDataManager(self.data_manager.file_path, shard_size=1000)
+        self.assertEqual(reopened.shard_size, 2)
+        self.assertEqual(reopened.load_next_id(), 8)
+        self.assertEqual(reopened.count_books(), 4)
+
+        self.data_manager.save_books(self.books[:1])
+        self.assertEqual(self.shard_files(), ["shard-000000.json"])
+        self.assertEqual(self.data_manager.load_books(), self.books[:1])
+
+    def test_changes_touch_only_their_shard(self):
+        with patch.object(ShardedDataManager, '_read_shard', autospec=True,
+                          side_effect=ShardedDataManager._read_shard) as read_shard:
+            self.assertEqual(self.data_manager.get_book("7"), self.books[3])
+            self.data_manager.save_changes([
+                ("status", {**self.books[2], "status": "выдана"}),
+                ("delete", self.books[3]),
+                ("add", {**self.books[0], "id": "8"}),
+            ])
+        self.assertEqual(sorted(call.args[1] for call in read_shard.call_args_list), [1, 3, 3])
+
+        self.assertEqual(self.data_manager.get_book("3")["status"], "выдана")
+        self.assertIsNone(self.data_manager.get_book("7"))
+        self.assertIsNone(self.data_manager.get_book("0"))
+        self.assertEqual(self.data_manager.get_book("8")["title"], "Война и мир")
+        self.assertEqual(self.data_manager.load_next_id(), 9)
+
+    def test_search_books(self):
+        self.assertEqual([book["id"] for book in self.data_manager.search_books("author", "ТОЛСТ")], ["1", "2"])
+        self.assertEqual([book["id"] for book in self.data_manager.search_books("title", "ежик")], ["7"])
+        with self.assertRaises(ValueError):
+            self.data_manager.search_books("status", "выдана")
+
+    def test_library_works_without_loading_catalog(self):
+        library = Library(self.data_manager)
+        self.assertEqual(library.next_id, 8)
+        with patch('builtins.print'):
+            library.change_status("3", "выдана")
+        library.remove_book("1")
+        library.create_book("Детство", "Лев Толстой", "1852")
+        self.assertEqual([book.id for book in library.find_books("author", "толстой")], ["2", "8"])
+        self.assertFalse(library._loaded)
+        self.assertEqual(
+            [(book["id"], book["status"]) for book in ShardedDataManager(self.data_manager.file_path).load_books()],
+            [("2", "выдана"), ("3", "выдана"), ("7", "в наличии"), ("8", "в наличии")],
+        )
+
+    def test_shard_written_before_crash_is_visible(self):
+        with patch.object(ShardedDataManager, "_commit", side_effect=OSError("сбой")):
+            with self.assertRaises(OSError):
+                self.data_manager.save_change("add", {**self.books[0], "id": "9"})
+        reopened = ShardedDataManager(self.data_manager.file_path)
+        self.assertEqual(reopened.get_book("9")["title"], "Война и мир")
+        self.assertEqual([book["id"] for book in reopened.load_books()], ["1", "2", "3", "7", "9"])
+        self.assertEqual(reopened.count_books(), 5)
+        self.assertEqual(reopened.load_next_id(), 10)
+        library = Library(reopened)
+        self.assertEqual(library.create_book("Детство", "Лев Толстой", "1852").id, "10")
+        self.assertEqual(reopened.get_book("9")["title"], "Война и мир")
+
+    def test_convert_json_to_shards_and_back(self):
+        json_path = self.temp_path / "books.json"
+        DataManager(json_path).save_books(self.books)
+        self.assertEqual(convert_shards(json_path, self.temp_path / "converted", shard_size=3), 4)
+        self.assertEqual(ShardedDataManager(self.temp_path / "converted").shard_size, 3)
+        self.assertEqual(convert_shards(self.temp_path / "converted", self.temp_path / "copy.json"), 4)
+        self.assertEqual(DataManager(self.temp_path / "copy.json").load_books(), self.books)
+
+
+class TestBook(unittest.TestCase):
+    def test_book_is_compact(self):
+        book = Book.from_dict({"id": "1", "title": "Book1", "author": "Author 1", "year": 1991, "status": "выдана"})
+        self.assertFalse(hasattr(book, "__dict__"))
+        self.assertEqual(book.to_dict()["status"], "выдана")
+
+    def test_strings_are_shared(self):
+        first, second = (
+            Book.from_dict({"id": book_id, "title": "Book", "author": "".join(["Author", " 1"]), "year": 1991,
+                            "status": "".join(["в ", "наличии"])})
+            for book_id in ("1", "2")
+        )
+        self.assertIs(first.author, second.author)
+        self.assertIs(first.status, BookStatus.AVAILABLE.value)
+        self.assertIs(first.year, second.year)
+
 
 class TestLibrary(unittest.TestCase):
     def setUp(self):
@@ -53,6 +493,8 @@ class TestLibrary(unittest.TestCase):
 
     def tearDown(self):
         self.temp_file_path.unlink(missing_ok=True)
+        self.data_manager.meta_path.unlink(missing_ok=True)
+        self.data_manager.lock_path.unlink(missing_ok=True)
 
     def test_add_book(self):
         with patch('builtins.print') as mock_print:
@@ -104,15 +546,57 @@ class TestLibrary(unittest.TestCase):
 
             mock_print.assert_called_once_with("Книга с id 2 не найдена.")
 
+    def test_add_book_ids_are_sequential(self):
+        with patch('builtins.print'):
+            for title in ("Book1", "Book2", "Book3"):
+                self.library.add_book(title, "Author 1", "1991")
+        self.assertEqual([book.id for book in self.library.books], ["1", "2", "3"])
+
+    def test_deleted_id_is_not_reused_after_reload(self):
+        with patch('builtins.print'):
+            self.library.add_book("Book1", "Author 1", "1991")
+            self.library.add_book("Book2", "Author 2", "1992")
+            with patch('builtins.input', return_value='да'):
+                self.library.delete_book("2")
+
+            library = Library(self.data_manager)
+            library.add_book("Book3", "Author 3", "1993")
+        self.assertEqual([book.id for book in library.books], ["1", "3"])
+
+    def test_deleted_last_id_is_not_reused(self):
+        self.data_manager.save_books([
+            {"id": "1", "title": "Book1", "author": "Author 1", "year": 1991, "status": "выдана"},
+            {"id": "2", "title": "Book2", "author": "Author 2", "year": 1992, "status": "выдана"},
+        ])
+        with patch('builtins.print'), patch('builtins.input', return_value='да'):
+            Library(self.data_manager).delete_book("2")
+            library = Library(self.data_manager)
+            library.add_book("Book3", "Author 3", "1993")
+        self.assertEqual([book.id for book in library.books], ["1", "3"])
+
+    def test_catalog_is_loaded_lazily(self):
+        with patch.object(self.data_manager, 'iter_books', return_value=iter([])) as mock_iter_books:
+            library = Library(self.data_manager)
+            mock_iter_books.assert_not_called()
+            self.assertEqual(library.books, [])
+            self.assertEqual(library.books, [])
+        mock_iter_books.assert_called_once()
+
+    def test_default_librarian_does_not_load_catalog(self):
+        with patch.object(DataManager, 'iter_books') as mock_iter_books:
+            librarian = Librarian()
+        mock_iter_books.assert_not_called()
+        self.assertEqual(librarian.library.data_manager.file_path, Path("books.json"))
+
     def test_search_book(self):
         with patch('builtins.print'):
             self.library.add_book("1984", "George Orwell", "1949")
 
         search_cases = (('title', '1984'), ('author', 'George Orwell'), ('year', '1949'))
         for case in search_cases:
-            with patch('builtins.print') as mock_print:
+            with patch('sys.stdout', new_callable=io.StringIO) as stdout:
                 self.library.search_book(*case)
-                bottom_line = mock_print.call_args_list[-1][0][0]
+                bottom_line = stdout.getvalue().splitlines()[-1]
                 self.assertIn(case[1], bottom_line)
 
     def test_search_two_books(self):
@@ -120,9 +604,9 @@ class TestLibrary(unittest.TestCase):
             self.library.add_book("1984", "George Orwell", "1949")
             self.library.add_book("Animal Farm", "George Orwell", "1945")
 
-        with patch('builtins.print') as mock_print:
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
             self.library.search_book('author', 'Orwell')
-        output_lines = [call.args[0] for call in mock_print.call_args_list][-2:]
+        output_lines = stdout.getvalue().splitlines()[-2:]
         self.assertTrue(any('1984' in line for line in output_lines))
         self.assertTrue(any('Animal Farm' in line for line in output_lines))
 
@@ -139,9 +623,9 @@ class TestLibrary(unittest.TestCase):
         with patch('builtins.print'):
             self.library.add_book("1984", "George Orwell", "1949")
 
-        with patch('builtins.print') as mock_print:
-            self.library.display_books()
-            output_lines = [call.args[0] for call in mock_print.call_args_list][-1]
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertFalse(self.library.display_books())
+            output_lines = stdout.getvalue().splitlines()[-1]
         for book_data in ("1984", "George Orwell", "1949"):
             self.assertIn(book_data, output_lines)
 
@@ -178,9 +662,1190 @@ class TestLibrary(unittest.TestCase):
         mock_print.assert_called_once_with("У книги '1984' уже установлен статус 'в наличии' в настоящий момент.")
 
 
+class TestConcurrentAccess(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(self.temp_dir.name) / "books.json"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def open_libraries(self, manager_class):
+        first = Library(manager_class(self.file_path))
+        with patch('builtins.print'):
+            first.add_book("Война и мир", "Лев Толстой", "1869")
+            first.add_book("Анна Каренина", "Лев Толстой", "1877")
+        second = Library(manager_class(self.file_path))
+        self.assertEqual(len(second.books), 2)
+        return first, second
+
+    def test_save_writes_atomically_and_bumps_version(self):
+        data_manager = DataManager(self.file_path)
+        data_manager.save_books([])
+        data_manager.save_books([])
+        self.assertEqual(data_manager.version, 2)
+        self.assertFalse(data_manager.is_stale())
+        self.assertEqual(sorted(path.name for path in self.file_path.parent.iterdir()),
+                         ["books.json", "books.json.lock", "books.json.meta"])
+
+    def test_new_files_get_default_permissions(self):
+        with patch('builtins.print'):
+            Library(DataManager(self.file_path)).add_book("Война и мир", "Лев Толстой", "1869")
+        for name in ("books.json", "books.json.meta"):
+            with self.subTest(name=name):
+                self.assertEqual((self.file_path.parent / name).stat().st_mode & 0o777, NEW_FILE_MODE)
+        self.file_path.chmod(0o640)
+        write_atomic(self.file_path, "[]")
+        self.assertEqual(self.file_path.stat().st_mode & 0o777, 0o640)
+
+    def test_concurrent_adds_are_merged(self):
+        for manager_class in (DataManager, JournalDataManager):
+            with self.subTest(manager=manager_class.__name__):
+                first, second = self.open_libraries(manager_class)
+                with patch('builtins.print'):
+                    first.add_book("Мастер и Маргарита", "Михаил Булгаков", "1967")
+                    second.add_book("Мир Полудня", "Братья Стругацкие", "1962")
+                books = {book.id: book.title for book in Library(manager_class(self.file_path)).books}
+                self.assertEqual(books, {
+                    "1": "Война и мир", "2": "Анна Каренина", "3": "Мастер и Маргарита", "4": "Мир Полудня",
+                })
+                self.assertEqual(second.next_id, 5)
+                for path in self.file_path.parent.iterdir():
+                    path.unlink()
+
+    def test_storage_backed_adds_get_distinct_ids(self):
+        for manager_class, name in (
+                (SQLiteDataManager, "books.db"), (ShardedDataManager, "books.shards"), (BinaryDataManager, "books.bin"),
+        ):
+            with self.subTest(manager=manager_class.__name__):
+                path = Path(self.temp_dir.name) / name
+                first, second = Library(manager_class(path)), Library(manager_class(path))
+                first.create_book("Война и мир", "Лев Толстой", "1869")
+                second.create_book("Мир Полудня", "Братья Стругацкие", "1962")
+                book = first.create_book("Анна Каренина", "Лев Толстой", "1877")
+                self.assertEqual(book.id, "3")
+                books = Library(manager_class(path)).books
+                self.assertEqual([(book.id, book.title) for book in books],
+                                 [("1", "Война и мир"), ("2", "Мир Полудня"), ("3", "Анна Каренина")])
+                self.assertEqual(first.next_id, 4)
+
+    def test_sqlite_loaded_catalog_gets_distinct_ids(self):
+        path = Path(self.temp_dir.name) / "books.db"
+        first, second = Library(SQLiteDataManager(path)), Library(SQLiteDataManager(path))
+        first.create_book("Война и мир", "Лев Толстой", "1869")
+        first.count_by_status()
+        second.create_book("Мир Полудня", "Братья Стругацкие", "1962")
+        book = first.create_book("Анна Каренина", "Лев Толстой", "1877")
+        self.assertEqual(book.id, "3")
+        self.assertEqual([book.id for book in first.books], ["1", "3"])
+        self.assertEqual([book.id for book in first.find_books("title", "анна")], ["3"])
+        self.assertEqual([(book.id, book.title) for book in Library(SQLiteDataManager(path)).books],
+                         [("1", "Война и мир"), ("2", "Мир Полудня"), ("3", "Анна Каренина")])
+        with self.assertRaises(sqlite3.IntegrityError):
+            second.data_manager.save_changes([("add", book.to_dict())])
+
+    def test_changes_to_deleted_book_are_skipped(self):
+        first, second = self.open_libraries(DataManager)
+        with patch('builtins.input', return_value='да'), patch('builtins.print'):
+            first.delete_book("1")
+            second.change_status("1", "выдана")
+            second.change_status("2", "выдана")
+        books = Library(DataManager(self.file_path)).books
+        self.assertEqual([(book.id, book.status) for book in books], [("2", "выдана")])
+        self.assertEqual([book.id for book in second.books], ["2"])
+        self.assertEqual(second.find_books('author', 'толстой')[0].status, "выдана")
+
+    def test_parallel_processes_do_not_lose_updates(self):
+        script = (
+            "import sys\nfrom pathlib import Path\nfrom unittest.mock import patch\n"
+            "from data_manager import DataManager\nfrom library import Library\n"
+            "library = Library(DataManager(Path(sys.argv[1])))\n"
+            "with patch('builtins.print'):\n"
+            "    for number in range(10):\n"
+            "        library.add_book(f'{sys.argv[2]}-{number}', 'Автор', '2000')\n"
+        )
+        processes = [
+            subprocess.Popen([sys.executable, "-c", script, str(self.file_path), str(worker)],
+                             cwd=Path(__file__).parent)
+            for worker in range(4)
+        ]
+        for process in processes:
+            self.assertEqual(process.wait(timeout=60), 0)
+
+        books = Library(DataManager(self.file_path)).books
+        self.assertEqual(len(books), 40)
+        self.assertEqual(len({book.id for book in books}), 40)
+        self.assertEqual(len({book.title for book in books}), 40)
+
+
+class TestLibraryServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.server = LibraryServer(Library(self.data_manager))
+        await self.server.start()
+        self.client = await LibraryClient.connect(*self.server.address)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+        self.temp_dir.cleanup()
+
+    async def test_operations(self):
+        book = await self.client.call("add", title="Война и мир", author="Лев Толстой", year=1869)
+        self.assertEqual(book, {"id": "1", "title": "Война и мир", "author": "Лев Толстой", "year": 1869,
+                                "status": "в наличии"})
+        await self.client.call("add", title="Анна Каренина", author="Лев Толстой", year="1877")
+        found = await self.client.call("search", type="название", term="анна")
+        self.assertEqual([book["id"] for book in found], ["2"])
+        changed = await self.client.call("change_status", id="1", status="выдана")
+        self.assertEqual(changed["status"], "выдана")
+        await self.client.call("delete", id=2)
+        self.assertEqual(await self.client.call("list", limit=10), [changed])
+        self.assertEqual(Library(DataManager(self.data_manager.file_path)).books[0].to_dict(), changed)
+
+    async def test_errors(self):
+        cases = (
+            (("add",), {"title": "Книга", "author": "Автор", "year": 3000}, INVALID_PARAMS),
+            (("search",), {"type": "жанр", "term": "роман"}, INVALID_PARAMS),
+            (("delete",), {"id": "5"}, BOOK_NOT_FOUND),
+            (("rename",), {}, METHOD_NOT_FOUND),
+        )
+        for (method,), params, code in cases:
+            with self.subTest(method=method):
+                with self.assertRaises(RPCError) as error:
+                    await self.client.call(method, **params)
+                self.assertEqual(error.exception.code, code)
+        response = await self.server.handle_line(b"{oops")
+        self.assertEqual(response["error"]["code"], -32700)
+
+    async def test_concurrent_mutations_are_batched(self):
+        clients = [await LibraryClient.connect(*self.server.address) for _ in range(20)]
+        with patch.object(self.data_manager, "save_books", wraps=self.data_manager.save_books) as save_books:
+            books = await asyncio.gather(*(
+                client.call("add", title=f"Книга {number}", author="Автор", year=2000)
+                for number, client in enumerate(clients)
+            ))
+        for client in clients:
+            await client.close()
+        self.assertEqual(sorted(int(book["id"]) for book in books), list(range(1, 21)))
+        self.assertLess(save_books.call_count, 20)
+        self.assertEqual(len(Library(DataManager(self.data_manager.file_path)).books), 20)
+
+
+    async def test_failed_mutation_does_not_fail_batch(self):
+        def fail():
+            self.server.library.create_book("Лишняя", "Автор", "2000")
+            raise RuntimeError("сбой")
+
+        results = await asyncio.gather(
+            self.server._mutate(fail),
+            self.client.call("add", title="Война и мир", author="Лев Толстой", year=1869),
+            return_exceptions=True,
+        )
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertEqual(results[1]["title"], "Война и мир")
+        self.assertEqual([book.title for book in Library(DataManager(self.data_manager.file_path)).books],
+                         ["Война и мир"])
+
+    async def test_reads_are_served_while_saving(self):
+        await self.client.call("add", title="Война и мир", author="Лев Толстой", year=1869)
+        saving, release = threading.Event(), threading.Event()
+        save_books = self.data_manager.save_books
+
+        def slow_save_books(books):
+            saving.set()
+            release.wait(10)
+            save_books(books)
+
+        reader = await LibraryClient.connect(*self.server.address)
+        with patch.object(self.data_manager, "save_books", slow_save_books):
+            adding = asyncio.create_task(self.client.call("add", title="Анна Каренина", author="Лев Толстой", year=1877))
+            await asyncio.to_thread(saving.wait, 10)
+            found = await reader.call("search", type="название", term="война")
+            self.assertEqual([book["id"] for book in found], ["1"])
+            self.assertFalse(adding.done())
+            release.set()
+            self.assertEqual((await adding)["id"], "2")
+        await reader.close()
+
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = JournalDataManager(Path(self.temp_dir.name) / "books.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_changes_are_coalesced(self):
+        writes = []
+        writer = WriteBehind(writes.append, delay=0.2)
+        for number in range(5):
+            writer.submit([number])
+        self.assertEqual(writes, [])
+        writer.flush()
+        self.assertEqual(writes, [[0, 1, 2, 3, 4]])
+        writer.submit([5])
+        writer.close()
+        self.assertEqual(writes, [[0, 1, 2, 3, 4], [5]])
+
+    def test_failed_write_is_reported_and_retried(self):
+        writes = []
+
+        def write(changes):
+            if not writes:
+                writes.append(None)
+                raise OSError("диск заполнен")
+            writes.append(changes)
+
+        writer = WriteBehind(write, delay=0)
+        writer.submit(["add"])
+        with self.assertRaises(OSError):
+            writer.flush()
+        writer.close()
+        self.assertEqual(writes, [None, ["add"]])
+
+    def test_failed_write_is_retried_without_flush(self):
+        attempts = []
+
+        def write(changes):
+            attempts.append(changes)
+            if len(attempts) == 1:
+                raise OSError("диск заполнен")
+
+        writer = WriteBehind(write, delay=0, retry_delay=0.05)
+        writer.submit(["add"])
+        for _ in range(100):
+            if len(attempts) == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(attempts, [["add"], ["add"]])
+        self.assertIsInstance(writer.take_error(), OSError)
+        self.assertIsNone(writer.take_error())
+        writer.close()
+
+    def test_library_reports_write_error(self):
+        library = Library(self.data_manager, write_behind=0)
+        with patch.object(self.data_manager, "save_changes", side_effect=OSError("диск заполнен")):
+            library.create_book("Война и мир", "Лев Толстой", "1869")
+            with self.assertRaises(OSError):
+                library.flush()
+        self.assertIsNone(library.take_write_error())
+        library.close()
+        self.assertEqual([book.title for book in Library(JournalDataManager(self.data_manager.file_path)).books],
+                         ["Война и мир"])
+
+    def test_readers_see_merged_catalog_consistently(self):
+        library = Library(self.data_manager, write_behind=0)
+        library.create_book("Война и мир", "Лев Толстой", "1869")
+        library.flush()
+        other = Library(JournalDataManager(self.data_manager.file_path))
+        stop = threading.Event()
+        errors = []
+
+        def read():
+            while not stop.is_set():
+                try:
+                    library.find_books("author", "толстой")
+                    library.count_by_status()
+                except Exception as error:
+                    errors.append(error)
+                    return
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            for number in range(30):
+                other.create_book(f"Книга {number}", "Лев Толстой", "1900")
+                library.create_book(f"Повесть {number}", "Лев Толстой", "1900")
+                library.flush()
+        finally:
+            stop.set()
+            reader.join()
+            library.close()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(library.find_books("author", "толстой")), 61)
+
+    def test_merge_keeps_changes_queued_during_write(self):
+        data_manager = DataManager(Path(self.temp_dir.name) / "catalog.json")
+        library = Library(data_manager, write_behind=0)
+        library.create_book("Война и мир", "Лев Толстой", "1869")
+        library.flush()
+        Library(DataManager(data_manager.file_path)).create_book("Пикник на обочине", "Братья Стругацкие", "1972")
+        write = library._write_behind.write
+
+        def write_after_add(changes):
+            # Книга добавляется после того, как фоновый поток забрал изменения из очереди, но до их записи.
+            library._write_behind.write = write
+            library.create_book("Анна Каренина", "Лев Толстой", "1877")
+            write(changes)
+
+        library._write_behind.write = write_after_add
+        library.create_book("Мир Полудня", "Братья Стругацкие", "1962")
+        library.close()
+        self.assertEqual(sorted(book.title for book in library.books),
+                         ["Анна Каренина", "Война и мир", "Мир Полудня", "Пикник на обочине"])
+        self.assertEqual(sorted(book.title for book in Library(DataManager(data_manager.file_path)).books),
+                         ["Анна Каренина", "Война и мир", "Мир Полудня", "Пикник на обочине"])
+
+    def test_library_saves_in_background(self):
+        library = Library(self.data_manager, write_behind=60)
+        with patch.object(self.data_manager, "save_changes", wraps=self.data_manager.save_changes) as save_changes, \
+                patch('builtins.print'):
+            library.add_book("Война и мир", "Лев Толстой", "1869")
+            library.add_book("Анна Каренина", "Лев Толстой", "1877")
+            library.change_status("1", "выдана")
+            self.assertEqual(save_changes.call_count, 0)
+            self.assertEqual(library.find_books('author', 'толстой')[0].status, "выдана")
+            library.close()
+        self.assertEqual(save_changes.call_count, 1)
+        books = Library(JournalDataManager(self.data_manager.file_path)).books
+        self.assertEqual([(book.id, book.status) for book in books], [("1", "выдана"), ("2", "в наличии")])
+
+    def test_queryable_storage_is_read_from_memory(self):
+        data_manager = SQLiteDataManager(Path(self.temp_dir.name) / "books.db")
+        library = Library(data_manager, write_behind=60)
+        try:
+            with patch('builtins.print'), patch('builtins.input', return_value='да'):
+                library.add_book("Война и мир", "Лев Толстой", "1869")
+                library.add_book("Анна Каренина", "Лев Толстой", "1877")
+                library.delete_book("1")
+            self.assertEqual([book.id for book in library.find_books('author', 'толстой')], ["2"])
+            library.flush()
+            self.assertEqual([book["id"] for book in data_manager.load_books()], ["2"])
+        finally:
+            library.close()
+            data_manager.close()
+
+
+class TestStatusIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.library = Library(self.data_manager)
+        with patch('builtins.print'):
+            for number in range(1, 6):
+                self.library.add_book(f"Книга {number}", "Автор", str(1900 + number))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assert_matches_scan(self, library):
+        for status in VALID_STATUSES:
+            expected = [book.id for book in library.books if book.status == status]
+            self.assertEqual([book.id for book in library.books_with_status(status)], expected)
+            self.assertEqual(library.count_by_status()[status], len(expected))
+
+    def test_index_follows_mutations(self):
+        with patch('builtins.print'), patch('builtins.input', return_value='да'):
+            self.library.change_status("2", "выдана")
+            self.library.change_status("4", "выдана")
+            self.library.delete_book("4")
+            self.library.add_book("Книга 6", "Автор", "1906")
+        self.assertEqual(self.library.count_by_status(), {"выдана": 1, "в наличии": 4})
+        self.assert_matches_scan(self.library)
+        self.assert_matches_scan(Library(DataManager(self.data_manager.file_path)))
+
+    def test_bulk_change_status_saves_once(self):
+        with patch.object(self.data_manager, "save_books", wraps=self.data_manager.save_books) as save_books:
+            changed, not_found = self.library.change_statuses(["1", "3", "5", "9"], "выдана")
+        self.assertEqual([book.id for book in changed], ["1", "3", "5"])
+        self.assertEqual(not_found, ["9"])
+        self.assertEqual(save_books.call_count, 1)
+        self.assert_matches_scan(self.library)
+
+        with patch('builtins.print') as mock_print:
+            self.library.bulk_change_status(["1", "2"], "в наличии")
+        mock_print.assert_called_once_with("Статус изменен на 'в наличии' у книг: 1.")
+        self.assertEqual(self.library.count_by_status()["выдана"], 2)
+
+    def test_bulk_change_status_in_storage(self):
+        data_manager = SQLiteDataManager(Path(self.temp_dir.name) / "books.db")
+        try:
+            data_manager.save_books(self.data_manager.load_books())
+            library = Library(data_manager)
+            library.change_statuses(["2", "3"], "выдана")
+            self.assertEqual(library.count_by_status(), {"выдана": 2, "в наличии": 3})
+        finally:
+            data_manager.close()
+
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.data_manager.save_books([
+            {"id": str(number), "title": f"Книга {number}", "author": "Автор", "year": 2000, "status": "в наличии"}
+            for number in range(1, 26)
+        ])
+        self.library = Library(self.data_manager)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_pages_are_written_once(self):
+        with patch('sys.stdout') as stdout:
+            self.assertTrue(self.library.display_books(0, 10))
+        stdout.write.assert_called_once()
+        lines = stdout.write.call_args.args[0].splitlines()
+        self.assertEqual(lines[0], "Страница 1 (книги 1-10)")
+        self.assertEqual([line.split()[0] for line in lines[3:]], [str(number) for number in range(1, 11)])
+
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertFalse(self.library.display_books(2, 10))
+        self.assertIn("Страница 3 (книги 21-25)", stdout.getvalue())
+        self.assertTrue(stdout.getvalue().rstrip().endswith("в наличии"))
+
+    def test_first_page_does_not_load_catalog(self):
+        with patch('sys.stdout', new_callable=io.StringIO):
+            self.library.display_books(0, 5)
+        self.assertFalse(self.library._loaded)
+
+    def test_search_results_pages(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertTrue(self.library.search_book('title', 'книга', 0, 20))
+            self.assertFalse(self.library.search_book('title', 'книга', 1, 20))
+        self.assertIn("найдено книг: 25", stdout.getvalue())
+        self.assertIn("Страница 2 (книги 21-25)", stdout.getvalue())
+        self.assertEqual(self.library.search_cache.hits, 1)
+
+
+class TestScript(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.library = Library(self.data_manager)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parse_command(self):
+        self.assertEqual(
+            parse_command('add "Война и мир" "Лев Толстой" 1869'),
+            ("add", {"title": "Война и мир", "author": "Лев Толстой", "year": "1869"}),
+        )
+        self.assertEqual(parse_command("add 'Мцыри' Лермонтов 1839")[1]["title"], "Мцыри")
+        self.assertEqual(
+            parse_command('{"command": "change_status", "id": 5, "status": "выдана"}'),
+            ("status", {"id": 5, "status": "выдана"}),
+        )
+        for line in ("remove 5", "delete", '{"command": "add"', 'add "Без кавычки'):
+            with self.subTest(line=line):
+                with self.assertRaises(CommandError):
+                    parse_command(line)
+
+    def test_run_script(self):
+        lines = [
+            'add "Война и мир" "Лев Толстой" 1869',
+            "# комментарий",
+            '{"command": "add", "title": "Анна Каренина", "author": "Лев Толстой", "year": 1877}',
+            "add Книга Автор 3000",
+            "status 1 выдана",
+            "delete 7",
+            "search автор толстой",
+            "",
+            "delete 2",
+        ]
+        report = ScriptReport()
+        results = list(run_script(self.library, lines, report=report))
+
+        self.assertEqual([result["line"] for result in results], [1, 3, 4, 5, 6, 7, 9])
+        self.assertEqual([result["ok"] for result in results], [True, True, False, True, False, True, True])
+        self.assertIn("Год издания", results[2]["error"])
+        self.assertEqual(results[3]["book"]["status"], "выдана")
+        self.assertEqual(results[4]["error"], "Книга с id 7 не найдена.")
+        self.assertEqual([book["title"] for book in results[5]["books"]], ["Война и мир", "Анна Каренина"])
+        self.assertEqual((report.total, report.failed), (7, 2))
+        self.assertEqual([book.title for book in Library(self.data_manager).iter_books()], ["Война и мир"])
+
+        output = io.StringIO()
+        write_results(results, output)
+        self.assertEqual([json.loads(line) for line in output.getvalue().splitlines()], results)
+
+    def test_batch_changes_are_visible_without_loaded_catalog(self):
+        data_manager = SQLiteDataManager(Path(self.temp_dir.name) / "books.db")
+        self.addCleanup(data_manager.close)
+        library = Library(data_manager)
+        lines = ["add Книга Автор 2000", "add Другая Автор 2001", "status 1 выдана", "delete 2", "search автор автор"]
+        results = list(run_script(library, lines))
+
+        self.assertTrue(all(result["ok"] for result in results))
+        self.assertEqual(results[-1]["books"], [{**results[0]["book"], "status": "выдана"}])
+        self.assertFalse(library._loaded)
+        self.assertEqual([(book["id"], book["status"]) for book in data_manager.load_books()], [("1", "выдана")])
+
+    def test_results_report_saved_ids(self):
+        path = Path(self.temp_dir.name) / "books.db"
+        data_manager, other_manager = SQLiteDataManager(path), SQLiteDataManager(path)
+        self.addCleanup(data_manager.close)
+        self.addCleanup(other_manager.close)
+
+        def lines():
+            yield "add Книга Автор 2000"
+            # Другой процесс добавляет книгу, пока изменения сценария еще не сохранены.
+            Library(other_manager).create_book("Чужая книга", "Автор", "2001")
+            yield "add Другая Автор 2002"
+
+        results = list(run_script(Library(data_manager), lines()))
+        self.assertEqual([result["book"]["id"] for result in results], ["2", "3"])
+        self.assertEqual([(book["id"], book["title"]) for book in data_manager.load_books()],
+                         [("1", "Чужая книга"), ("2", "Книга"), ("3", "Другая")])
+
+    def test_changes_are_saved_once(self):
+        lines = [f"add Книга{number} Автор 2000" for number in range(10)]
+        with patch.object(self.data_manager, 'save_books', wraps=self.data_manager.save_books) as save_books:
+            self.assertEqual(len(list(run_script(self.library, lines))), 10)
+        self.assertEqual(save_books.call_count, 1)
+
+    def test_batch_size(self):
+        lines = [f"add Книга{number} Автор 2000" for number in range(10)]
+        with patch.object(self.data_manager, 'save_books', wraps=self.data_manager.save_books) as save_books:
+            results = run_script(self.library, lines, batch_size=4)
+            next(results)
+            # Результаты первой группы выдаются после того, как она сохранена.
+            self.assertEqual(save_books.call_count, 1)
+            self.assertEqual(len(list(results)), 9)
+        self.assertEqual(save_books.call_count, 3)
+        self.assertEqual(len(self.data_manager.load_books()), 10)
+
+
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.library = Library(self.data_manager, search_index=True)
+        with patch('builtins.print'):
+            self.library.add_book("Война и мир", "Лев Толстой", "1869")
+            self.library.add_book("Анна Каренина", "Лев Толстой", "1877")
+            self.library.add_book("Мир Полудня", "Братья Стругацкие", "1962")
+            self.library.add_book("1984", "George Orwell", "1949")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assert_same_as_scan(self, search_type, search_term):
+        expected = [
+            book.id for book in self.library.books
+            if search_term.lower() in str(getattr(book, search_type)).lower()
+        ]
+        found = [book.id for book in self.library.find_books(search_type, search_term)]
+        self.assertEqual(found, expected)
+
+    def test_index_matches_full_scan(self):
+        cases = (
+            ('title', 'мир'), ('title', 'МИР'), ('title', 'ир'), ('title', 'Ани'), ('author', 'лев тол'),
+            ('author', 'orwell'), ('year', '19'), ('year', '1869'), ('title', 'нет такой'),
+        )
+        for case in cases:
+            with self.subTest(case=case):
+                self.assert_same_as_scan(*case)
+
+    def test_candidates(self):
+        self.assertIsNone(TrigramIndex().candidates('title', 'ми'))
+        self.assertIsNone(self.library.search_index.candidates('status', 'выдана'))
+        self.assertEqual(self.library.search_index.candidates('title', 'мир'), {"1", "3"})
+
+    def test_index_follows_mutations(self):
+        with patch('builtins.print'):
+            with patch('builtins.input', return_value='да'):
+                self.library.delete_book("1")
+            self.library.add_book("Мир и война", "Неизвестный автор", "2001")
+
+        self.assertEqual([book.id for book in self.library.find_books('title', 'мир')], ["3", "5"])
+        self.assert_same_as_scan('author', 'толстой')
+
+    def test_index_built_on_load(self):
+        library = Library(self.data_manager, search_index=True)
+        self.assertEqual(len(library.books), 4)
+        self.assertEqual(library.search_index.candidates('author', 'толст'), {"1", "2"})
+
+
+class TestNormalizedSearch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.books = [
+            {"id": "1", "title": "Ёжик в тумане", "author": "Сергей Козлов", "year": 1969, "status": "в наличии"},
+            {"id": "2", "title": "Война и мир", "author": "Лев Толстой", "year": 1869, "status": "в наличии"},
+            {"id": "3", "title": "Анна Каренина", "author": "Лев  Толстой", "year": 1877, "status": "выдана"},
+            {"id": "4", "title": "История одного города", "author": "М. Е. Салтыков-Щедрин", "year": 1870,
+             "status": "в наличии"},
+        ]
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.data_manager.save_books(self.books)
+        self.library = Library(self.data_manager)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def titles(self, books):
+        return [book.title for book in books]
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("  «Ёжик»,  в ТУМАНЕ! "), "ежик в тумане")
+        self.assertEqual(normalize_text(1869), "1869")
+        # Заменяются только знаки препинания и пробелы: символы и диакритические знаки сохраняются.
+        self.assertEqual(normalize_text("© 2×2 = 4°"), "© 2×2 4°")
+        self.assertEqual(normalize_text("И\u0306ошкар-Ола"), "и\u0306ошкар ола")
+
+    def test_shared_keys_are_released_with_last_book(self):
+        search_keys = SearchKeys()
+        first, second = Book.from_dict(self.books[1]), Book.from_dict(self.books[2])
+        second.author = first.author
+        search_keys.add(first)
+        search_keys.add(second)
+        search_keys.remove(first)
+        self.assertEqual(search_keys.keys("author"), {"3": "лев толстой"})
+        search_keys.remove(second)
+        self.assertEqual(search_keys._shared, {"author": {}, "year": {}})
+
+    def test_find_books_ignores_yo_punctuation_and_spaces(self):
+        self.assertEqual(self.titles(self.library.find_books("title", "ежик")), ["Ёжик в тумане"])
+        self.assertEqual(self.titles(self.library.find_books("author", "лев   толстой")), ["Война и мир", "Анна Каренина"])
+        self.assertEqual(self.titles(self.library.find_books("author", "салтыков щедрин")), ["История одного города"])
+        self.assertEqual(self.library.find_books("title", "!!!"), [])
+
+    def test_keys_are_maintained_on_changes(self):
+        book = self.library.create_book("Ёлка", "Неизвестный автор", "2000")
+        self.assertEqual(self.library.search_keys.keys("title")[book.id], "елка")
+        self.assertEqual(self.titles(self.library.find_books("title", "елка")), ["Ёлка"])
+        self.library.remove_book(book.id)
+        self.assertNotIn(book.id, self.library.search_keys.keys("title"))
+        self.assertEqual(self.library.find_books("title", "елка"), [])
+
+    def test_search_index_and_storage_use_normalized_values(self):
+        library = Library(self.data_manager, search_index=True)
+        self.assertEqual(self.titles(library.find_books("title", "ежик в")), ["Ёжик в тумане"])
+
+        sqlite_manager = SQLiteDataManager(Path(self.temp_dir.name) / "books.db")
+        self.addCleanup(sqlite_manager.close)
+        sqlite_manager.save_books(self.books)
+        self.assertEqual([book["id"] for book in sqlite_manager.search_books("title", "ежик")], ["1"])
+
+        binary_manager = BinaryDataManager(Path(self.temp_dir.name) / "books.bin")
+        binary_manager.save_books(self.books)
+        self.assertEqual([book["id"] for book in binary_manager.search_books("author", "салтыков щедрин")], ["4"])
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("толстой", "толстой", 1), 0)
+        self.assertEqual(edit_distance("толстой", "толстый", 1), 1)
+        self.assertEqual(edit_distance("толстой", "тостый", 1), 2)
+        self.assertEqual(edit_distance("kitten", "sitting", 3), 3)
+
+    def test_fuzzy_index_matches_full_scan(self):
+        random.seed(5)
+        alphabet = "абвгде"
+        words = ["".join(random.choices(alphabet, k=random.randint(2, 7))) for _ in range(300)]
+        index = FuzzyIndex(fields=("title",))
+        for number, word in enumerate(words):
+            index.add(Book(str(number), word, "Автор", 2000, "в наличии"))
+
+        for query in words[:50] + ["".join(random.choices(alphabet, k=5)) for _ in range(50)]:
+            limit = 1 if len(query) >= 4 else 0
+            expected = {str(number) for number, word in enumerate(words) if edit_distance(query, word, limit) <= limit}
+            with self.subTest(query=query):
+                self.assertEqual(index.search("title", query), expected)
+
+    def test_fuzzy_find_books(self):
+        self.assertEqual(self.titles(self.library.fuzzy_find_books("author", "толстй")), ["Война и мир", "Анна Каренина"])
+        self.assertEqual(self.titles(self.library.fuzzy_find_books("title", "воина и мир")), ["Война и мир"])
+        self.assertEqual(self.library.fuzzy_find_books("year", "1896"), [])
+
+        book = self.library.create_book("Детство", "Лев Толстой", "1852")
+        self.assertIn("Детство", self.titles(self.library.fuzzy_find_books("author", "толстый")))
+        self.library.remove_book(book.id)
+        self.assertNotIn("Детство", self.titles(self.library.fuzzy_find_books("author", "толстый")))
+
+    def test_search_book_falls_back_to_fuzzy_search(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.library.search_book("author", "Толстй")
+        self.assertIn("Точных совпадений нет", stdout.getvalue())
+        self.assertIn("Анна Каренина", stdout.getvalue())
+
+    def test_no_fuzzy_fallback_for_queryable_storage(self):
+        library = Library(SQLiteDataManager(Path(self.temp_dir.name) / "books.db"))
+        library.create_book("Анна Каренина", "Лев Толстой", "1877")
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            library.search_book("author", "Толстй")
+        self.assertIn("Книги не найдены", stdout.getvalue())
+        self.assertFalse(library._loaded)
+        library.data_manager.close()
+
+
+@unittest.skipUnless(fork_available(), "параллельный просмотр требует запуска процессов через fork")
+class TestParallelScanner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        books = generate_books(2000, seed=3)
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.data_manager.save_books(books)
+        # Библиотека для сравнения работает со своей копией каталога, чтобы изменения двух библиотек не объединялись.
+        serial_manager = DataManager(Path(self.temp_dir.name) / "serial.json")
+        serial_manager.save_books(books)
+        self.serial = Library(serial_manager, search_cache_size=0)
+        self.library = Library(self.data_manager, search_cache_size=0, parallel_workers=2)
+        self.library.parallel_scanner.threshold = 0
+
+    def tearDown(self):
+        self.library.close()
+        self.temp_dir.cleanup()
+
+    def assertSameResults(self, field, term):
+        self.assertEqual(
+            [book.id for book in self.library.find_books(field, term)],
+            [book.id for book in self.serial.find_books(field, term)],
+        )
+
+    def test_results_match_serial_scan(self):
+        for field, term in (("title", "мир"), ("author", "ов"), ("year", "19"), ("title", "нет такой книги")):
+            with self.subTest(field=field, term=term):
+                self.assertSameResults(field, term)
+        self.assertEqual(self.library.parallel_scanner.workers, 2)
+
+    def test_changes_after_snapshot(self):
+        self.library.find_books("title", "мир")
+        for library in (self.library, self.serial):
+            library.create_book("Новый мир", "Автор", "2000")
+            library.remove_book("5")
+            with self.assertRaises(RuntimeError):
+                with library.batch():
+                    library.remove_book("7")
+                    raise RuntimeError
+        self.assertSameResults("title", "мир")
+        self.assertSameResults("title", "новый")
+
+    def test_snapshot_is_retaken_after_many_changes(self):
+        self.library.find_books("title", "мир")
+        generation = self.library.parallel_scanner._generation
+        self.library.add_books([("Мир", "Автор", "2000")] * 1500)
+        self.assertEqual(len(self.library.find_books("title", "мир")), len(self.serial.find_books("title", "мир")) + 1500)
+        self.assertNotEqual(self.library.parallel_scanner._generation, generation)
+
+    def test_serial_below_threshold(self):
+        scanner = ParallelScanner(workers=2)
+        self.assertFalse(scanner.accepts(1000))
+        library = Library(self.data_manager, parallel_workers=2)
+        library.find_books("title", "мир")
+        self.assertIsNone(library.parallel_scanner._pool)
+
+
+class TestCatalogStatistics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.data_manager.save_books(generate_books(500, seed=7))
+        self.library = Library(self.data_manager)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assertMatchesRecompute(self):
+        books = self.library.books
+        authors = Counter(book.author for book in books)
+        expected_top = sorted(authors.items(), key=lambda item: (-item[1], item[0]))[:5]
+        expected_decades = dict(sorted(Counter(book.year // 10 * 10 for book in books).items()))
+        statistics = self.library.catalog_statistics(5)
+
+        self.assertEqual(statistics["total"], len(books))
+        self.assertEqual(statistics["statuses"], {status.value: sum(book.status == status.value for book in books)
+                                                  for status in BookStatus})
+        self.assertEqual(statistics["top_authors"], expected_top)
+        self.assertEqual(statistics["decades"], expected_decades)
+        self.assertEqual(self.library.statistics.authors, dict(authors))
+
+    def test_statistics_match_full_recompute_after_changes(self):
+        self.assertMatchesRecompute()
+        random.seed(11)
+        authors = [book.author for book in self.library.books[:20]] + ["Новый автор"]
+        for _ in range(300):
+            action = random.random()
+            book_ids = list(self.library._books)
+            if action < 0.4 or not book_ids:
+                self.library.create_book("Книга", random.choice(authors), str(random.randint(1800, 2020)))
+            elif action < 0.7:
+                self.library.remove_book(random.choice(book_ids))
+            else:
+                self.library.set_status(random.choice(book_ids), random.choice(list(VALID_STATUSES)))
+        self.assertMatchesRecompute()
+
+        with self.assertRaises(RuntimeError):
+            with self.library.batch():
+                self.library.create_book("Книга", "Автор из отмененного блока", "1901")
+                self.library.remove_book(self.library.books[0].id)
+                raise RuntimeError
+        self.assertMatchesRecompute()
+        self.assertNotIn("Автор из отмененного блока", self.library.statistics.authors)
+
+    def test_top_authors_order_and_limit(self):
+        library = Library(DataManager(Path(self.temp_dir.name) / "empty.json"))
+        for author, count in (("Б", 2), ("А", 2), ("В", 3), ("Г", 1)):
+            for _ in range(count):
+                library.create_book("Книга", author, "1999")
+        self.assertEqual(library.top_authors(3), [("В", 3), ("А", 2), ("Б", 2)])
+        self.assertEqual(library.top_authors(10), [("В", 3), ("А", 2), ("Б", 2), ("Г", 1)])
+        self.assertEqual(library.books_by_decade(), {1990: 8})
+
+        library.remove_book("1")
+        self.assertEqual(library.top_authors(2), [("В", 3), ("А", 2)])
+        self.assertEqual(library.statistics.authors["Б"], 1)
+
+    def test_display_statistics(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.library.display_statistics(3)
+        output = stdout.getvalue()
+        self.assertIn("Всего книг: 500", output)
+        self.assertIn(self.library.top_authors(1)[0][0], output)
+        self.assertIn("-е", output)
+
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.library = Library(self.data_manager, search_cache_size=2)
+        with patch('builtins.print'):
+            self.library.add_book("Война и мир", "Лев Толстой", "1869")
+            self.library.add_book("Анна Каренина", "Лев Толстой", "1877")
+            self.library.add_book("Мир Полудня", "Братья Стругацкие", "1962")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_repeated_search_is_cached(self):
+        first = self.library.find_books('title', 'МИР')
+        second = self.library.find_books('title', 'мир')
+        self.assertEqual([book.id for book in second], [book.id for book in first])
+        self.assertEqual(self.library.search_cache.hits, 1)
+        self.assertEqual(self.library.search_cache.misses, 1)
+
+    def test_lru_eviction(self):
+        self.library.find_books('title', 'мир')
+        self.library.find_books('author', 'лев')
+        self.library.find_books('title', 'мир')
+        self.library.find_books('year', '19')
+        self.assertEqual(self.library.search_cache.evictions, 1)
+        self.library.find_books('title', 'мир')
+        self.assertEqual(self.library.search_cache.hits, 2)
+        self.library.find_books('author', 'лев')
+        self.assertEqual(self.library.search_cache.misses, 4)
+
+    def test_mutations_invalidate_only_affected_results(self):
+        self.library.find_books('title', 'мир')
+        self.library.find_books('author', 'стругацкие')
+        with patch('builtins.print'):
+            self.library.add_book("Мир приключений", "Разные авторы", "1955")
+        self.assertEqual(len(self.library.search_cache), 1)
+        self.assertEqual([book.id for book in self.library.find_books('title', 'мир')], ['1', '3', '4'])
+
+        self.library.find_books('title', 'анна')
+        with patch('builtins.input', return_value='да'), patch('builtins.print'):
+            self.library.delete_book('2')
+        self.assertEqual(self.library.find_books('title', 'анна'), [])
+        self.assertEqual(len(self.library.find_books('title', 'мир')), 3)
+        self.assertEqual(self.library.search_cache.stats()['hits'], 1)
+
+    def test_invalidate_normalizes_book_fields_once(self):
+        cache = SearchCache(10)
+        for term in ('мир', 'война', 'анна', 'мир полудня'):
+            cache.put('title', term, [])
+        cache.put('author', 'толстой', [])
+        book = self.library.books[0]
+        with patch('indexes.normalize_text', wraps=normalize_text) as normalize:
+            cache.invalidate(book)
+        self.assertEqual(normalize.call_count, 2)
+        self.assertEqual(len(cache), 2)
+
+    def test_status_change_in_storage_is_visible(self):
+        with patch('builtins.print'):
+            self.library.add_book("Пикник на обочине", "Братья Стругацкие", "1972")
+        library = Library(SQLiteDataManager(Path(self.temp_dir.name) / "books.db"))
+        try:
+            library.data_manager.save_books(self.library.data_manager.load_books())
+            self.assertEqual(library.find_books('author', 'стругацкие')[0].status, 'в наличии')
+            with patch('builtins.print'):
+                library.change_status('3', 'выдана')
+            self.assertEqual(library.find_books('author', 'стругацкие')[0].status, 'выдана')
+            self.assertEqual(library.search_cache.hits, 0)
+        finally:
+            library.data_manager.close()
+
+    def test_disabled_cache(self):
+        library = Library(self.data_manager, search_cache_size=0)
+        library.find_books('title', 'мир')
+        library.find_books('title', 'мир')
+        self.assertEqual(len(library.search_cache), 0)
+        self.assertEqual(library.search_cache.hits, 0)
+
+
+class TestBulkImport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.data_manager = DataManager(self.temp_path / "books.json")
+        self.library = Library(self.data_manager)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_add_books_saves_once(self):
+        books = [(f"Book{i}", "Author", "1991") for i in range(10)]
+        with patch.object(self.data_manager, 'save_books', wraps=self.data_manager.save_books) as mock_save:
+            self.assertEqual(self.library.add_books(books), 10)
+        mock_save.assert_called_once()
+        self.assertEqual([book.id for book in Library(self.data_manager).books], [str(i) for i in range(1, 11)])
+
+    def test_add_books_in_chunks(self):
+        books = [(f"Book{i}", "Author", "1991") for i in range(10)]
+        with patch.object(self.data_manager, 'save_books') as mock_save:
+            self.library.add_books(books, chunk_size=4)
+        self.assertEqual(mock_save.call_count, 3)
+
+    def test_add_books_to_journal(self):
+        data_manager = JournalDataManager(self.temp_path / "journal.json")
+        library = Library(data_manager)
+        library.add_books([("Book1", "Author", "1991"), ("Book2", "Author", "1992")])
+        self.assertEqual(len(data_manager.journal_path.read_text(encoding="utf-8").splitlines()), 2)
+
+    def test_import_csv(self):
+        csv_path = self.temp_path / "books.csv"
+        csv_path.write_text(
+            "название,автор,год\nВойна и мир,Лев Толстой,1869\n,Без названия,1900\nБудущее,Автор,3000\n",
+            encoding="utf-8",
+        )
+        report = import_books(self.library, csv_path)
+
+        self.assertEqual((report.total, report.imported), (3, 1))
+        self.assertEqual([line_number for line_number, _ in report.rejected], [3, 4])
+        self.assertEqual(self.library.books[0].title, "Война и мир")
+
+    def test_import_jsonl(self):
+        jsonl_path = self.temp_path / "books.jsonl"
+        jsonl_path.write_text(
+            '{"title": "1984", "author": "George Orwell", "year": 1949}\n'
+            'not json\n'
+            '{"title": "Animal Farm", "author": "George Orwell", "year": "1945"}\n',
+            encoding="utf-8",
+        )
+        report = import_books(self.library, jsonl_path, chunk_size=1)
+
+        self.assertEqual(report.imported, 2)
+        self.assertEqual(report.rejected, [(2, "строка не является объектом JSON")])
+        self.assertEqual([book.year for book in Library(self.data_manager).books], [1949, 1945])
+
+
+class TestLibraryBatch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.library = Library(self.data_manager, search_index=True)
+        with patch('builtins.print'):
+            self.library.add_book("1984", "George Orwell", "1949")
+            self.library.add_book("Animal Farm", "George Orwell", "1945")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_batch_saves_once(self):
+        with patch.object(self.data_manager, 'save_books', wraps=self.data_manager.save_books) as mock_save:
+            with patch('builtins.print'):
+                with self.library.batch():
+                    self.library.change_status("1", "выдана")
+                    self.library.change_status("2", "выдана")
+                    self.library.add_book("Brave New World", "Aldous Huxley", "1932")
+                    mock_save.assert_not_called()
+        mock_save.assert_called_once()
+        self.assertEqual(
+            [book.status for book in Library(self.data_manager).books], ["выдана", "выдана", "в наличии"]
+        )
+
+    def test_batch_rollback_on_exception(self):
+        with patch('builtins.print'), patch('builtins.input', return_value='да'):
+            with self.assertRaises(RuntimeError):
+                with self.library.batch():
+                    self.library.change_status("1", "выдана")
+                    self.library.delete_book("2")
+                    self.library.add_book("Brave New World", "Aldous Huxley", "1932")
+                    raise RuntimeError
+
+            self.assertEqual([book.id for book in self.library.books], ["1", "2"])
+            self.assertEqual(self.library.books[0].status, "в наличии")
+            self.assertEqual([book.id for book in self.library.find_books("title", "farm")], ["2"])
+            self.assertEqual(self.library.find_books("title", "brave"), [])
+
+            self.library.add_book("Brave New World", "Aldous Huxley", "1932")
+        self.assertEqual(self.library.books[-1].id, "3")
+        self.assertEqual(Library(self.data_manager).books[0].status, "в наличии")
+
+    def test_batch_rollback_when_save_fails(self):
+        with patch.object(self.data_manager, 'save_books', side_effect=OSError("диск заполнен")):
+            with self.assertRaises(OSError):
+                with self.library.batch():
+                    self.library.set_status("1", "выдана")
+                    self.library.remove_book("2")
+                    self.library.create_book("Brave New World", "Aldous Huxley", "1932")
+        self.assertEqual([(book.id, book.status) for book in self.library.books],
+                         [("1", "в наличии"), ("2", "в наличии")])
+        self.assertEqual(self.library.find_books("title", "brave"), [])
+        self.assertEqual(self.library.next_id, 3)
+
+    def test_nested_batch_rolls_back_only_its_changes(self):
+        with self.library.batch():
+            self.library.set_status("1", "выдана")
+            with self.assertRaises(RuntimeError):
+                with self.library.batch():
+                    self.library.remove_book("2")
+                    self.library.create_book("Brave New World", "Aldous Huxley", "1932")
+                    raise RuntimeError
+            book = self.library.create_book("Homage to Catalonia", "George Orwell", "1938")
+        self.assertEqual(book.id, "3")
+        self.assertEqual([(book.id, book.status) for book in Library(self.data_manager).books],
+                         [("1", "выдана"), ("2", "в наличии"), ("3", "в наличии")])
+
+    def test_batch_with_journal(self):
+        data_manager = JournalDataManager(Path(self.temp_dir.name) / "journal.json")
+        library = Library(data_manager)
+        with patch('builtins.print'):
+            with library.batch():
+                library.add_book("1984", "George Orwell", "1949")
+                with library.batch():
+                    library.change_status("1", "выдана")
+                self.assertFalse(data_manager.journal_path.exists())
+        self.assertEqual(len(data_manager.journal_path.read_text(encoding="utf-8").splitlines()), 2)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_generated_catalog_is_reproducible_and_valid(self):
+        books = generate_books(200, seed=42)
+        self.assertEqual(books, generate_books(200, seed=42))
+        self.assertNotEqual(books, generate_books(200, seed=43))
+        for book in books:
+            self.assertTrue(is_not_empty(book["title"]) and is_not_empty(book["author"]))
+            self.assertTrue(is_valid_year(str(book["year"])))
+            self.assertTrue(is_valid_status(book["status"]))
+
+    def test_summarize(self):
+        summary = summarize([0.001 * value for value in range(1, 101)])
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["p50_ms"], 51.0)
+        self.assertEqual(summary["p99_ms"], 100.0)
+        self.assertEqual(summary["max_ms"], 100.0)
+
+    def test_time_to_first_menu_exits_cleanly(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertGreater(time_to_first_menu(Path(temp_dir)), 0)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.library = Library(self.data_manager)
+        METRICS.reset()
+
+    def tearDown(self):
+        METRICS.disable()
+        METRICS.reset()
+        self.temp_dir.cleanup()
+
+    def test_disabled_metrics_collect_nothing(self):
+        with patch('builtins.print'):
+            self.library.add_book("1984", "George Orwell", "1949")
+        self.assertEqual(METRICS.snapshot(), {"counters": {}, "latency": {}})
+
+    def test_enabled_metrics(self):
+        METRICS.enable()
+        with patch('builtins.print'):
+            self.library.add_book("1984", "George Orwell", "1949")
+            self.library.search_book("author", "orwell")
+            self.library.change_status("1", "выдана")
+
+        snapshot = METRICS.snapshot()
+        for name in ("library.add_book", "library.search_book", "library.change_status",
+                     "data_manager.save_books.serialize", "data_manager.save_books.write"):
+            self.assertIn(name, snapshot["latency"])
+        self.assertEqual(snapshot["latency"]["data_manager.save_books"]["count"], 2)
+        self.assertGreater(
+            snapshot["counters"]["data_manager.bytes_written"], self.data_manager.file_path.stat().st_size
+        )
+        self.assertIn("library.add_book", METRICS.report())
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram()
+        for value in (0.001, 0.002, 0.003, 0.1):
+            histogram.add(value)
+        self.assertEqual(histogram.count, 4)
+        self.assertLessEqual(histogram.percentile(0.5), 0.004)
+        self.assertEqual(histogram.percentile(1.0), 0.1)
+
+
+class TestBookQuery(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(Path(self.temp_dir.name) / "books.json")
+        self.data_manager.save_books(generate_books(500, seed=1))
+        self.library = Library(self.data_manager)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def brute_force(self, query):
+        return [book for book in self.library.books if query.matches(book)]
+
+    def test_query_matches_full_scan(self):
+        author = self.library.books[0].author
+        queries = (
+            BookQuery(year_from=1950, year_to=1960),
+            BookQuery(year_to=1900, status="выдана"),
+            BookQuery(author=author.upper()),
+            BookQuery(author_prefix=author[:3].lower(), year_from=1970),
+            BookQuery(title_prefix="белая", status="в наличии"),
+            BookQuery(title="Белый город"),
+            BookQuery(status="выдана"),
+        )
+        for query in queries:
+            with self.subTest(query=query):
+                self.assertEqual(self.library.query_books(query), self.brute_force(query))
+
+    def test_sort_and_limit(self):
+        query = BookQuery(year_from=1980, sort_by="year", descending=True, limit=5)
+        expected = sorted(self.brute_force(BookQuery(year_from=1980)),
+                          key=lambda book: (book.year, int(book.id)), reverse=True)[:5]
+        self.assertEqual(self.library.query_books(query), expected)
+
+        query = BookQuery(year_from=1980, sort_by="year", limit=3)
+        self.assertEqual(
+            [book.year for book in self.library.query_books(query)],
+            sorted(book.year for book in self.brute_force(BookQuery(year_from=1980)))[:3],
+        )
+
+    def test_indexes_follow_mutations(self):
+        query = BookQuery(author="Новый Автор")
+        self.assertEqual(self.library.query_books(query), [])
+        with patch('builtins.print'):
+            self.library.add_book("Новая книга", "Новый автор", "2001")
+            with patch('builtins.input', return_value='да'):
+                self.library.delete_book("1")
+        self.assertEqual([book.title for book in self.library.query_books(query)], ["Новая книга"])
+        self.assertEqual(self.library.query_books(BookQuery(year_from=1700)), self.brute_force(BookQuery()))
+
+    def test_parsers(self):
+        self.assertEqual(parse_year_range("1900-1950"), (1900, 1950))
+        self.assertEqual(parse_year_range("-1950"), (None, 1950))
+        self.assertEqual(parse_year_range("1949"), (1949, 1949))
+        self.assertEqual(parse_year_range(""), (None, None))
+        with self.assertRaises(ValueError):
+            parse_year_range("1950-1900")
+        self.assertEqual(parse_text_filter("Толст*"), (None, "Толст"))
+        self.assertEqual(parse_text_filter("Лев Толстой"), ("Лев Толстой", None))
+        self.assertEqual(parse_sort("-год"), ("year", True))
+        self.assertEqual(parse_sort(""), ("id", False))
+
+
 class TestLibrarian(unittest.TestCase):
     def setUp(self):
         self.mock_library = Mock(spec=Library)
+        for method in (self.mock_library.display_books, self.mock_library.search_book,
+                       self.mock_library.search_by_query):
+            method.return_value = False
         self.librarian = Librarian(self.mock_library)
 
 
@@ -211,7 +1876,47 @@ class TestLibrarian(unittest.TestCase):
     def test_search_book_success(self):
         with patch('librarian.validate_input', side_effect=['название', 'Python']):
             self.librarian.search_book()
-            self.mock_library.search_book.assert_called_once_with('title', 'Python')
+            self.mock_library.search_book.assert_called_once_with('title', 'Python', 0, PAGE_SIZE)
+
+    def test_bulk_change_status(self):
+        with patch('librarian.validate_input', side_effect=['1, 2 5', 'в наличии']):
+            self.librarian.bulk_change_status()
+        self.mock_library.bulk_change_status.assert_called_once_with(['1', '2', '5'], 'в наличии')
+
+    def test_id_list_validation(self):
+        self.assertEqual(parse_id_list(" 1,2;  3 "), ["1", "2", "3"])
+        self.assertTrue(is_valid_id_list("1 2"))
+        self.assertFalse(is_valid_id_list(" , "))
+        self.assertFalse(is_valid_id_list("1 два"))
+
+    def test_display_books_by_status(self):
+        with patch('librarian.validate_input', return_value='выдана'):
+            self.librarian.display_books_by_status()
+        self.mock_library.display_books_by_status.assert_called_once_with('выдана')
+
+    def test_display_statistics(self):
+        with patch('librarian.validate_input', return_value=''):
+            self.librarian.display_statistics()
+        self.mock_library.display_statistics.assert_called_once_with(10)
+        with patch('librarian.validate_input', return_value='3'):
+            self.librarian.display_statistics()
+        self.mock_library.display_statistics.assert_called_with(3)
+
+    def test_advanced_search(self):
+        answers = ['расширенный', '1900-1950', 'Толст*', '', 'выдана', '-год', '10']
+        with patch('librarian.validate_input', side_effect=answers):
+            self.librarian.search_book()
+        self.mock_library.search_by_query.assert_called_once_with(BookQuery(
+            year_from=1900, year_to=1950, author_prefix="Толст", status="выдана",
+            sort_by="year", descending=True, limit=10,
+        ), 0, PAGE_SIZE)
+
+    def test_advanced_search_cancel(self):
+        with patch('librarian.validate_input', side_effect=['расширенный', '1900', None]):
+            with patch('builtins.print') as mock_print:
+                self.librarian.search_book()
+        self.mock_library.search_by_query.assert_not_called()
+        mock_print.assert_called_with("Поиск книги отменен.")
 
     def test_search_book_cancel(self):
         with patch('librarian.validate_input', side_effect=[None, None]):
@@ -222,13 +1927,32 @@ class TestLibrarian(unittest.TestCase):
 
     def test_display_books(self):
         self.librarian.display_books()
-        self.mock_library.display_books.assert_called_once()
+        self.mock_library.display_books.assert_called_once_with(0, PAGE_SIZE)
+
+    def test_display_books_pages(self):
+        self.mock_library.display_books.side_effect = lambda page, page_size: page < 2
+        with patch('builtins.input', side_effect=['с', 'с', 'п', 'с', '']):
+            self.librarian.display_books()
+        pages = [call.args[0] for call in self.mock_library.display_books.call_args_list]
+        self.assertEqual(pages, [0, 1, 2, 1, 2])
 
     def test_change_status_success(self):
         with patch('librarian.validate_input', side_effect=['1', 'выдана']):
             self.librarian.change_status()
             self.mock_library.change_status.assert_called_once_with('1', 'выдана')
 
+    def test_import_books_cancel(self):
+        with patch('librarian.validate_input', return_value=None):
+            with patch('builtins.print') as mock_print:
+                self.librarian.import_books()
+                self.mock_library.add_books.assert_not_called()
+                mock_print.assert_called_with("Импорт книг отменен.")
+
+    def test_show_metrics(self):
+        with patch('builtins.print') as mock_print:
+            self.librarian.show_metrics()
+        mock_print.assert_called_once_with(METRICS.report())
+
     def test_change_status_cancel(self):
         with patch('librarian.validate_input', side_effect=['stop', None]):
             with patch('builtins.print') as mock_print:
@@ -0,0 +1,60 @@
+import re
+from datetime import datetime
+
+from query import SORT_FIELDS_MAPPING, parse_year_range
+
+VALID_SEARCH_TYPES = ["название", "автор", "год", "расширенный"]
+VALID_STATUSES = ["выдана", "в наличии"]
+ID_SEPARATORS = re.compile(r"[\s,;]+")
+
+
+def parse_id_list(value: str) -> list[str]:
+    """Разбирает список ID, разделенных пробелами, запятыми или точками с запятой"""
+    return [book_id for book_id in ID_SEPARATORS.split(value.strip()) if book_id]
+
+
+def is_not_empty(value: str) -> bool:
+    """Проверяет, что передана не пустая строка"""
+    return bool(value and value.strip())
+
+def is_valid_year(value: str) -> bool:
+    """Проверяет введенный год (не должен превышать текущий год)"""
+    current_year = datetime.today().year
+    return value.isdigit() and int(value) <= current_year
+
+def is_positive_integer(value: str) -> bool:
+    """Проверяет, что введенное значение - целое положительное число"""
+    return value.isdigit() and int(value) >= 0
+
+def is_valid_status(value: str) -> bool:
+    """Проверяет что введенный статус соответствует одному из доступных статусов"""
+    return value in VALID_STATUSES
+
+def is_valid_search_type(value: str) -> bool:
+    """Проверяет что введенный тип поиска соответствует одному из доступных типов поиска"""
+    return value in VALID_SEARCH_TYPES
+
+def is_valid_year_range(value: str) -> bool:
+    """Проверяет диапазон годов ('1900-1950', '1900-', '-1950', '1949' или пустая строка)"""
+    try:
+        parse_year_range(value)
+    except ValueError:
+        return False
+    return True
+
+def is_valid_optional_status(value: str) -> bool:
+    """Проверяет, что передан один из доступных статусов или пустая строка"""
+    return not value.strip() or is_valid_status(value.strip())
+
+def is_valid_sort(value: str) -> bool:
+    """Проверяет поле сортировки ('id', 'название', 'автор', 'год', с '-' - по убыванию, или пустая строка)"""
+    return value.strip().lower().lstrip("-") in SORT_FIELDS_MAPPING or not value.strip()
+
+def is_optional_positive_integer(value: str) -> bool:
+    """Проверяет, что передано целое положительное число или пустая строка"""
+    return not value.strip() or value.strip().isdigit() and int(value) > 0
+
+def is_valid_id_list(value: str) -> bool:
+    """Проверяет, что передан непустой список ID - целых положительных чисел"""
+    book_ids = parse_id_list(value)
+    return bool(book_ids) and all(is_positive_integer(book_id) for book_id in book_ids)
@@ -0,0 +1,117 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from metrics import METRICS
+
+
+class WriteBehind:
+    """
+    Отложенное сохранение изменений в фоновом потоке.
+    Переданные изменения накапливаются и сохраняются одной записью (group commit) не позднее чем через
+    delay секунд после первого несохраненного изменения. Пока идет запись, новые изменения накапливаются
+    для следующей записи. flush() дожидается сохранения всех переданных изменений.
+    Если запись завершилась ошибкой, изменения остаются в очереди и записываются повторно через retry_delay секунд;
+    ошибку можно получить без ожидания (take_error) или из flush().
+    """
+    def __init__(self, write: Callable[[list[Any]], None], delay: float = 0.5, retry_delay: float = 5.0):
+        """
+        :param write: Функция, сохраняющая список накопленных изменений. Вызывается в фоновом потоке.
+        :param delay: Максимальное время (в секундах) между изменением и началом его записи.
+        :param retry_delay: Время (в секундах) до повторной попытки записи после ошибки.
+        """
+        self.write = write
+        self.delay = delay
+        self.retry_delay = retry_delay
+        self._pending: list[Any] = []
+        self._first_pending: Optional[float] = None
+        self._writing = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, changes: list[Any]) -> None:
+        """Добавляет изменения в очередь на запись и сразу возвращает управление."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Отложенное сохранение уже остановлено")
+            if not self._pending:
+                self._first_pending = time.monotonic()
+            self._pending.extend(changes)
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                # Изменения, поступившие до истечения задержки, попадают в ту же запись.
+                while not self._closed and (remaining := self._first_pending + self.delay - time.monotonic()) > 0:
+                    self._condition.wait(remaining)
+                changes, self._pending = self._pending, []
+                self._first_pending = None
+                self._writing = True
+
+            try:
+                self.write(changes)
+                METRICS.increment("write_behind.commits")
+                METRICS.increment("write_behind.changes", len(changes))
+            except BaseException as error:
+                with self._condition:
+                    # Несохраненные изменения возвращаются в очередь и будут записаны повторно через retry_delay
+                    # секунд (или сразу при вызове flush()). После остановки повторных попыток нет.
+                    self._pending[:0] = changes
+                    self._first_pending = time.monotonic() + self.retry_delay - self.delay
+                    self._error = error
+                    METRICS.increment("write_behind.errors")
+                    if self._closed:
+                        return
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    @property
+    def pending(self) -> int:
+        """Количество изменений, ожидающих записи."""
+        with self._condition:
+            return len(self._pending)
+
+    def queued(self) -> list[Any]:
+        """Возвращает копию изменений, ожидающих записи (без изменений, которые записываются сейчас)."""
+        with self._condition:
+            return list(self._pending)
+
+    def flush(self) -> None:
+        """
+        Дожидается записи всех переданных изменений без ожидания задержки.
+        Если фоновая запись завершилась ошибкой, выбрасывает эту ошибку; изменения остаются в очереди.
+        """
+        with self._condition:
+            self._first_pending = time.monotonic() - self.delay if self._pending else None
+            self._condition.notify_all()
+            while (self._pending or self._writing) and self._error is None:
+                self._condition.wait()
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def take_error(self) -> Optional[BaseException]:
+        """Возвращает ошибку последней неудачной записи, не дожидаясь записи (None, если ошибок не было)."""
+        with self._condition:
+            error, self._error = self._error, None
+            return error
+
+    def close(self) -> None:
+        """Сохраняет все накопленные изменения и останавливает фоновый поток."""
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self._thread.join()